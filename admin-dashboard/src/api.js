@@ -27,6 +27,10 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // مفتاح ثابت لكل عملية: الـ retry بعد refresh للتوكن بيرجع نفس النتيجة بدل ما يكررها
+    if (["post", "put", "patch"].includes(config.method) && !config.headers["Idempotency-Key"]) {
+      config.headers["Idempotency-Key"] = crypto.randomUUID();
+    }
     return config;
   },
   (error) => {
@@ -333,6 +337,54 @@ export const uploadUnitFiles = async (unitId, files) => {
   }
 };
 
+// كذا request في round trip واحد - مثلاً أول تحميل للداشبورد:
+// batch([{ path: "/api/companies" }, { path: "/api/stats" }, { path: "/api/projects", query: { fields: "id,title" } }])
+export const batch = async (requests) => {
+  try {
+    const response = await api.post("/batch", { requests });
+    return response.data;
+  } catch (error) {
+    console.error("Batch error:", error);
+    throw error;
+  }
+};
+
+// رفع ملف كبير (فيديو) على أجزاء - لو الاتصال وقع بيسأل السيرفر وصل لحد فين ويكمل
+// attach اختياري: { project_id, field: "videos" } أو { unit_id, field: "floor_plan" }
+const UPLOAD_CHUNK = 8 * 1024 * 1024;
+
+export const uploadResumable = async (file, { attach, onProgress, retries = 5 } = {}) => {
+  const created = await api.post("/uploads/resumable", { filename: file.name, size: file.size, attach });
+  const { id } = created.data.data;
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    try {
+      const response = await api.patch(`/uploads/resumable/${id}`, file.slice(offset, offset + UPLOAD_CHUNK), {
+        headers: { "Content-Type": "application/offset+octet-stream", "Upload-Offset": offset },
+      });
+      offset = response.data.data.offset;
+      failures = 0;
+      if (onProgress) onProgress(Math.round((offset * 100) / file.size));
+    } catch (error) {
+      const status = error.response?.status;
+      if ((status && status !== 409 && status < 500) || ++failures > retries) {
+        console.error("Resumable upload error:", error);
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+      try {
+        const head = await api.head(`/uploads/resumable/${id}`);
+        offset = Number(head.headers["upload-offset"]);
+      } catch (headError) {
+        // لسه مفيش اتصال - المحاولة الجاية هترجع 409 لو الـ offset اتغير
+      }
+    }
+  }
+  const response = await api.post(`/uploads/resumable/${id}/complete`);
+  return response.data;
+};
+
 export const getCurrentUser = () => {
   const userData = localStorage.getItem("user_data");
   return userData ? JSON.parse(userData) : null;
@@ -1,6 +1,7 @@
 import React, { useState, useRef } from 'react';
 import { useApi } from '../hooks/useApi';
 import API from '../api/axios';
+import { uploadResumable } from '../api';
 import './FileUploader.css';
 
 const FileUploader = ({ 
@@ -36,6 +37,15 @@ const FileUploader = ({
       }
 
       try {
+        if (file.type.startsWith('video/')) {
+          // الفيديوهات كبيرة - على أجزاء وبتكمل لو النت قطع
+          const response = await uploadResumable(file, { onProgress: setProgress });
+          if (response.ok) {
+            uploadedFiles.push(response);
+          }
+          continue;
+        }
+
         const formData = new FormData();
         formData.append('file', file);
         formData.append('type', fileType);
@@ -1,35 +1,48 @@
 # 1. api/app.py - بعد التعديلات
 import os
 import json
-import logging
-from logging.handlers import RotatingFileHandler
 from functools import wraps
 from pathlib import Path
+from datetime import datetime
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, send_from_directory, url_for
+from flask import Flask, abort, jsonify, request, send_from_directory
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, verify_jwt_in_request, get_jwt
-from flask_migrate import Migrate
-from werkzeug.utils import secure_filename
+from flask_jwt_extended import JWTManager, get_jwt
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm.exc import StaleDataError
 from werkzeug.exceptions import HTTPException
 
-from models import db, User, Company, Project, Unit
-from utils import paginate_query
+from models import db, Company, Project, Unit, InventorySummary
+from utils import page_args
 from auth import auth_bp
+from batch import batch_bp
+from changes import changes_bp, record_change, record_deletes, record_deletes_from
+from security import password_hasher, login_limiter
+import tokens
+import log_setup
+import metrics
+import profiling
+import inventory
+import upload_gc
+import serializers
+import catalog_cache
+import compression
+import uploads
+import resumable
+import imaging
+import media
+import reservations
+import idempotency
+from cli import register_commands, bootstrap
 
 load_dotenv()
 
-ALLOWED_IMAGE_EXT = {"png", "jpg", "jpeg", "gif", "webp"}
-
-def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_IMAGE_EXT
-
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
         try:
-            verify_jwt_in_request()
+            tokens.verify_cached()
         except Exception as e:
             return jsonify({"ok": False, "error": "Token missing or invalid", "detail": str(e)}), 401
         claims = get_jwt()
@@ -44,7 +57,7 @@ def create_app():
     CORS(app, 
          origins=["http://localhost:3000", "http://127.0.0.1:3000"],
          supports_credentials=True,
-         allow_headers=["Content-Type", "Authorization", "Content-Disposition"],
+         allow_headers=["Content-Type", "Authorization", "Content-Disposition", "Idempotency-Key"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"])
 
     # ---------- Config ----------
@@ -56,35 +69,121 @@ def create_app():
 
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["JWT_SECRET_KEY"] = jwt_secret
+    if db_url.startswith("sqlite"):
+        # الكتابات في SQLite بتتعمل واحدة ورا التانية - request بيستنى دوره لحد المدة دي قبل "database is locked"
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", 30))}}
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 3600
     app.config["JWT_REFRESH_TOKEN_EXPIRES"] = 604800
+    # مفاتيح غير متماثلة: JWT_ALGORITHM=RS256 + ملفات PEM
+    app.config["JWT_ALGORITHM"] = os.getenv("JWT_ALGORITHM", "HS256")
+    app.config["JWT_PRIVATE_KEY_FILE"] = os.getenv("JWT_PRIVATE_KEY_FILE")
+    app.config["JWT_PUBLIC_KEY_FILE"] = os.getenv("JWT_PUBLIC_KEY_FILE")
+    app.config["REVOCATION_REDIS_URL"] = os.getenv("REVOCATION_REDIS_URL")
+    app.config["JWT_VERIFIED_CACHE_SIZE"] = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", 1024))
+    tokens.configure_keys(app, jwt_secret)
+
+    # سياسة الهاش: مثلاً "scrypt:16384:8:1" أو "pbkdf2:sha256:300000"
+    app.config["PASSWORD_HASH_METHOD"] = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    app.config["PASSWORD_HASH_QUEUE"] = int(os.getenv("PASSWORD_HASH_QUEUE", 16))
+    app.config["LOGIN_MAX_FAILURES"] = int(os.getenv("LOGIN_MAX_FAILURES", 5))
+    app.config["LOGIN_MAX_FAILURES_PER_IP"] = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", 20))
+    app.config["LOGIN_LOCKOUT_SECONDS"] = int(os.getenv("LOGIN_LOCKOUT_SECONDS", 300))
 
-    uploads = instance_path / "uploads"
-    os.makedirs(uploads, exist_ok=True)
-    app.config["UPLOAD_FOLDER"] = str(uploads)
+    upload_folder = instance_path / "uploads"
+    os.makedirs(upload_folder, exist_ok=True)
+    app.config["UPLOAD_FOLDER"] = str(upload_folder)
+    # الملفات بتتكتب stream على الديسك وبتترفض أول ما تعدي الحد (uploads.py)
+    app.config["UPLOAD_MAX_FILE_BYTES"] = int(os.getenv("UPLOAD_MAX_FILE_BYTES", 10 * 1024 * 1024))
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", 64 * 1024 * 1024))
+    app.config["MAX_FORM_MEMORY_SIZE"] = int(os.getenv("MAX_FORM_MEMORY_SIZE", 500 * 1024))
+    uploads.init_app(app)
+    # الصور بتتلف حسب EXIF وتتصغر وتتضغط بعد الرفع (imaging.py) في IMAGE_WORKERS process
+    app.config["IMAGE_INGEST"] = os.getenv("IMAGE_INGEST", "1") != "0"
+    app.config["IMAGE_MAX_EDGE"] = int(os.getenv("IMAGE_MAX_EDGE", 2560))
+    app.config["IMAGE_QUALITY"] = int(os.getenv("IMAGE_QUALITY", 82))
+    app.config["IMAGE_KEEP_ORIGINAL"] = os.getenv("IMAGE_KEEP_ORIGINAL", "0") == "1"
+    app.config["IMAGE_WORKERS"] = int(os.getenv("IMAGE_WORKERS", 2))
+    imaging.image_ingest.init_app(app)
+    # روابط الصور: MEDIA_BASE_URL لـ CDN/دومين تاني. الحقول اللي في MEDIA_PRIVATE_FIELDS (images,videos,floor_plan)
+    # بتتخزن في private/ وروابطها بس بتتوقع بـ MEDIA_SIGNING_KEY وبتنتهي بعد MEDIA_URL_TTL - الباقي روابط عامة ثابتة
+    app.config["MEDIA_BASE_URL"] = os.getenv("MEDIA_BASE_URL", "")
+    app.config["MEDIA_SIGNING_KEY"] = os.getenv("MEDIA_SIGNING_KEY", "")
+    app.config["MEDIA_URL_TTL"] = int(os.getenv("MEDIA_URL_TTL", 3600))
+    app.config["MEDIA_PRIVATE_FIELDS"] = os.getenv("MEDIA_PRIVATE_FIELDS", "")
+    media.init_app(app)
 
     # ---------- Logging ----------
+    # LOG_FILE فاضي = بدون ملفات (مفيد للاختبارات والسكربتات)
     logs_dir = Path.cwd() / "logs"
-    logs_dir.mkdir(parents=True, exist_ok=True)
-    handler = RotatingFileHandler(logs_dir / "api.log", maxBytes=10*1024*1024, backupCount=5, encoding="utf-8")
-    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
-    handler.setFormatter(formatter)
-    handler.setLevel(logging.INFO)
-    app.logger.addHandler(handler)
-    app.logger.setLevel(logging.INFO)
-    app.logger.info("Starting API app")
+    app.config["LOG_FILE"] = os.getenv("LOG_FILE", str(logs_dir / "api.log"))
+    app.config["SLOW_LOG_FILE"] = os.getenv("SLOW_LOG_FILE", str(logs_dir / "slow.log") if app.config["LOG_FILE"] else "")
+    app.config["SLOW_REQUEST_MS"] = float(os.getenv("SLOW_REQUEST_MS", 500))
+    log_setup.init_app(app)
+    app.json = serializers.FastJSONProvider(app)
 
     # ---------- Extensions ----------
     db.init_app(app)
     jwt = JWTManager(app)
-    migrate = Migrate(app, db)
+    tokens.init_app(app, jwt)
+    # alembic تقيل - يتحمل بس لما نشتغل من flask CLI (flask db ...)
+    if os.getenv("FLASK_RUN_FROM_CLI"):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    register_commands(app)
+    password_hasher.init_app(app)
+    login_limiter.init_app(app)
+    # كاش لـ GET بتاع الكتالوج - بيتمسح مع أي commit فيه تغيير، والـ TTL للكتابة من process تانية
+    app.config["CATALOG_CACHE_SIZE"] = int(os.getenv("CATALOG_CACHE_SIZE", 512))
+    app.config["CATALOG_CACHE_TTL"] = int(os.getenv("CATALOG_CACHE_TTL", 60))
+    catalog_cache.init_app(app)
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "1") != "0"
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+    metrics.init_app(app)
+    # PROFILE_SAMPLE_RATE=0.01 = profile لـ 1% من الـ requests، والأدمن يقدر يطلب profile بـ X-Profile: 1
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    app.config["PROFILE_MAX_ENTRIES"] = int(os.getenv("PROFILE_MAX_ENTRIES", 50))
+    profiling.init_app(app)
+    # gzip/br فوق COMPRESS_MIN_SIZE بايت - آخر after_request يتسجل = أول واحد يشتغل، فوقت الضغط بيدخل في اللوج والـ metrics
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    app.config["COMPRESS_LEVEL"] = int(os.getenv("COMPRESS_LEVEL", 6))
+    app.config["COMPRESS_BR_QUALITY"] = int(os.getenv("COMPRESS_BR_QUALITY", 5))
+    compression.init_app(app)
+    # الملفات اللي اتفكت من صف (حذف/استبدال) بتتمسح في الخلفية بعد المدة دي لو ما اتربطتش تاني.
+    # UPLOAD_GC_DRY_RUN=1 (الافتراضي) = اللوج بيقول هيمسح إيه من غير ما يمسح
+    app.config["UPLOAD_GC_GRACE_SECONDS"] = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", 3600))
+    app.config["UPLOAD_GC_INTERVAL"] = int(os.getenv("UPLOAD_GC_INTERVAL", 6 * 3600))
+    app.config["UPLOAD_GC_DRY_RUN"] = os.getenv("UPLOAD_GC_DRY_RUN", "1") != "0"
+    # رفع على أجزاء (فيديوهات): أقصى حجم، والـ uploads اللي وقفت أكتر من كده بتتمسح
+    app.config["RESUMABLE_MAX_BYTES"] = int(os.getenv("RESUMABLE_MAX_BYTES", 2 * 1024 ** 3))
+    app.config["RESUMABLE_EXPIRE_SECONDS"] = int(os.getenv("RESUMABLE_EXPIRE_SECONDS", 24 * 3600))
+    upload_gc.init_app(app)
+    app.config["BATCH_MAX_REQUESTS"] = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+    # كل SSE على /api/changes/stream ماسك thread - لازم يفضل أقل من SERVER_THREADS
+    app.config["CHANGES_MAX_STREAMS"] = int(os.getenv("CHANGES_MAX_STREAMS", 4))
+    # غير SQLite: فجوة في seq بتوقف الـ feed لحد ما تتملى أو تعدي المدة دي (transaction اترجعت)
+    app.config["CHANGES_GAP_TIMEOUT"] = int(os.getenv("CHANGES_GAP_TIMEOUT", 30))
+    # حجز الوحدات: المدة الافتراضية/القصوى، وكل قد إيه الحجوزات المنتهية بترجع available
+    app.config["RESERVATION_TTL"] = int(os.getenv("RESERVATION_TTL", 15 * 60))
+    app.config["RESERVATION_MAX_TTL"] = int(os.getenv("RESERVATION_MAX_TTL", 24 * 3600))
+    app.config["RESERVATION_SWEEP_INTERVAL"] = int(os.getenv("RESERVATION_SWEEP_INTERVAL", 60))
+    reservations.init_app(app)
+    # Idempotency-Key على POST/PUT/PATCH: الـ response بيتخزن المدة دي، وطلب وقع في النص بيتعاد بعد PENDING_TIMEOUT
+    app.config["IDEMPOTENCY_TTL"] = int(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+    app.config["IDEMPOTENCY_PENDING_TIMEOUT"] = int(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", 600))
+    idempotency.init_app(app)
 
     # ---------- Error handlers ----------
     @app.errorhandler(HTTPException)
     def handle_http_error(e):
         return jsonify({"ok": False, "error": e.name, "message": e.description}), e.code
 
+    @app.errorhandler(StaleDataError)
+    def handle_stale_data(e):
+        # الصف اتعدل (أو اتحجز) من request تاني بين القراية والكتابة
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "Modified by another request, reload and retry"}), 409
+
     @app.errorhandler(Exception)
     def handle_exception(e):
         app.logger.exception("Unhandled exception")
@@ -92,28 +191,19 @@ def create_app():
 
     # ---------- Blueprints ----------
     app.register_blueprint(auth_bp)
+    app.register_blueprint(changes_bp)
+    app.register_blueprint(batch_bp)
 
     # ---------- Helpers ----------
     def save_uploaded_files(files_list):
         saved_files = []
         for f in files_list:
-            if f and allowed_file(f.filename):
-                filename = secure_filename(f.filename)
-                target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                
-                # تأكد من وجود المجلد
-                os.makedirs(os.path.dirname(target), exist_ok=True)
-                
-                base, ext = os.path.splitext(filename)
-                idx = 1
-                while os.path.exists(target):
-                    filename = f"{base}_{idx}{ext}"
-                    target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                    idx += 1
-                
-                f.save(target)
+            if f:
+                filename = uploads.store(f, "image", private=media.is_private("images"))
                 saved_files.append(filename)
-                app.logger.info(f"Saved file: {filename}")
+                app.logger.info("Saved file: %s", filename)
+        # كل الصور بتتجهز بالتوازي في الـ process pool
+        imaging.image_ingest.process(saved_files)
         return saved_files
 
     # ---------- Public Endpoints ----------
@@ -125,17 +215,72 @@ def create_app():
     def health():
         return jsonify({"ok": True, "status": "API running"})
 
+    @app.route("/api/stats")
+    @catalog_cache.cached
+    def get_stats():
+        # قراءة من جدول inventory_summary بس - مفيش scan على الوحدات
+        company_slug = request.args.get("company_slug")
+        project_id = request.args.get("project_id", type=int)
+
+        q = InventorySummary.query.filter_by(scope="company")
+        if company_slug:
+            comp = Company.query.filter_by(slug=company_slug).first()
+            if not comp:
+                return jsonify({"ok": False, "error": "Company not found"}), 404
+            q = q.filter_by(ref_id=comp.id)
+        companies = q.all()
+
+        units_count = sum(row.units_count for row in companies)
+        min_prices = [row.min_price for row in companies if row.min_price is not None]
+        max_prices = [row.max_price for row in companies if row.max_price is not None]
+        totals = {
+            "units_count": units_count,
+            "available": sum(row.available for row in companies),
+            "reserved": sum(row.reserved for row in companies),
+            "sold": sum(row.sold for row in companies),
+            "min_price": min(min_prices, default=None),
+            "max_price": max(max_prices, default=None),
+            "avg_price_per_sqm": (round(sum(row.sum_price_per_sqm for row in companies) / units_count)
+                                  if units_count else None),
+        }
+
+        data = {"totals": totals,
+                "companies": [{"company_id": row.ref_id, **row.to_dict()} for row in companies]}
+        if company_slug or project_id:
+            pq = InventorySummary.query.filter_by(scope="project")
+            if company_slug:
+                pq = pq.filter_by(company_id=comp.id)
+            if project_id:
+                pq = pq.filter_by(ref_id=project_id)
+            data["projects"] = [{"project_id": row.ref_id, **row.to_dict()} for row in pq.all()]
+        return jsonify({"ok": True, "data": data})
+
     # ---------- Companies ----------
     @app.route("/api/companies", methods=["GET"])
+    @catalog_cache.cached
     def get_companies():
-        companies = Company.query.all()
-        res = [c.to_dict() for c in companies]
+        include = serializers.requested_includes(request.args, ("projects", "units"))
+        plan = serializers.COMPANIES.plan(serializers.requested_fields(request.args), extra=("id",))
+        rows = db.session.execute(plan.select()).all()
+        res = [plan.dict(row) for row in rows]
+        if include:
+            serializers.embed_projects(res, [plan.value(row, "id") for row in rows], request.args,
+                                       media.urls(), with_units="units" in include)
         return jsonify({"ok": True, "data": res})
 
     @app.route("/api/companies/<string:slug>", methods=["GET"])
+    @catalog_cache.cached
     def get_company_by_slug(slug):
-        company = Company.query.filter_by(slug=slug).first_or_404()
-        return jsonify({"ok": True, "data": company.to_dict()})
+        include = serializers.requested_includes(request.args, ("projects", "units"))
+        plan = serializers.COMPANIES.plan(serializers.requested_fields(request.args), extra=("id",))
+        row = db.session.execute(plan.select().where(Company.slug == slug)).first()
+        if row is None:
+            abort(404)
+        data = plan.dict(row)
+        if include:
+            serializers.embed_projects([data], [plan.value(row, "id")], request.args,
+                                       media.urls(), with_units="units" in include)
+        return jsonify({"ok": True, "data": data})
 
     @app.route("/api/companies", methods=["POST"])
     @admin_required
@@ -156,8 +301,10 @@ def create_app():
             contact_info=json.dumps(data.get("contact_info", {})) if data.get("contact_info") else None
         )
         db.session.add(c)
+        db.session.flush()
+        record_change("company", c.id, "create", c.to_dict())
         db.session.commit()
-        app.logger.info(f"Company created: {slug}")
+        app.logger.info("Company created: %s", slug)
         return jsonify({"ok": True, "data": c.to_dict()}), 201
 
     @app.route("/api/companies/<int:cid>", methods=["PUT"])
@@ -175,6 +322,8 @@ def create_app():
             c.name = data["name"]
         
         if "logo" in data:
+            if c.logo and c.logo != data["logo"]:
+                upload_gc.release([c.logo])
             c.logo = data["logo"]
         
         if "description" in data:
@@ -183,50 +332,75 @@ def create_app():
         if "contact_info" in data:
             c.contact_info = json.dumps(data["contact_info"]) if data["contact_info"] else None
         
+        record_change("company", c.id, "update", c.to_dict())
         db.session.commit()
-        app.logger.info(f"Company updated: {c.slug}")
+        app.logger.info("Company updated: %s", c.slug)
         return jsonify({"ok": True, "data": c.to_dict()})
 
     @app.route("/api/companies/<int:cid>", methods=["DELETE"])
     @admin_required
     def delete_company(cid):
-        c = Company.query.get_or_404(cid)
-        db.session.delete(c)
+        Company.query.get_or_404(cid)
+        project_ids = select(Project.id).where(Project.company_id == cid)
+        record_deletes_from("unit", select(Unit.id).where(Unit.project_id.in_(project_ids)))
+        record_deletes_from("project", project_ids)
+        record_change("company", cid, "delete")
+        inventory.company_deleted(cid)
+        upload_gc.release_rows(Unit, Unit.project_id.in_(project_ids))
+        upload_gc.release_rows(Project, Project.company_id == cid)
+        upload_gc.release_rows(Company, Company.id == cid)
+        # حذف set-based: 3 statements مهما كان عدد الوحدات، من غير ما نحمل objects
+        db.session.execute(delete(Unit).where(Unit.project_id.in_(project_ids)))
+        db.session.execute(delete(Project).where(Project.company_id == cid))
+        db.session.execute(delete(Company).where(Company.id == cid))
         db.session.commit()
-        app.logger.info(f"Company deleted: {cid}")
+        upload_gc.request_sweep(app)
+        app.logger.info("Company deleted: %s", cid)
         return jsonify({"ok": True, "message": "Company deleted successfully"})
 
     # ---------- Projects ----------
     @app.route("/api/projects", methods=["GET"])
+    @catalog_cache.cached
     def get_projects():
         company_slug = request.args.get("company_slug")
         status = request.args.get("status")
         
-        q = Project.query
+        include = serializers.requested_includes(request.args, ("company", "units"))
+        plan = serializers.PROJECTS.plan(serializers.requested_fields(request.args), extra=("id", "company_id"))
+        q = plan.select()
         if company_slug:
-            comp = Company.query.filter_by(slug=company_slug).first()
-            if not comp:
+            comp_id = db.session.scalar(select(Company.id).where(Company.slug == company_slug))
+            if comp_id is None:
                 return jsonify({"ok": False, "error": "Company not found"}), 404
-            q = q.filter_by(company_id=comp.id)
+            q = q.where(Project.company_id == comp_id)
         
         if status:
-            q = q.filter_by(status=status)
+            q = q.where(Project.status == status)
         
-        items = q.order_by(Project.order.asc().nullslast(), Project.created_at.desc()).all()
-        res = [p.to_dict() for p in items]
-        
-        for project in res:
-            project["images"] = [url_for("uploaded_file", filename=fn, _external=True) 
-                                for fn in project["images"]]
+        rows = db.session.execute(q.order_by(*serializers.PROJECT_ORDER)).all()
+        urls = media.urls()
+        res = [plan.dict(row, urls) for row in rows]
+        if "company" in include:
+            serializers.embed_company(res, [plan.value(row, "company_id") for row in rows], request.args, urls)
+        if "units" in include:
+            serializers.embed_units(res, [plan.value(row, "id") for row in rows], request.args, urls)
         
         return jsonify({"ok": True, "data": res})
 
     @app.route("/api/projects/<int:pid>", methods=["GET"])
+    @catalog_cache.cached
     def get_project(pid):
-        project = Project.query.get_or_404(pid)
-        data = project.to_dict()
-        data["images"] = [url_for("uploaded_file", filename=fn, _external=True) 
-                         for fn in data["images"]]
+        include = serializers.requested_includes(request.args, ("company", "units"))
+        plan = serializers.PROJECTS.plan(serializers.requested_fields(request.args), extra=("company_id",))
+        row = db.session.execute(plan.select().where(Project.id == pid)).first()
+        if row is None:
+            abort(404)
+        urls = media.urls()
+        data = plan.dict(row, urls)
+        if "company" in include:
+            serializers.embed_company([data], [plan.value(row, "company_id")], request.args, urls)
+        if "units" in include:
+            serializers.embed_units([data], [pid], request.args, urls)
         return jsonify({"ok": True, "data": data})
 
     @app.route("/api/projects", methods=["POST"])
@@ -265,6 +439,8 @@ def create_app():
         )
         
         db.session.add(p)
+        db.session.flush()
+        record_change("project", p.id, "create", p.to_dict())
         db.session.commit()
 
         saved_files = []
@@ -276,9 +452,10 @@ def create_app():
                 existing_images = p.get_images()
                 existing_images.extend(saved_files)
                 p.images = json.dumps(existing_images)
+                record_change("project", p.id, "upload", p.to_dict())
                 db.session.commit()
 
-        app.logger.info(f"Project created: {slug}")
+        app.logger.info("Project created: %s", slug)
         return jsonify({"ok": True, "data": p.to_dict()}), 201
 
     @app.route("/api/projects/<int:pid>", methods=["PUT"])
@@ -309,17 +486,25 @@ def create_app():
         if "features" in data:
             p.features = json.dumps(data["features"])
                 
+        record_change("project", p.id, "update", p.to_dict())
         db.session.commit()
-        app.logger.info(f"Project updated: {p.slug}")
+        app.logger.info("Project updated: %s", p.slug)
         return jsonify({"ok": True, "data": p.to_dict()})
 
     @app.route("/api/projects/<int:pid>", methods=["DELETE"])
     @admin_required
     def delete_project(pid):
         p = Project.query.get_or_404(pid)
-        db.session.delete(p)
+        record_deletes_from("unit", select(Unit.id).where(Unit.project_id == pid))
+        record_change("project", pid, "delete")
+        inventory.project_deleted(pid, p.company_id)
+        upload_gc.release_rows(Unit, Unit.project_id == pid)
+        upload_gc.release_rows(Project, Project.id == pid)
+        db.session.execute(delete(Unit).where(Unit.project_id == pid))
+        db.session.execute(delete(Project).where(Project.id == pid))
         db.session.commit()
-        app.logger.info(f"Project deleted: {pid}")
+        upload_gc.request_sweep(app)
+        app.logger.info("Project deleted: %s", pid)
         return jsonify({"ok": True, "message": "Project deleted successfully"})
 
     @app.route("/api/projects/<int:pid>/upload", methods=["POST"])
@@ -336,9 +521,10 @@ def create_app():
             existing_images = p.get_images()
             existing_images.extend(saved_files)
             p.images = json.dumps(existing_images)
+            record_change("project", p.id, "upload", p.to_dict())
             db.session.commit()
 
-        app.logger.info(f"Uploaded {len(saved_files)} files to project {pid}")
+        app.logger.info("Uploaded %s files to project %s", len(saved_files), pid)
         return jsonify({"ok": True, "data": saved_files})
 
     # ---------- Upload Endpoint ----------
@@ -352,25 +538,17 @@ def create_app():
         if file.filename == '':
             return jsonify({"ok": False, "error": "No file selected"}), 400
         
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            
-            base, ext = os.path.splitext(filename)
-            idx = 1
-            while os.path.exists(target):
-                filename = f"{base}_{idx}{ext}"
-                target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                idx += 1
-            
-            file.save(target)
-            app.logger.info(f"File uploaded: {filename}")
-            return jsonify({"ok": True, "filename": filename})
-        
-        return jsonify({"ok": False, "error": "File type not allowed"}), 400
+        # النوع والحجم اتفحصوا وهو بيتكتب (uploads.UploadRequest)
+        filename = uploads.store(file, "file")
+        ingested = imaging.image_ingest.process([filename]).get(filename, {})
+        record_change("file", None, "upload", {"filename": filename})
+        db.session.commit()
+        app.logger.info("File uploaded: %s", filename)
+        return jsonify({"ok": True, "filename": filename, "sha256": ingested.get("sha256") or file.stream.sha256})
 
     # ---------- Units ----------
     @app.route("/api/units", methods=["GET"])
+    @catalog_cache.cached
     def list_units():
         project_id = request.args.get("project_id", type=int)
         min_sqm = request.args.get("min_sqm", type=float)
@@ -379,32 +557,62 @@ def create_app():
         status = request.args.get("status")
         bedrooms = request.args.get("bedrooms", type=int)
         bathrooms = request.args.get("bathrooms", type=int)
+        # مؤشر للمزامنة: الوحدات اللي اتعدلت بعد (updated_since, after_id)
+        updated_since = request.args.get("updated_since")
+        after_id = request.args.get("after_id", type=int)
+        # sort=-updated_at&limit=1 = آخر وحدة اتعدلت: نقطة البداية للمزامنة بساعة السيرفر
+        sort = request.args.get("sort")
+        if sort not in (None, "-updated_at"):
+            return jsonify({"ok": False, "error": "sort must be -updated_at"}), 400
 
-        q = Unit.query
+        include = serializers.requested_includes(request.args, ("project", "company"))
+        extra = ["project_id"]
+        if max_price:
+            extra.append("total_price")
+        if floor:
+            extra.append("floor")
+        plan = serializers.UNITS.plan(serializers.requested_fields(request.args), extra=extra)
+        q = plan.select()
         if project_id:
-            q = q.filter_by(project_id=project_id)
+            q = q.where(Unit.project_id == project_id)
         if min_sqm:
-            q = q.filter(Unit.sqm >= min_sqm)
+            q = q.where(Unit.sqm >= min_sqm)
         if status:
-            q = q.filter_by(status=status)
+            q = q.where(Unit.status == status)
         if bedrooms:
-            q = q.filter(Unit.bedrooms == bedrooms)
+            q = q.where(Unit.bedrooms == bedrooms)
         if bathrooms:
-            q = q.filter(Unit.bathrooms == bathrooms)
+            q = q.where(Unit.bathrooms == bathrooms)
+
+        if updated_since:
+            try:
+                since = datetime.fromisoformat(updated_since)
+            except ValueError:
+                return jsonify({"ok": False, "error": "updated_since must be ISO datetime"}), 400
+            if after_id:
+                q = q.where(or_(Unit.updated_at > since,
+                                and_(Unit.updated_at == since, Unit.id > after_id)))
+            else:
+                q = q.where(Unit.updated_at > since)
+            q = q.order_by(Unit.updated_at.asc(), Unit.id.asc())
+        elif sort:
+            q = q.order_by(Unit.updated_at.desc(), Unit.id.desc())
+        else:
+            q = q.order_by(Unit.created_at.desc())
 
-        items, page, limit = paginate_query(q.order_by(Unit.created_at.desc()))
-        units = [u.to_dict() for u in items]
+        page, limit = page_args()
+        rows = db.session.execute(q.offset((page - 1) * limit).limit(limit)).all()
 
         if max_price:
-            units = [u for u in units if u.get("total_price", float("inf")) <= max_price]
+            rows = [row for row in rows if plan.value(row, "total_price") <= max_price]
         if floor:
-            units = [u for u in units if str(u.get("floor")) == str(floor)]
+            rows = [row for row in rows if str(plan.value(row, "floor")) == str(floor)]
 
-        for unit in units:
-            unit["images"] = [url_for("uploaded_file", filename=fn, _external=True) 
-                             for fn in unit["images"]]
-            if unit["floor_plan"]:
-                unit["floor_plan"] = url_for("uploaded_file", filename=unit["floor_plan"], _external=True)
+        urls = media.urls()
+        units = [plan.dict(row, urls) for row in rows]
+        if include:
+            serializers.embed_project(units, [plan.value(row, "project_id") for row in rows], request.args,
+                                      urls, with_company="company" in include)
 
         return jsonify({
             "ok": True, 
@@ -413,13 +621,18 @@ def create_app():
         })
 
     @app.route("/api/units/<int:uid>", methods=["GET"])
+    @catalog_cache.cached
     def get_unit(uid):
-        u = Unit.query.get_or_404(uid)
-        data = u.to_dict()
-        data["images"] = [url_for("uploaded_file", filename=fn, _external=True) 
-                         for fn in data["images"]]
-        if data["floor_plan"]:
-            data["floor_plan"] = url_for("uploaded_file", filename=data["floor_plan"], _external=True)
+        include = serializers.requested_includes(request.args, ("project", "company"))
+        plan = serializers.UNITS.plan(serializers.requested_fields(request.args), extra=("project_id",))
+        row = db.session.execute(plan.select().where(Unit.id == uid)).first()
+        if row is None:
+            abort(404)
+        urls = media.urls()
+        data = plan.dict(row, urls)
+        if include:
+            serializers.embed_project([data], [plan.value(row, "project_id")], request.args,
+                                      urls, with_company="company" in include)
         return jsonify({"ok": True, "data": data})
 
     @app.route("/api/units", methods=["POST"])
@@ -461,6 +674,9 @@ def create_app():
         )
         
         db.session.add(u)
+        db.session.flush()
+        inventory.unit_changed(None, u)
+        record_change("unit", u.id, "create", u.to_dict())
         db.session.commit()
         
         saved_files = []
@@ -470,30 +686,26 @@ def create_app():
             
             if saved_files:
                 u.images = json.dumps(saved_files)
+                record_change("unit", u.id, "upload", u.to_dict())
                 db.session.commit()
                 
         if "floor_plan" in request.files:
             floor_plan_file = request.files["floor_plan"]
-            if floor_plan_file and allowed_file(floor_plan_file.filename):
-                filename = secure_filename(floor_plan_file.filename)
-                target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                base, ext = os.path.splitext(filename)
-                idx = 1
-                while os.path.exists(target):
-                    filename = f"{base}_{idx}{ext}"
-                    target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                    idx += 1
-                floor_plan_file.save(target)
+            if floor_plan_file:
+                filename = uploads.store(floor_plan_file, "floor_plan", private=media.is_private("floor_plan"))
+                imaging.image_ingest.process([filename])
                 u.floor_plan = filename
+                record_change("unit", u.id, "upload", u.to_dict())
                 db.session.commit()
 
-        app.logger.info(f"Unit created: {code}")
+        app.logger.info("Unit created: %s", code)
         return jsonify({"ok": True, "data": u.to_dict()}), 201
 
     @app.route("/api/units/<int:uid>", methods=["PUT"])
     @admin_required
     def update_unit(uid):
         u = Unit.query.get_or_404(uid)
+        before = inventory.snapshot(u)
         
         if request.content_type and request.content_type.startswith("multipart/form-data"):
             data = request.form.to_dict()
@@ -505,10 +717,21 @@ def create_app():
                         pass
         else:
             data = request.get_json() or {}
+
+        if data.get("version") is not None and str(data["version"]) != str(u.version):
+            return jsonify({"ok": False, "error": "Unit was modified, reload and retry",
+                            "data": {"status": u.status, "version": u.version}}), 409
+        if data.get("status") == "reserved" and u.status != "reserved":
+            # الحجز لازم يبقى ليه صاحب ومدة عشان الـ sweeper يرجعه - بيتعمل من /reserve بس
+            return jsonify({"ok": False, "error": f"Use POST /api/units/{uid}/reserve to reserve a unit",
+                            "data": {"status": u.status, "version": u.version}}), 409
             
         for field in ["code", "title", "floor", "status"]:
             if field in data and data[field] is not None:
                 setattr(u, field, str(data[field]))
+
+        if u.status != "reserved":
+            u.reserved_by = u.reserved_until = None
                 
         if "sqm" in data and data["sqm"] is not None:
             u.sqm = float(data["sqm"])
@@ -539,31 +762,112 @@ def create_app():
                 
         if "floor_plan" in request.files:
             floor_plan_file = request.files["floor_plan"]
-            if floor_plan_file and allowed_file(floor_plan_file.filename):
-                filename = secure_filename(floor_plan_file.filename)
-                target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                base, ext = os.path.splitext(filename)
-                idx = 1
-                while os.path.exists(target):
-                    filename = f"{base}_{idx}{ext}"
-                    target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                    idx += 1
-                floor_plan_file.save(target)
+            if floor_plan_file:
+                filename = uploads.store(floor_plan_file, "floor_plan", private=media.is_private("floor_plan"))
+                imaging.image_ingest.process([filename])
+                upload_gc.release([u.floor_plan])
                 u.floor_plan = filename
         
+        db.session.flush()
+        inventory.unit_changed(before, u)
+        record_change("unit", u.id, "update", u.to_dict())
         db.session.commit()
-        app.logger.info(f"Unit updated: {u.code}")
+        app.logger.info("Unit updated: %s", u.code)
         return jsonify({"ok": True, "data": u.to_dict()})
 
     @app.route("/api/units/<int:uid>", methods=["DELETE"])
     @admin_required
     def delete_unit(uid):
         u = Unit.query.get_or_404(uid)
+        before = inventory.snapshot(u)
+        record_change("unit", uid, "delete")
+        upload_gc.release_rows(Unit, Unit.id == uid)
         db.session.delete(u)
+        db.session.flush()
+        inventory.unit_changed(before, None)
         db.session.commit()
-        app.logger.info(f"Unit deleted: {uid}")
+        upload_gc.request_sweep(app)
+        app.logger.info("Unit deleted: %s", uid)
         return jsonify({"ok": True, "message": "Unit deleted successfully"})
 
+    @app.route("/api/units/batch", methods=["POST"])
+    @admin_required
+    def batch_units():
+        # إضافة/حذف مجموعة وحدات في ترانزاكشن واحدة - كله أو لا شيء
+        data = request.get_json() or {}
+        create_items = data.get("create") or []
+        delete_ids = data.get("delete") or []
+        if not isinstance(create_items, list) or not isinstance(delete_ids, list):
+            return jsonify({"ok": False, "error": "create/delete must be lists"}), 400
+        if not create_items and not delete_ids:
+            return jsonify({"ok": False, "error": "Nothing to do"}), 400
+
+        errors = []
+        new_units = []
+        for idx, item in enumerate(create_items):
+            if not isinstance(item, dict):
+                errors.append({"index": idx, "error": "invalid item"})
+                continue
+            if not all(item.get(k) not in (None, "") for k in ["project_id", "code", "sqm", "price_per_sqm", "floor"]):
+                errors.append({"index": idx, "error": "project_id, code, sqm, price_per_sqm, floor required"})
+                continue
+            try:
+                new_units.append((idx, Unit(
+                    project_id=int(item["project_id"]),
+                    code=str(item["code"]),
+                    sqm=float(item["sqm"]),
+                    price_per_sqm=int(item["price_per_sqm"]),
+                    floor=str(item["floor"]),
+                    title=item.get("title"),
+                    bedrooms=int(item.get("bedrooms") or 0),
+                    bathrooms=int(item.get("bathrooms") or 0),
+                    amenities=json.dumps(item.get("amenities", [])),
+                    unit_metadata=json.dumps(item.get("metadata", {})),
+                    status=item.get("status") or "available"
+                )))
+            except (TypeError, ValueError) as e:
+                errors.append({"index": idx, "error": str(e)})
+
+        project_ids = {u.project_id for _, u in new_units}
+        known_projects = {
+            pid for (pid,) in db.session.query(Project.id).filter(Project.id.in_(project_ids)).all()
+        } if project_ids else set()
+        for idx, u in new_units:
+            if u.project_id not in known_projects:
+                errors.append({"index": idx, "error": "Project not found"})
+        new_units = [u for _, u in new_units]
+
+        try:
+            delete_ids = [int(i) for i in delete_ids]
+        except (TypeError, ValueError):
+            return jsonify({"ok": False, "error": "delete ids must be integers"}), 400
+
+        if errors:
+            return jsonify({"ok": False, "error": "Validation failed", "errors": errors}), 400
+
+        deleted = 0
+        touched_projects = set(known_projects)
+        if delete_ids:
+            rows = db.session.query(Unit.id, Unit.project_id).filter(Unit.id.in_(delete_ids)).all()
+            existing = [uid for uid, _ in rows]
+            touched_projects.update(pid for _, pid in rows)
+            upload_gc.release_rows(Unit, Unit.id.in_(existing))
+            deleted = Unit.query.filter(Unit.id.in_(existing)).delete(synchronize_session=False)
+            record_deletes("unit", existing)
+        db.session.add_all(new_units)
+        db.session.flush()
+        created = [{"id": u.id, "code": u.code} for u in new_units]
+        for u in new_units:
+            record_change("unit", u.id, "create", u.to_dict())
+        # دفعة كبيرة: إعادة حساب المشاريع المتأثرة أرخص من تعديل وحدة وحدة
+        inventory.refresh_projects(touched_projects)
+        db.session.commit()
+        if deleted:
+            upload_gc.request_sweep(app)
+
+        app.logger.info("Batch units: %s created, %s deleted", len(created), deleted)
+        return jsonify({"ok": True, "data": {"created": created, "deleted": deleted}})
+
     @app.route("/api/units/<int:uid>/upload", methods=["POST"])
     @admin_required
     def upload_unit_files(uid):
@@ -583,47 +887,153 @@ def create_app():
                 
         if "floor_plan" in request.files:
             floor_plan_file = request.files["floor_plan"]
-            if floor_plan_file and allowed_file(floor_plan_file.filename):
-                filename = secure_filename(floor_plan_file.filename)
-                target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                base, ext = os.path.splitext(filename)
-                idx = 1
-                while os.path.exists(target):
-                    filename = f"{base}_{idx}{ext}"
-                    target = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                    idx += 1
-                floor_plan_file.save(target)
+            if floor_plan_file:
+                filename = uploads.store(floor_plan_file, "floor_plan", private=media.is_private("floor_plan"))
+                imaging.image_ingest.process([filename])
+                upload_gc.release([u.floor_plan])
                 u.floor_plan = filename
                 saved_files.append(filename)
 
+        db.session.flush()
+        record_change("unit", u.id, "upload", u.to_dict())
         db.session.commit()
-        app.logger.info(f"Uploaded {len(saved_files)} files to unit {uid}")
+        app.logger.info("Uploaded %s files to unit %s", len(saved_files), uid)
         return jsonify({"ok": True, "data": saved_files})
 
+    # ---------- Resumable uploads (resumable.py) ----------
+    @app.route("/api/uploads/resumable", methods=["POST"])
+    @admin_required
+    def create_resumable_upload():
+        data = request.get_json() or {}
+        attach = None
+        spec = data.get("attach")
+        if spec:
+            entity = field = None
+            if isinstance(spec, dict):
+                entity = "unit" if "unit_id" in spec else "project" if "project_id" in spec else None
+                field = spec.get("field")
+            if entity is None or field not in resumable.FIELDS[entity]:
+                return jsonify({"ok": False, "error": "attach needs project_id or unit_id and a field "
+                                                      "(images, videos or floor_plan for units)"}), 400
+            target = (Unit if entity == "unit" else Project).query.get_or_404(spec[f"{entity}_id"])
+            attach = (entity, target.id, field)
+
+        state = resumable.create(app.config["UPLOAD_FOLDER"], data.get("filename"), data.get("size"),
+                                 app.config["RESUMABLE_MAX_BYTES"], attach)
+        app.logger.info("Resumable upload %s started: %s (%s bytes)", state["id"], state["filename"], state["size"])
+        response = jsonify({"ok": True, "data": {"id": state["id"], "offset": 0, "size": state["size"]}})
+        response.headers["Location"] = f"/api/uploads/resumable/{state['id']}"
+        response.headers["Upload-Offset"] = "0"
+        return response, 201
+
+    def resumable_response(state, offset):
+        response = jsonify({"ok": True, "data": {"id": state["id"], "offset": offset, "size": state["size"]}})
+        response.headers["Upload-Offset"] = str(offset)
+        response.headers["Upload-Length"] = str(state["size"])
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    # HEAD بيرجع نفس الـ headers من غير body
+    @app.route("/api/uploads/resumable/<upload_id>", methods=["GET"])
+    @admin_required
+    def resumable_upload_status(upload_id):
+        state = resumable.load(app.config["UPLOAD_FOLDER"], upload_id)
+        return resumable_response(state, state["offset"])
+
+    @app.route("/api/uploads/resumable/<upload_id>", methods=["PATCH"])
+    @admin_required
+    def append_resumable_upload(upload_id):
+        state = resumable.load(app.config["UPLOAD_FOLDER"], upload_id)
+        offset = request.headers.get("Upload-Offset", type=int)
+        if offset is None:
+            return jsonify({"ok": False, "error": "Upload-Offset header required"}), 400
+        if request.mimetype not in ("application/offset+octet-stream", "application/octet-stream"):
+            return jsonify({"ok": False, "error": "Content-Type must be application/offset+octet-stream"}), 415
+        offset = resumable.append(app.config["UPLOAD_FOLDER"], state, offset, request.stream)
+        return resumable_response(state, offset)
+
+    @app.route("/api/uploads/resumable/<upload_id>/complete", methods=["POST"])
+    @admin_required
+    def complete_resumable_upload(upload_id):
+        state = resumable.load(app.config["UPLOAD_FOLDER"], upload_id)
+        target = field = None
+        if state["attach"]:
+            entity, ref_id, field = state["attach"]
+            target = (Unit if entity == "unit" else Project).query.get_or_404(ref_id)
+
+        filename = resumable.finish(app.config["UPLOAD_FOLDER"], state,
+                                    private=field is not None and media.is_private(field))
+        if uploads.allowed_file(filename):
+            imaging.image_ingest.process([filename])
+        metrics.record_upload(field or "file", os.path.join(app.config["UPLOAD_FOLDER"], filename))
+        if target is None:
+            record_change("file", None, "upload", {"filename": filename})
+        else:
+            if field == "floor_plan":
+                upload_gc.release([target.floor_plan])
+                target.floor_plan = filename
+            else:
+                items = getattr(target, f"get_{field}")()
+                items.append(filename)
+                setattr(target, field, json.dumps(items))
+            db.session.flush()
+            record_change(entity, target.id, "upload", target.to_dict())
+        db.session.commit()
+        app.logger.info("Resumable upload %s finished: %s", upload_id, filename)
+        return jsonify({"ok": True, "filename": filename, "data": target.to_dict() if target else None})
+
+    @app.route("/api/uploads/resumable/<upload_id>", methods=["DELETE"])
+    @admin_required
+    def cancel_resumable_upload(upload_id):
+        resumable.load(app.config["UPLOAD_FOLDER"], upload_id)
+        resumable.discard(app.config["UPLOAD_FOLDER"], upload_id)
+        return jsonify({"ok": True})
+
     # Serve uploaded files - مع handling للأخطاء
-    @app.route("/api/uploads/<path:filename>")
+    @app.route(media.UPLOADS_PATH + "<path:filename>")
     def uploaded_file(filename):
+        # .upload-*.part و .resumable/ ملفات لسه بتترفع
+        if any(part.startswith(".") for part in filename.split("/")):
+            return jsonify({"ok": False, "error": "File not found"}), 404
+        if not media.verify(filename, request.args.get("e"), request.args.get("s")):
+            return jsonify({"ok": False, "error": "Invalid or expired link"}), 403
         try:
             return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
         except FileNotFoundError:
-            app.logger.warning(f"File not found: {filename}")
+            app.logger.warning("File not found: %s", filename)
             return jsonify({"ok": False, "error": "File not found"}), 404
 
-    # ---------- App context initialization ----------
-    with app.app_context():
-        db.create_all()
-        admin_user = os.getenv("ADMIN_DEFAULT_USER", "admin")
-        admin_pass = os.getenv("ADMIN_DEFAULT_PASS", "admin123")
-        if not User.query.filter_by(username=admin_user).first():
-            u = User(username=admin_user, role="admin")
-            u.set_password(admin_pass)
-            db.session.add(u)
-            db.session.commit()
-            app.logger.info("Created default admin user '%s'", admin_user)
+    # ---------- Admin: profiles ----------
+    @app.get("/api/admin/profiles")
+    @admin_required
+    def list_profiles():
+        return jsonify({"ok": True, "data": app.extensions["profiles"].list()})
+
+    @app.get("/api/admin/profiles/<int:pid>")
+    @admin_required
+    def get_profile(pid):
+        entry = app.extensions["profiles"].get(pid)
+        if entry is None:
+            return jsonify({"ok": False, "error": "Profile not found"}), 404
+        return jsonify({"ok": True, "data": entry})
+
+    @app.delete("/api/admin/profiles")
+    @admin_required
+    def clear_profiles():
+        app.extensions["profiles"].clear()
+        return jsonify({"ok": True})
 
     return app
 
 if __name__ == "__main__":
     from waitress import serve
     app = create_app()
-    serve(app, host="127.0.0.1", port=5000)
\ No newline at end of file
+    with app.app_context():
+        bootstrap()
+    inventory.start_reconciler(app, int(os.getenv("STATS_RECONCILE_INTERVAL", "3600")))
+    app.extensions["upload_gc"].start()
+    reservations.start_sweeper(app, app.config["RESERVATION_SWEEP_INTERVAL"])
+    app.logger.info("Starting API app")
+    # threads كفاية للـ streams المفتوحة + الـ requests العادية
+    threads = max(int(os.getenv("SERVER_THREADS", 16)), app.config["CHANGES_MAX_STREAMS"] + 8)
+    serve(app, host="127.0.0.1", port=5000, threads=threads)
\ No newline at end of file
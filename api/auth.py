@@ -4,18 +4,19 @@ from flask_jwt_extended import (
     create_access_token, 
     create_refresh_token,
     get_jwt_identity, 
-    jwt_required, 
     get_jwt,
     JWTManager
 )
 from models import db, User
+from security import HasherBusy, password_hasher, login_limiter
+from tokens import token_required, revoke_token, revoke_encoded_token
 from datetime import timedelta
 import os
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
 @auth_bp.post("/register")
-@jwt_required()
+@token_required()
 def register():
     try:
         claims = get_jwt()
@@ -58,10 +59,32 @@ def login():
         if not username or not password:
             return jsonify({"ok": False, "error": "Username and password required"}), 400
 
+        ip = request.remote_addr or "unknown"
+        retry_after = login_limiter.retry_after(username, ip)
+        if retry_after:
+            resp = jsonify({"ok": False, "error": "Too many failed attempts", "retry_after": retry_after})
+            return resp, 429, {"Retry-After": str(retry_after)}
+
         u = User.query.filter_by(username=username).first()
-        if not u or not u.check_password(password):
+        try:
+            valid = u is not None and password_hasher.verify(u.password_hash, password)
+        except HasherBusy:
+            return jsonify({"ok": False, "error": "Server busy, try again"}), 503, {"Retry-After": "1"}
+
+        if not valid:
+            login_limiter.record_failure(username, ip)
             return jsonify({"ok": False, "error": "Invalid credentials"}), 401
 
+        login_limiter.record_success(username, ip)
+
+        # ترقية الهاش القديم لسياسة الهاش الحالية بعد نجاح الدخول
+        if password_hasher.needs_rehash(u.password_hash):
+            try:
+                u.password_hash = password_hasher.hash(password)
+                db.session.commit()
+            except HasherBusy:
+                pass
+
         access_token = create_access_token(
             identity=str(u.id), 
             additional_claims={
@@ -95,7 +118,7 @@ def login():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 @auth_bp.get("/verify")
-@jwt_required()
+@token_required()
 def verify_token():
     try:
         claims = get_jwt()
@@ -117,7 +140,7 @@ def verify_token():
         return jsonify({"ok": False, "error": str(e)}), 401
 
 @auth_bp.post('/refresh')
-@jwt_required(refresh=True)
+@token_required(refresh=True)
 def refresh():
     try:
         claims = get_jwt()
@@ -144,9 +167,18 @@ def refresh():
         return jsonify({"ok": False, "error": str(e)}), 401
 
 @auth_bp.post('/logout')
-@jwt_required()
+@token_required()
 def logout():
     try:
+        revoke_token(get_jwt())
+        # لو العميل بعت الـ refresh token نلغيه كمان
+        refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+        if refresh_token:
+            try:
+                revoke_encoded_token(refresh_token)
+            except Exception:
+                pass  # توكن غير صالح - لا يوجد شيء لإلغائه
+
         return jsonify({
             "ok": True, 
             "message": "Logged out successfully"
@@ -0,0 +1,172 @@
+# api/batch.py - POST /api/batch: كذا request في round trip واحد
+#
+#   {"requests": [
+#       {"method": "GET", "path": "/api/units/5", "query": {"fields": "id,project_id"}},
+#       {"method": "GET", "path": "/api/projects/{{0.data.project_id}}", "query": {"include": "company"}}
+#   ]}
+#
+# كل sub-request بيتنفذ جوه نفس العملية (من غير HTTP) وبنفس الـ Authorization،
+# بالترتيب، وفي نفس الـ DB session. {{N.data.field}} بتاخد قيمة من نتيجة request قبلها.
+# لو كلهم GET بيشوفوا snapshot واحدة من الداتابيز.
+#
+# مسموح بس الـ endpoints اللي في ENDPOINTS (الكتالوج، الحجز، صفحات /api/changes). أي
+# حاجة تانية (SSE، رفع ملفات، auth، admin) أو response بيتبعت stream بياخد 400 في
+# مكانه من غير ما يتقري - الـ stream كان هيمسك الـ worker لحد الـ timeout.
+import re
+
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.test import EnvironBuilder
+
+from models import db
+
+batch_bp = Blueprint("batch", __name__, url_prefix="/api")
+
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+# الـ headers اللي الـ sub-request بياخدها من الـ batch نفسه
+INHERITED_HEADERS = ("Authorization", "Accept-Language", "User-Agent")
+REFERENCE = re.compile(r"\{\{(\d+)((?:\.[A-Za-z0-9_]+)*)\}\}")
+# الـ endpoints اللي الـ batch يقدر ينادي عليها
+ENDPOINTS = frozenset((
+    "health", "get_stats", "changes.list_changes",
+    "get_companies", "get_company_by_slug", "create_company", "update_company", "delete_company",
+    "get_projects", "get_project", "create_project", "update_project", "delete_project",
+    "list_units", "get_unit", "create_unit", "update_unit", "delete_unit", "batch_units",
+    "reservations.reserve_unit", "reservations.release_unit",
+))
+
+
+class UnresolvedReference(Exception):
+    pass
+
+
+def _lookup(results, index, path):
+    if index >= len(results):
+        raise UnresolvedReference(f"{{{{{index}{path}}}}} refers to a later request")
+    if results[index]["status"] >= 400:
+        raise UnresolvedReference(f"request {index} failed with status {results[index]['status']}")
+    value = results[index]["body"]
+    for key in path.split(".")[1:]:
+        if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        elif isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            raise UnresolvedReference(f"{{{{{index}{path}}}}} not found")
+    if isinstance(value, (dict, list)) or value is None:
+        raise UnresolvedReference(f"{{{{{index}{path}}}}} is not a scalar")
+    return str(value)
+
+
+def _resolve(value, results):
+    if not isinstance(value, str):
+        return value
+    return REFERENCE.sub(lambda m: _lookup(results, int(m.group(1)), m.group(2)), value)
+
+
+def _begin_snapshot():
+    """Make the rest of this session's reads see one consistent database state."""
+    if db.session().in_transaction():
+        db.session.rollback()
+    if db.engine.dialect.name == "sqlite":
+        # pysqlite مش بيفتح transaction للـ SELECT - من غير BEGIN كل query بتشوف أحدث حاجة
+        conn = db.session.connection()
+        if not conn.connection.dbapi_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN")
+    else:
+        db.session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _rejected(method, path, reason):
+    return 400, {"ok": False, "error": "Bad Request", "message": f"{method} {path} {reason}"}
+
+
+def _dispatch(method, path, query, body):
+    app = current_app._get_current_object()
+    headers = {name: request.headers[name] for name in INHERITED_HEADERS if name in request.headers}
+    builder = EnvironBuilder(
+        path=path, method=method, query_string=query or None, headers=headers, base_url=request.host_url,
+        json=body if method != "GET" and body is not None else None,
+        environ_overrides={"REMOTE_ADDR": request.remote_addr},
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+    # نفس الـ app context (ونفس db.session)؛ الـ before/after_request hooks للـ batch نفسه بس
+    with app.request_context(environ):
+        # الـ route اتعمله match وقت الـ push؛ 404/405 بيطلعوا من dispatch_request تحت
+        if request.url_rule is not None and request.url_rule.endpoint not in ENDPOINTS:
+            return _rejected(method, path, "is not available in a batch")
+        try:
+            rv = app.dispatch_request()
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        response = app.make_response(rv)
+    try:
+        if response.is_streamed:
+            return _rejected(method, path, "returns a stream, which a batch can't include")
+        return response.status_code, response.get_json(silent=True)
+    finally:
+        response.close()
+
+
+@batch_bp.post("/batch")
+def run_batch():
+    data = request.get_json(silent=True)
+    items = data.get("requests") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"ok": False, "error": "requests must be a non-empty list"}), 400
+    limit = current_app.config["BATCH_MAX_REQUESTS"]
+    if len(items) > limit:
+        return jsonify({"ok": False, "error": f"At most {limit} requests per batch"}), 400
+
+    errors = []
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": idx, "error": "invalid item"})
+            continue
+        method = str(item.get("method") or "GET").upper()
+        path = item.get("path")
+        if method not in METHODS:
+            errors.append({"index": idx, "error": f"method must be one of {', '.join(METHODS)}"})
+        elif not isinstance(path, str) or not path.startswith("/api/") or path.startswith("/api/batch"):
+            errors.append({"index": idx, "error": "path must be an /api/ endpoint other than /api/batch"})
+        elif not isinstance(item.get("query", {}), (dict, str)):
+            errors.append({"index": idx, "error": "query must be an object or a query string"})
+    if errors:
+        return jsonify({"ok": False, "error": "Validation failed", "errors": errors}), 400
+
+    read_only = all(str(item.get("method") or "GET").upper() == "GET" for item in items)
+    if read_only:
+        _begin_snapshot()
+        g.db_snapshot = True
+
+    results = []
+    try:
+        for idx, item in enumerate(items):
+            method = str(item.get("method") or "GET").upper()
+            query = item.get("query") or {}
+            try:
+                path = _resolve(item["path"], results)
+                if isinstance(query, dict):
+                    query = {key: _resolve(value, results) for key, value in query.items()}
+                else:
+                    query = _resolve(query, results)
+            except UnresolvedReference as e:
+                results.append({"status": 424, "body": {"ok": False, "error": "Failed Dependency",
+                                                        "message": str(e)}})
+                continue
+            status, body = _dispatch(method, path, query, item.get("body"))
+            if status >= 500 and not read_only:
+                # الـ session ممكن تكون في حالة فشل - الـ requests اللي بعدها تبدأ من جديد
+                db.session.rollback()
+            results.append({"status": status, "body": body})
+    finally:
+        if read_only:
+            g.pop("db_snapshot", None)
+            db.session.rollback()
+
+    for item, result in zip(items, results):
+        if "id" in item:
+            result["id"] = item["id"]
+    return jsonify({"ok": True, "data": results})
@@ -0,0 +1,320 @@
+# api/benchmarks/bench_api.py - throughput و p50/p99 لكل endpoint على أحجام كتالوج مختلفة
+#
+#   cd api
+#   python benchmarks/bench_api.py                                  # 10 و 1k وحدة، test client
+#   python benchmarks/bench_api.py --scales 10,1k,100k --mode client,socket --out bench.json
+#   python benchmarks/compare.py old.json bench.json                # مقارنة بين commitين
+import argparse
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+os.environ["LOG_FILE"] = ""
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-bench-secret-bench-secret")
+# نقيس الـ queries نفسها مش كاش الكتالوج (CATALOG_CACHE_SIZE=512 عشان تقيس الكاش)
+os.environ.setdefault("CATALOG_CACHE_SIZE", "0")
+# الـ PNG بتاع الـ upload هنا مش صورة حقيقية - الـ ingest بيتقاس لوحده (cli.py normalize-images)
+os.environ.setdefault("IMAGE_INGEST", "0")
+
+# صورة PNG صغيرة (~20KB) للـ upload
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(20 * 1024)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, elapsed, errors):
+    values = sorted(latencies)
+    return {
+        "n": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+# ---------- Cases ----------
+# كل case بترجع dict فيه method/path و json أو file اختياري
+
+def build_cases(ids, batch_size):
+    unit_ids = ids["unit_ids"]
+    project_ids = ids["project_ids"]
+    slugs = ids["company_slugs"]
+    pages = max(1, len(unit_ids) // 50)
+    codes = itertools.count()
+    created = deque()
+
+    def batch_create(rng):
+        pid = rng.choice(project_ids)
+        items = [{"project_id": pid, "code": f"BB-{next(codes)}", "sqm": 100, "price_per_sqm": 20000, "floor": "1"}
+                 for _ in range(batch_size)]
+        return {"method": "POST", "path": "/api/units/batch", "json": {"create": items},
+                "on_json": lambda body: created.append([c["id"] for c in body["data"]["created"]])}
+
+    def batch_delete(rng):
+        chunk = created.popleft() if created else []
+        return {"method": "POST", "path": "/api/units/batch", "json": {"delete": chunk or [0]}}
+
+    read = [
+        ("health", lambda rng: {"method": "GET", "path": "/api/health"}),
+        ("companies", lambda rng: {"method": "GET", "path": "/api/companies"}),
+        ("company", lambda rng: {"method": "GET", "path": f"/api/companies/{rng.choice(slugs)}"}),
+        ("projects", lambda rng: {"method": "GET", "path": "/api/projects"}),
+        ("projects_by_company", lambda rng: {"method": "GET", "path": f"/api/projects?company_slug={rng.choice(slugs)}"}),
+        ("project", lambda rng: {"method": "GET", "path": f"/api/projects/{rng.choice(project_ids)}"}),
+        ("units_page", lambda rng: {"method": "GET", "path": f"/api/units?limit=50&page={rng.randint(1, pages)}"}),
+        ("units_by_project", lambda rng: {"method": "GET", "path": f"/api/units?project_id={rng.choice(project_ids)}&limit=50"}),
+        ("units_filtered", lambda rng: {"method": "GET",
+                                        "path": f"/api/units?bedrooms={rng.randint(1, 5)}&status=available&limit=50"}),
+        ("unit", lambda rng: {"method": "GET", "path": f"/api/units/{rng.choice(unit_ids)}"}),
+        ("changes", lambda rng: {"method": "GET", "path": "/api/changes?since=0&limit=100"}),
+    ]
+    write = [
+        ("units_batch_create", batch_create),
+        ("units_batch_delete", batch_delete),
+        ("upload", lambda rng: {"method": "POST", "path": "/api/upload", "file": ("file", "bench.png", PNG)}),
+    ]
+    return read, write
+
+
+# ---------- Runners ----------
+
+class ClientRunner:
+    """In-process Flask test client: measures the app, not the network."""
+    mode = "client"
+
+    def __init__(self, app, headers):
+        self.client = app.test_client()
+        self.headers = headers
+        self._local = threading.local()
+
+    def _client(self):
+        # test client مش thread-safe - واحد لكل thread
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.client.application.test_client()
+        return client
+
+    def do(self, req):
+        kwargs = {"method": req["method"], "headers": {**self.headers, **req.get("headers", {})}}
+        if "json" in req:
+            kwargs["json"] = req["json"]
+        if "file" in req:
+            field, name, content = req["file"]
+            kwargs["data"] = {field: (io.BytesIO(content), name)}
+            kwargs["content_type"] = "multipart/form-data"
+        response = self._client().open(req["path"], **kwargs)
+        if "on_json" in req and response.status_code < 400:
+            req["on_json"](response.get_json())
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class SocketRunner:
+    """Real HTTP over localhost against waitress (or werkzeug if missing)."""
+    mode = "socket"
+
+    def __init__(self, app, headers, threads):
+        import requests
+
+        self._requests = requests
+        self.headers = headers
+        self._local = threading.local()
+        try:
+            from waitress.server import create_server
+            self.server = create_server(app, host="127.0.0.1", port=0, threads=threads)
+            port = self.server.effective_port
+            self._thread = threading.Thread(target=self.server.run, daemon=True)
+            self._stop = self.server.close
+        except ImportError:
+            from werkzeug.serving import make_server
+            self.server = make_server("127.0.0.1", 0, app, threaded=True)
+            port = self.server.server_port
+            self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+            self._stop = self.server.shutdown
+        self._thread.start()
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def do(self, req):
+        kwargs = {"headers": req.get("headers")}
+        if "json" in req:
+            kwargs["json"] = req["json"]
+        if "file" in req:
+            field, name, content = req["file"]
+            kwargs["files"] = {field: (name, content, "image/png")}
+        response = self._session().request(req["method"], self.base_url + req["path"], **kwargs)
+        if "on_json" in req and response.status_code < 400:
+            req["on_json"](response.json())
+        return response.status_code
+
+    def close(self):
+        self._stop()
+
+
+def measure(runner, make_request, requests, concurrency, warmup, seed=7):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    for _ in range(warmup):
+        runner.do(make_request(rng))
+
+    latencies = []
+    errors = 0
+    remaining = itertools.count()
+
+    def worker(worker_id):
+        nonlocal errors
+        local_rng = random.Random(seed * 1000 + worker_id)
+        local = []
+        local_errors = 0
+        while next(remaining) < requests:
+            with lock:
+                req = make_request(local_rng)
+            start = time.perf_counter()
+            try:
+                status = runner.do(req)
+            except Exception:
+                status = 599
+            local.append(time.perf_counter() - start)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        worker(0)
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+# ---------- Main ----------
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def setup_app(units, workdir):
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from cli import bootstrap
+    from benchmarks.synthetic import generate_catalog
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench_{units}.db"
+    app = create_app()
+    # سطر اللوج لكل request بيتكتب على الـ terminal بشكل متزامن - مش جزء من اللي بنقيسه
+    app.logger.setLevel(logging.WARNING)
+    app.config["UPLOAD_FOLDER"] = os.path.join(workdir, f"uploads_{units}")
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    with app.app_context():
+        bootstrap()
+        started = time.perf_counter()
+        ids = generate_catalog(units)
+        print(f"  seeded {units} units in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        token = create_access_token(identity="1", additional_claims={"role": "admin", "type": "access"})
+    return app, ids, {"Authorization": f"Bearer {token}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API throughput/latency benchmarks")
+    parser.add_argument("--scales", default="10,1k", help="unit counts: 10, 1k, 100k or a number")
+    parser.add_argument("--mode", default="client", help="client, socket or client,socket")
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per read case")
+    parser.add_argument("--write-requests", type=int, default=50, help="timed requests per write case")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads (socket mode)")
+    parser.add_argument("--threads", type=int, default=8, help="server threads (socket mode)")
+    parser.add_argument("--batch-size", type=int, default=100, help="units per batch request")
+    parser.add_argument("--only", help="comma separated case names")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    from benchmarks.synthetic import parse_scale
+
+    only = set(args.only.split(",")) if args.only else None
+    modes = args.mode.split(",")
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    results = []
+
+    for scale in args.scales.split(","):
+        units = parse_scale(scale)
+        print(f"scale {scale} ({units} units)", file=sys.stderr)
+        app, ids, headers = setup_app(units, workdir)
+        read, write = build_cases(ids, args.batch_size)
+
+        for mode in modes:
+            runner = ClientRunner(app, headers) if mode == "client" else SocketRunner(app, headers, args.threads)
+            concurrency = args.concurrency if mode == "socket" else 1
+            try:
+                for kind, cases, n in (("read", read, args.requests), ("write", write, args.write_requests)):
+                    for name, make_request in cases:
+                        if only and name not in only:
+                            continue
+                        stats = measure(runner, make_request, n, concurrency,
+                                        min(args.warmup, n) if kind == "read" else 0)
+                        row = {"case": name, "kind": kind, "scale": scale, "units": units,
+                               "mode": mode, "concurrency": concurrency, **stats}
+                        results.append(row)
+                        print(f"  {mode:<6} {name:<20} {stats['throughput_rps']:>8.1f} req/s  "
+                              f"p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms"
+                              + (f"  errors {stats['errors']}" if stats["errors"] else ""))
+            finally:
+                runner.close()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
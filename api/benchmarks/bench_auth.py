@@ -0,0 +1,65 @@
+# api/benchmarks/bench_auth.py - قياس تكلفة admin_required لكل طلب
+#
+#   cd api
+#   python benchmarks/bench_auth.py [iterations]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_auth.db")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-bench-secret-bench-secret")
+
+from flask import jsonify  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import create_app, admin_required  # noqa: E402
+
+
+def run(client, path, headers, iterations, rounds=3):
+    for _ in range(200):
+        client.get(path, headers=headers)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.get(path, headers=headers)
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = create_app()
+
+    @app.get("/bench/open")
+    def bench_open():
+        return jsonify({"ok": True})
+
+    @app.get("/bench/admin")
+    @admin_required
+    def bench_admin():
+        return jsonify({"ok": True})
+
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin", "type": "access"})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = app.test_client()
+    cache = app.extensions["token_cache"]
+
+    baseline = run(client, "/bench/open", headers, iterations)
+    cached = run(client, "/bench/admin", headers, iterations)
+    size, cache.size = cache.size, 0
+    cache._items.clear()
+    uncached = run(client, "/bench/admin", headers, iterations)
+    cache.size = size
+
+    print(f"iterations:            {iterations}")
+    print(f"no auth:               {baseline:8.1f} us/req")
+    print(f"admin_required cached: {cached:8.1f} us/req  (+{cached - baseline:.1f})")
+    print(f"admin_required full:   {uncached:8.1f} us/req  (+{uncached - baseline:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# api/benchmarks/bench_reserve.py - مئات المحاولات المتزامنة لحجز نفس الوحدة
+#
+#   cd api
+#   python benchmarks/bench_reserve.py --attempts 300 --rounds 10
+#   python benchmarks/bench_reserve.py --mode socket --threads 16
+#   python benchmarks/bench_reserve.py --database-url postgresql://bench@localhost/bench
+#
+# كل round: وحدة متاحة، --attempts threads كل واحد بـ token مستخدم مختلف بيستنوا على
+# barrier وبيبعتوا POST /reserve في نفس اللحظة. المفروض واحد بالظبط ياخد 200 والباقي
+# 409؛ أي حاجة تانية (اتنين كسبوا، 500، database is locked) بتتعد كـ violation.
+# في الآخر inventory reconcile لازم يلاقي الملخصات مظبوطة (drift = 0).
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+os.environ.setdefault("CATALOG_CACHE_SIZE", "0")
+
+from benchmarks.bench_api import ClientRunner, SocketRunner, summarize  # noqa: E402
+
+
+def setup_app(database_url, units):
+    import logging
+    from app import create_app
+    from cli import bootstrap
+    from benchmarks.synthetic import generate_catalog
+
+    os.environ["DATABASE_URL"] = database_url
+    app = create_app()
+    # 199 من 200 request بيستنوا الـ write lock - سطر slow request لكل واحد مش مفيد هنا
+    app.logger.setLevel(logging.ERROR)
+    with app.app_context():
+        bootstrap()
+        ids = generate_catalog(units)
+    return app, ids
+
+
+def tokens_for(app, count):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        return [create_access_token(identity=f"agent-{i}", additional_claims={"role": "user", "type": "access"})
+                for i in range(count)]
+
+
+def contend(runner, unit_id, tokens):
+    """All ``tokens`` try to reserve ``unit_id`` at once; returns (statuses, latencies, winner)."""
+    barrier = threading.Barrier(len(tokens))
+    statuses = [None] * len(tokens)
+    latencies = [0.0] * len(tokens)
+
+    def attempt(i):
+        req = {"method": "POST", "path": f"/api/units/{unit_id}/reserve", "json": {"ttl": 60},
+               "headers": {"Authorization": f"Bearer {tokens[i]}"}}
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            statuses[i] = runner.do(req)
+        except Exception:
+            statuses[i] = "error"
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=attempt, args=(i,)) for i in range(len(tokens))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    winners = [i for i, s in enumerate(statuses) if s == 200]
+    return statuses, latencies, winners[0] if len(winners) == 1 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent unit reservation benchmark")
+    parser.add_argument("--database-url", help="default: a fresh SQLite file (WAL)")
+    parser.add_argument("--mode", default="client", choices=("client", "socket"))
+    parser.add_argument("--attempts", type=int, default=200, help="concurrent reservers per round")
+    parser.add_argument("--rounds", type=int, default=5, help="units contended, one after the other")
+    parser.add_argument("--threads", type=int, default=16, help="server threads (socket mode)")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_reserve_")
+    database_url = args.database_url or f"sqlite:///{workdir}/reserve.db"
+    app, _ = setup_app(database_url, max(args.rounds, 10))
+    tokens = tokens_for(app, args.attempts)
+
+    from models import db, Unit
+    with app.app_context():
+        unit_ids = [uid for (uid,) in db.session.execute(
+            db.select(Unit.id).where(Unit.status == "available").order_by(Unit.id).limit(args.rounds))]
+
+    runner = ClientRunner(app, {}) if args.mode == "client" else SocketRunner(app, {}, args.threads)
+    rounds = []
+    violations = 0
+    try:
+        for unit_id in unit_ids:
+            started = time.perf_counter()
+            statuses, latencies, winner = contend(runner, unit_id, tokens)
+            elapsed = time.perf_counter() - started
+            counts = Counter(str(s) for s in statuses)
+            ok = winner is not None and counts["409"] == len(tokens) - 1
+            violations += not ok
+            stats = summarize(latencies, elapsed, sum(n for s, n in counts.items() if s not in ("200", "409")))
+            rounds.append({"unit_id": unit_id, "statuses": dict(counts), "ok": ok, **stats})
+            print(f"  unit {unit_id:<6} {dict(counts)}  p50 {stats['p50_ms']:>8.2f} ms  "
+                  f"p99 {stats['p99_ms']:>8.2f} ms  {'ok' if ok else 'VIOLATION'}")
+    finally:
+        runner.close()
+
+    from inventory import reconcile
+    with app.app_context():
+        drift = reconcile()
+        reserved = db.session.execute(
+            db.select(db.func.count()).where(Unit.id.in_(unit_ids), Unit.status == "reserved")).scalar()
+    print(f"{len(rounds)} rounds, {violations} violations, {reserved} units reserved, inventory drift {drift}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "rounds": rounds, "violations": violations, "drift": drift}, f, indent=2)
+    sys.exit(1 if violations or drift or reserved != len(unit_ids) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# api/benchmarks/bench_startup.py - زمن الـ import و create_app() في process جديد
+#
+#   cd api
+#   python benchmarks/bench_startup.py [runs]
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {api_dir!r})
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "create_app": t2 - t1}}))
+"""
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_startup.db")
+    env["LOG_FILE"] = ""
+
+    samples = {"import": [], "create_app": []}
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD.format(api_dir=API_DIR)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        for k, v in json.loads(out).items():
+            samples[k].append(v * 1000)
+
+    for k, values in samples.items():
+        print(f"{k:<11} median {statistics.median(values):7.1f} ms   min {min(values):7.1f} ms   (n={runs})")
+
+
+if __name__ == "__main__":
+    main()
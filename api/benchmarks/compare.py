@@ -0,0 +1,57 @@
+# api/benchmarks/compare.py - مقارنة نتيجتين من bench_api.py / bench_bot.py
+#
+#   python benchmarks/compare.py base.json new.json [--threshold 15]
+#
+# بيرجع exit code 1 لو أي case بقى أبطأ من الـ threshold (p50 أو p99 أو throughput)
+import argparse
+import json
+import sys
+
+
+def key(row):
+    return (row["case"], str(row.get("scale", "")), row.get("mode", ""), row.get("concurrency", 1))
+
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=15.0, help="percent change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    old_rows = {key(r): r for r in base["results"]}
+
+    print(f"base {base['meta'].get('git')}  ->  new {new['meta'].get('git')}   (threshold {args.threshold:.0f}%)")
+    print(f"{'case':<22}{'scale':>6} {'mode':<7}{'rps':>10}{'Δ%':>8}{'p50 ms':>10}{'Δ%':>8}{'p99 ms':>10}{'Δ%':>8}")
+    regressions = []
+    for row in new["results"]:
+        old = old_rows.get(key(row))
+        if old is None:
+            print(f"{row['case']:<22}{row.get('scale', ''):>6} {row.get('mode', ''):<7}   (new case)")
+            continue
+        rps = change(old["throughput_rps"], row["throughput_rps"])
+        p50 = change(old["p50_ms"], row["p50_ms"])
+        p99 = change(old["p99_ms"], row["p99_ms"])
+        flag = ""
+        if rps < -args.threshold or p50 > args.threshold or p99 > args.threshold:
+            flag = "  <-- regression"
+            regressions.append(row["case"])
+        print(f"{row['case']:<22}{row.get('scale', ''):>6} {row.get('mode', ''):<7}"
+              f"{row['throughput_rps']:>10.1f}{rps:>+8.1f}{row['p50_ms']:>10.2f}{p50:>+8.1f}"
+              f"{row['p99_ms']:>10.2f}{p99:>+8.1f}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(sorted(set(regressions)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# api/benchmarks/synthetic.py - كتالوج وهمي بأحجام مختلفة للـ benchmarks
+import json
+import math
+import random
+from datetime import datetime, timedelta
+
+from models import db, Company, Project, Unit
+from inventory import reconcile
+
+SCALES = {"10": 10, "1k": 1000, "100k": 100000}
+
+FLOORS = ["G", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10"]
+STATUSES = ["available"] * 6 + ["reserved", "sold"]
+
+
+def parse_scale(value):
+    return SCALES.get(value) or int(value)
+
+
+def generate_catalog(units, units_per_project=50, projects_per_company=10, seed=1, chunk=5000):
+    """Insert ``units`` synthetic units (plus their projects/companies).
+
+    Must run inside an app context on an empty database. Returns the ids the
+    benchmarks pick from.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    n_projects = max(1, math.ceil(units / units_per_project))
+    n_companies = max(1, math.ceil(n_projects / projects_per_company))
+
+    companies = [
+        Company(slug=f"bench-co-{i}", name=f"Bench Company {i}",
+                description="Synthetic company for benchmarks",
+                contact_info=json.dumps({"phone": f"0100{i:07d}"}))
+        for i in range(n_companies)
+    ]
+    db.session.add_all(companies)
+    db.session.flush()
+
+    projects = [
+        Project(company_id=companies[i % n_companies].id, slug=f"bench-project-{i}",
+                title=f"Bench Project {i}", location=rng.choice(["Cairo", "Giza", "Alex", "Sahel"]),
+                description="Synthetic project", images=json.dumps([f"bench_{i}.jpg"]),
+                features=json.dumps(["pool", "gym"]), order=i)
+        for i in range(n_projects)
+    ]
+    db.session.add_all(projects)
+    db.session.commit()
+    project_ids = [p.id for p in projects]
+
+    for start in range(0, units, chunk):
+        batch = []
+        for i in range(start, min(units, start + chunk)):
+            status = rng.choice(STATUSES)
+            batch.append(Unit(
+                project_id=project_ids[i % n_projects],
+                code=f"B-{i:06d}",
+                title=f"Unit {i}",
+                sqm=round(rng.uniform(60, 300), 1),
+                price_per_sqm=rng.randrange(15000, 60000, 500),
+                floor=rng.choice(FLOORS),
+                bedrooms=rng.randint(1, 5),
+                bathrooms=rng.randint(1, 4),
+                images=json.dumps([f"unit_{i}_1.jpg", f"unit_{i}_2.jpg"]),
+                amenities=json.dumps(["ac", "parking"]),
+                unit_metadata=json.dumps({"view": rng.choice(["garden", "street", "sea"])}),
+                status=status,
+                # المحجوز ليه صاحب ومعاد انتهاء زي الحجز الحقيقي
+                reserved_by="bench-agent" if status == "reserved" else None,
+                reserved_until=now + timedelta(hours=1) if status == "reserved" else None,
+            ))
+        db.session.add_all(batch)
+        db.session.commit()
+        db.session.expunge_all()
+    reconcile()
+
+    unit_ids = [i for (i,) in db.session.query(Unit.id).all()]
+    return {
+        "company_slugs": [f"bench-co-{i}" for i in range(n_companies)],
+        "project_ids": project_ids,
+        "unit_ids": unit_ids,
+    }
@@ -0,0 +1,229 @@
+# api/bulk_seed.py - بيانات وهمية واقعية بأعداد كبيرة (Core bulk insert في ترانزاكشن واحدة)
+#
+#   cd api
+#   python cli.py seed-synthetic --units 1000000 --companies 50
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from models import Company, Project, Unit
+
+COMPANY_WORDS = ["Palm", "Emaar", "Sodic", "Hyde", "Ora", "Tatweer", "Mountain", "Nile", "Capital",
+                 "Madinet", "Orascom", "Misr", "Delta", "Zahra", "Horizon", "Crystal", "Royal", "Cairo"]
+COMPANY_SUFFIXES = ["Developments", "Properties", "Real Estate", "Group", "Holding"]
+PROJECT_WORDS = ["Gardens", "Heights", "Residence", "Park", "Bay", "Hills", "Views", "Towers", "Village", "Square"]
+
+# المنطقة -> (وزن الاختيار، متوسط سعر المتر)
+LOCATIONS = {
+    "New Cairo": (30, 42000),
+    "Sheikh Zayed": (15, 38000),
+    "6th of October": (15, 26000),
+    "New Capital": (20, 30000),
+    "North Coast": (10, 55000),
+    "Ain Sokhna": (5, 33000),
+    "Alexandria": (5, 24000),
+}
+BEDROOMS = ([1, 2, 3, 4, 5], [15, 35, 33, 12, 5])
+STATUSES = (["available", "reserved", "sold"], [60, 15, 25])
+AMENITIES = ["ac", "parking", "garden", "balcony", "pool_view", "security", "gym", "elevator",
+             "storage", "kitchen", "smart_home", "clubhouse"]
+PROJECT_FEATURES = ["pool", "gym", "clubhouse", "kids_area", "mall", "mosque", "school", "jogging_track",
+                    "security", "landscape"]
+FINISHING = (["core_shell", "semi_finished", "fully_finished", "furnished"], [15, 35, 40, 10])
+VIEWS = ["garden", "pool", "street", "lagoon", "sea", "landscape"]
+
+
+@contextmanager
+def relaxed_sqlite(conn):
+    """Trade durability for load speed on this connection, restoring it afterwards."""
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    old_sync = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+    old_journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    conn.exec_driver_sql("PRAGMA synchronous=OFF")
+    conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+    conn.exec_driver_sql("PRAGMA temp_store=MEMORY")
+    conn.exec_driver_sql("PRAGMA cache_size=-262144")  # 256MB
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        conn.exec_driver_sql(f"PRAGMA journal_mode={old_journal}")
+        conn.exec_driver_sql(f"PRAGMA synchronous={old_sync}")
+        conn.commit()
+
+
+def _spread(total, parts, rng):
+    """Split ``total`` into ``parts`` skewed (lognormal) positive integers."""
+    weights = [rng.lognormvariate(0, 0.6) for _ in range(parts)]
+    scale = total / sum(weights)
+    sizes = [max(1, int(w * scale)) for w in weights]
+    # تصحيح التقريب عشان المجموع يطلع total بالظبط
+    diff = total - sum(sizes)
+    i = 0
+    while diff:
+        step = 1 if diff > 0 else -1
+        if sizes[i % parts] + step >= 1:
+            sizes[i % parts] += step
+            diff -= step
+        i += 1
+    return sizes
+
+
+UNIT_COLUMNS = ("id", "project_id", "code", "title", "sqm", "price_per_sqm", "floor", "bedrooms", "bathrooms",
+                "images", "floor_plan", "amenities", "status", "reserved_by", "reserved_until", "unit_metadata",
+                "created_at", "updated_at")
+
+
+def _insert_rows(conn, table, columns, rows):
+    """executemany of plain tuples.
+
+    On SQLite the statement goes straight to the driver (dates already
+    formatted the way SQLAlchemy stores them); elsewhere it goes through
+    ``insert()`` so types are bound normally.
+    """
+    if conn.dialect.name == "sqlite":
+        sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        conn.exec_driver_sql(sql, rows)
+    else:
+        conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def _next_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def seed_catalog(conn, units=10000, companies=10, projects_per_company=5, seed=None,
+                 batch_size=20000, progress=None):
+    """Insert a realistic synthetic catalog through ``conn`` (no commit).
+
+    Ids are assigned here so units can reference projects without reading
+    anything back; seeding into a non-empty database continues after the
+    current max ids.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    run = f"{now:%y%m%d%H%M%S}"
+
+    company_id = _next_id(conn, Company)
+    project_id = _next_id(conn, Project)
+    unit_id = _next_id(conn, Unit)
+
+    company_rows = []
+    for i in range(companies):
+        name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        company_rows.append({
+            "id": company_id + i,
+            "slug": f"{name.lower().replace(' ', '-')}-{run}-{i}",
+            "name": name,
+            "logo": f"seed/company_{company_id + i}.png",
+            "description": f"{name} - synthetic developer",
+            "contact_info": json.dumps({"phone": f"+2010{rng.randrange(10**7, 10**8)}",
+                                        "email": f"sales{i}@example.com"}),
+            "created_at": now - timedelta(days=rng.randint(365, 3650)),
+        })
+    conn.execute(insert(Company.__table__), company_rows)
+
+    locations = list(LOCATIONS)
+    location_weights = [LOCATIONS[loc][0] for loc in locations]
+    project_rows = []
+    project_meta = []
+    per_company = _spread(companies * projects_per_company, companies, rng)
+    for c, count in zip(company_rows, per_company):
+        for j in range(count):
+            pid = project_id + len(project_rows)
+            location = rng.choices(locations, location_weights)[0]
+            # كل مشروع ليه سعر أساسي وعدد أدوار
+            base_price = LOCATIONS[location][1] * rng.uniform(0.8, 1.25)
+            max_floor = rng.choice([4, 6, 8, 10, 12, 20])
+            project_meta.append((pid, base_price, max_floor))
+            project_rows.append({
+                "id": pid,
+                "company_id": c["id"],
+                "slug": f"{rng.choice(PROJECT_WORDS).lower()}-{pid}",
+                "title": f"{c['name'].split()[0]} {rng.choice(PROJECT_WORDS)} {j + 1}",
+                "location": location,
+                "description": f"Residential compound in {location}",
+                "images": json.dumps([f"seed/project_{pid}_{k}.jpg" for k in range(rng.randint(2, 6))]),
+                "features": json.dumps(rng.sample(PROJECT_FEATURES, rng.randint(3, 7))),
+                "status": "active",
+                "order": j,
+                "created_at": now - timedelta(days=rng.randint(30, 1500)),
+            })
+    conn.execute(insert(Project.__table__), project_rows)
+
+    per_project = _spread(units, len(project_meta), rng)
+    bedroom_values, bedroom_weights = BEDROOMS
+    status_values, status_weights = STATUSES
+    floor_names = ["G"] + [str(f) for f in range(1, 21)]
+    two_years = 2 * 365 * 86400
+    # النصوص JSON المتكررة بتتحضر مرة واحدة بدل json.dumps لكل وحدة
+    metadata_pool = [json.dumps({"view": v, "finishing": f}) for v in VIEWS for f in FINISHING[0]]
+    metadata_weights = [FINISHING[1][i] for _ in VIEWS for i in range(len(FINISHING[0]))]
+    amenity_pool = [json.dumps(rng.sample(AMENITIES, rng.randint(2, 6))) for _ in range(512)]
+    image_templates = ['["seed/unit_{0}_0.jpg"]', '["seed/unit_{0}_0.jpg", "seed/unit_{0}_1.jpg"]',
+                       '["seed/unit_{0}_0.jpg", "seed/unit_{0}_1.jpg", "seed/unit_{0}_2.jpg"]']
+    as_text = conn.dialect.name == "sqlite"
+
+    batch = []
+    inserted = 0
+    uid = unit_id
+    started = time.perf_counter()
+    for (pid, base_price, max_floor), count in zip(project_meta, per_project):
+        # الاختيارات العشوائية لكل المشروع مرة واحدة أسرع من rng.choices لكل وحدة
+        bedrooms_list = rng.choices(bedroom_values, bedroom_weights, k=count)
+        status_list = rng.choices(status_values, status_weights, k=count)
+        metadata_list = rng.choices(metadata_pool, metadata_weights, k=count)
+        amenities_list = rng.choices(amenity_pool, k=count)
+        for n in range(count):
+            bedrooms = bedrooms_list[n]
+            floor = rng.randint(0, max_floor)
+            sqm = round(max(40.0, rng.gauss(45 + 38 * bedrooms, 12)), 1)
+            # الأدوار العليا أغلى شوية
+            price = int(base_price * (1 + floor * 0.01) * rng.uniform(0.92, 1.08)) // 100 * 100
+            created = now - timedelta(seconds=rng.randrange(two_years))
+            status = status_list[n]
+            # الوحدة المحجوزة ليها صاحب ومعاد انتهاء زي الحجز الحقيقي (reservations.py) - وإلا الـ sweeper
+            # و /release ما يقدروش يلمسوها
+            reserved_by = reserved_until = None
+            if status == "reserved":
+                reserved_by = f"seed-agent-{rng.randint(1, 50)}"
+                reserved_until = now + timedelta(seconds=rng.randrange(3600, 14 * 86400))
+            if as_text:
+                created = created.isoformat(" ", "microseconds")
+                if reserved_until is not None:
+                    reserved_until = reserved_until.isoformat(" ", "microseconds")
+            batch.append((
+                uid, pid, f"P{pid}-{floor_names[floor]}-{n + 1:04d}", f"{bedrooms}BR apartment",
+                sqm, price, floor_names[floor], bedrooms, max(1, bedrooms - (uid & 1)),
+                image_templates[uid % 3].format(uid), f"seed/plan_{pid}_{bedrooms}br.png",
+                amenities_list[n], status, reserved_by, reserved_until, metadata_list[n], created, created,
+            ))
+            uid += 1
+            if len(batch) >= batch_size:
+                _insert_rows(conn, Unit.__table__, UNIT_COLUMNS, batch)
+                inserted += len(batch)
+                batch = []
+                if progress:
+                    progress(inserted, units, time.perf_counter() - started)
+    if batch:
+        _insert_rows(conn, Unit.__table__, UNIT_COLUMNS, batch)
+        inserted += len(batch)
+        if progress:
+            progress(inserted, units, time.perf_counter() - started)
+
+    return {"companies": len(company_rows), "projects": len(project_rows), "units": inserted}
+
+
+def load(engine, progress=None, **kwargs):
+    """Seed in a single transaction with relaxed SQLite durability."""
+    with engine.connect() as conn:
+        with relaxed_sqlite(conn):
+            with conn.begin():
+                return seed_catalog(conn, progress=progress, **kwargs)
@@ -0,0 +1,120 @@
+# api/catalog_cache.py - كاش للـ responses بتاعة قراءة الكتالوج
+#
+# المفتاح = (generation, host, path + query). أي commit فيه تغيير في الكتالوج
+# (أي record_change / record_deletes) بيزود الـ generation فكل اللي قبله بيبقى
+# قديم ويطلع من الـ LRU لوحده. TTL صغير بيغطي الكتابة من process تانية (cli.py).
+# النسخ المضغوطة (gzip/br) بتتخزن جنب الـ entry - الضغط بيحصل مرة واحدة بس.
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db
+
+
+class CacheEntry:
+    __slots__ = ("body", "status", "mimetype", "expires", "variants")
+
+    def __init__(self, body, status, mimetype, expires):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.expires = expires
+        self.variants = {}
+
+    def variant(self, encoding, compress):
+        """Compressed body for ``encoding``, computed on first use."""
+        data = self.variants.get(encoding)
+        if data is None:
+            # لو اتنين طلبوها في نفس الوقت الاتنين بيضغطوا ونفس النتيجة بتتخزن - مش مشكلة
+            data = self.variants[encoding] = compress(self.body, encoding)
+        return data
+
+
+class CatalogCache:
+    def __init__(self, size=512, ttl=60):
+        self.size = size
+        self.ttl = ttl
+        self.generation = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self):
+        with self._lock:
+            self.generation += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry.expires <= time.monotonic():
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            if key[0] != self.generation:
+                # الكتالوج اتغير وإحنا بنحسب الـ response
+                return
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+def mark_dirty():
+    """Flag the current transaction as a catalog change; the cache is invalidated on commit."""
+    db.session.info["catalog_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("catalog_dirty", False) and has_app_context():
+        cache = current_app.extensions.get("catalog_cache")
+        if cache is not None:
+            cache.bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session):
+    session.info.pop("catalog_dirty", None)
+
+
+def cached(view):
+    """Serve a public catalog GET from the cache; the entry is attached to the response as ``catalog_entry``."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get("catalog_cache")
+        # جوه snapshot بتاع batch لازم نقرا من نفس الـ transaction مش من الكاش
+        if cache is None or cache.size <= 0 or g.get("db_snapshot"):
+            return view(*args, **kwargs)
+        # الـ generation قبل ما نقرا من الداتابيز - لو حصل commit في النص الـ entry مش هتتخزن
+        key = (cache.generation, request.host_url, request.full_path)
+        entry = cache.get(key)
+        if entry is not None:
+            response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+            response.catalog_entry = entry
+            return response
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough and not response.is_streamed:
+            entry = CacheEntry(response.get_data(), response.status_code, response.mimetype,
+                               time.monotonic() + cache.ttl)
+            cache.put(key, entry)
+            response.catalog_entry = entry
+        return response
+    return wrapper
+
+
+def init_app(app):
+    app.config.setdefault("CATALOG_CACHE_SIZE", 512)
+    app.config.setdefault("CATALOG_CACHE_TTL", 60)
+    app.extensions["catalog_cache"] = CatalogCache(app.config["CATALOG_CACHE_SIZE"], app.config["CATALOG_CACHE_TTL"])
@@ -0,0 +1,162 @@
+# api/changes.py - سجل التغييرات (change feed) + SSE
+#
+# الـ cursor هو seq. في SQLite (كاتب واحد) ترتيب الـ seq هو ترتيب الـ commit. في
+# Postgres/MySQL transaction خدت seq أصغر ممكن تعمل commit بعد واحدة خدت seq أكبر،
+# فالعميل يعدي الـ seq بتاعها وما يشوفهاش أبداً. عشان كده على غير SQLite الصفحة بتقف
+# عند أول فجوة في الـ seq لحد ما تتملى، أو لحد ما الصف اللي بعدها يعدي عليه
+# CHANGES_GAP_TIMEOUT ثانية (ساعتها الفجوة rollback ومش هتتملى).
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from sqlalchemy import DateTime, insert, literal, select
+
+from models import db, ChangeLog
+from catalog_cache import mark_dirty
+
+changes_bp = Blueprint("changes", __name__, url_prefix="/api/changes")
+
+MAX_PAGE = 500
+
+# كل stream ماسك thread من threads الـ server طول ما هو مفتوح
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _release_stream():
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+
+def record_change(entity, entity_id, op, data=None):
+    """Append a change row to the current session.
+
+    Call it before the handler's commit so the log entry is written in the
+    same transaction as the change itself.
+    """
+    mark_dirty()
+    db.session.add(ChangeLog(
+        entity=entity,
+        entity_id=entity_id,
+        op=op,
+        data=json.dumps(data, ensure_ascii=False) if data is not None else None
+    ))
+
+
+def record_deletes(entity, ids):
+    mark_dirty()
+    db.session.add_all([ChangeLog(entity=entity, entity_id=i, op="delete") for i in ids])
+
+
+def record_deletes_from(entity, id_query):
+    """Like ``record_deletes`` for the ids selected by ``id_query``, as one INSERT ... SELECT."""
+    mark_dirty()
+    subq = id_query.subquery()
+    id_column = list(subq.c)[0]
+    db.session.execute(insert(ChangeLog).from_select(
+        ["entity", "entity_id", "op", "created_at"],
+        select(literal(entity), id_column, literal("delete"), literal(datetime.utcnow(), DateTime))
+        .order_by(id_column)))
+
+
+def fetch_changes(since, limit):
+    """Changes after ``since`` in seq order, stopping at a gap that may still be filled by a commit."""
+    rows = (ChangeLog.query
+            .filter(ChangeLog.seq > since)
+            .order_by(ChangeLog.seq.asc())
+            .limit(limit)
+            .all())
+    if db.engine.dialect.name == "sqlite":
+        return [r.to_dict() for r in rows]
+    settled = datetime.utcnow() - timedelta(seconds=current_app.config.get("CHANGES_GAP_TIMEOUT", 30))
+    data = []
+    expected = since + 1
+    for r in rows:
+        if r.seq != expected and r.created_at > settled:
+            # seq ناقص لسه ممكن يكون transaction شغالة - الباقي يستنى الـ poll الجاي
+            break
+        data.append(r.to_dict())
+        expected = r.seq + 1
+    return data
+
+
+def last_seq():
+    return db.session.query(db.func.max(ChangeLog.seq)).scalar() or 0
+
+
+@changes_bp.get("")
+def list_changes():
+    since = request.args.get("since", 0, type=int)
+    limit = min(request.args.get("limit", 100, type=int), MAX_PAGE)
+    data = fetch_changes(since, limit)
+    return jsonify({
+        "ok": True,
+        "data": data,
+        "last_seq": data[-1]["seq"] if data else max(since, 0),
+        "has_more": len(data) == limit
+    })
+
+
+@changes_bp.get("/stream")
+def stream_changes():
+    global _streams
+    with _streams_lock:
+        if _streams >= current_app.config.get("CHANGES_MAX_STREAMS", 4):
+            # الـ threads الباقية للـ API - العميل يرجع لـ polling على /api/changes?since=
+            return jsonify({"ok": False, "error": "Too many open change streams, poll /api/changes?since= instead"}), \
+                503, {"Retry-After": "30"}
+        _streams += 1
+    try:
+        response = _open_stream()
+    except Exception:
+        _release_stream()
+        raise
+    response.call_on_close(_release_stream)
+    return response
+
+
+def _open_stream():
+    # العميل يكمل من آخر حدث استلمه عن طريق Last-Event-ID
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", type=int)
+    if since is None:
+        since = last_seq()
+    db.session.remove()
+
+    poll = current_app.config.get("CHANGES_POLL_INTERVAL", 1.0)
+    heartbeat = current_app.config.get("CHANGES_HEARTBEAT", 15.0)
+    max_duration = current_app.config.get("CHANGES_STREAM_MAX_SECONDS", 300)
+
+    def generate():
+        cursor = since
+        started = last_sent = time.monotonic()
+        yield f"retry: {int(poll * 1000)}\n\n"
+        while time.monotonic() - started < max_duration:
+            try:
+                rows = fetch_changes(cursor, MAX_PAGE)
+            finally:
+                # ما نمسكش connection أو snapshot بين كل poll والتاني
+                db.session.remove()
+            for row in rows:
+                cursor = row["seq"]
+                yield f"id: {cursor}\nevent: change\ndata: {json.dumps(row, ensure_ascii=False)}\n\n"
+            now = time.monotonic()
+            if rows:
+                last_sent = now
+                if len(rows) == MAX_PAGE:
+                    continue
+            elif now - last_sent >= heartbeat:
+                last_sent = now
+                yield ": keep-alive\n\n"
+            time.sleep(poll)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,179 @@
+# api/cli.py - أوامر الإدارة
+#
+#   cd api
+#   python cli.py init-db      # إنشاء/ترقية الجداول
+#   python cli.py bootstrap    # init-db + مستخدم الأدمن الافتراضي
+#   python cli.py seed-synthetic --units 100000   # بيانات وهمية للتجارب وقياس الأداء
+#   python cli.py reconcile-stats                 # إعادة حساب inventory_summary من الوحدات
+#   python cli.py gc-uploads --dry-run            # ملفات الـ uploads اللي اتفكت من صفوف وما حدش بيستخدمها
+#   python cli.py normalize-images --workers 8    # تجهيز الصور القديمة (EXIF/تصغير/ضغط)
+#   python cli.py db migrate   # أوامر Flask-Migrate العادية
+import os
+
+import click
+from flask import current_app
+from sqlalchemy import inspect
+
+from models import db, User
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# قواعد البيانات القديمة اللي اتعملت بـ create_all قبل Flask-Migrate بتطابق الـ revision دي
+LEGACY_REVISION = "cfb3d60664d0"
+
+
+def init_db():
+    """Bring the schema to the latest migration.
+
+    An empty database is created from the models and stamped at head; an
+    unversioned legacy database is stamped at the first revision first.
+    """
+    from flask_migrate import Migrate, stamp, upgrade
+
+    if "migrate" not in current_app.extensions:
+        Migrate(current_app, db)
+
+    tables = inspect(db.engine).get_table_names()
+    if not tables:
+        db.create_all()
+        stamp(directory=MIGRATIONS_DIR)
+        return "created"
+    if "alembic_version" not in tables:
+        stamp(directory=MIGRATIONS_DIR, revision=LEGACY_REVISION)
+    upgrade(directory=MIGRATIONS_DIR)
+    return "upgraded"
+
+
+def ensure_admin():
+    admin_user = os.getenv("ADMIN_DEFAULT_USER", "admin")
+    admin_pass = os.getenv("ADMIN_DEFAULT_PASS", "admin123")
+    if User.query.filter_by(username=admin_user).first():
+        return False
+    u = User(username=admin_user, role="admin")
+    u.set_password(admin_pass)
+    db.session.add(u)
+    db.session.commit()
+    current_app.logger.info("Created default admin user '%s'", admin_user)
+    return True
+
+
+def bootstrap():
+    init_db()
+    ensure_admin()
+
+
+def register_commands(app):
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create or migrate the database schema."""
+        click.echo(f"Database {init_db()}.")
+
+    @app.cli.command("bootstrap")
+    def bootstrap_command():
+        """init-db + create the default admin user if missing."""
+        click.echo(f"Database {init_db()}.")
+        if ensure_admin():
+            click.echo("Default admin user created.")
+
+    @app.cli.command("seed-synthetic")
+    @click.option("--units", default=10000, show_default=True, help="Number of units to generate.")
+    @click.option("--companies", default=10, show_default=True)
+    @click.option("--projects-per-company", default=5, show_default=True, help="Average; actual counts are skewed.")
+    @click.option("--batch-size", default=20000, show_default=True, help="Rows per INSERT batch.")
+    @click.option("--seed", type=int, default=None, help="Random seed for a reproducible dataset.")
+    def seed_synthetic_command(units, companies, projects_per_company, batch_size, seed):
+        """Bulk-load a realistic synthetic catalog in one transaction."""
+        import time
+        from bulk_seed import load
+
+        init_db()
+        db.session.remove()
+        started = time.perf_counter()
+
+        def progress(done, total, elapsed):
+            click.echo(f"  {done:>9}/{total} units  {done / elapsed if elapsed else 0:,.0f}/s", err=True)
+
+        counts = load(db.engine, units=units, companies=companies, projects_per_company=projects_per_company,
+                      batch_size=batch_size, seed=seed, progress=progress)
+        click.echo(f"Inserted {counts['companies']} companies, {counts['projects']} projects, "
+                   f"{counts['units']} units in {time.perf_counter() - started:.1f}s.")
+        # الـ bulk insert بيعدي على inventory.py - الملخص بيتحسب مرة واحدة في الآخر
+        from inventory import reconcile
+        reconcile()
+
+    @app.cli.command("reconcile-stats")
+    def reconcile_stats_command():
+        """Rebuild the inventory summaries from the units table."""
+        from inventory import reconcile
+
+        click.echo(f"Inventory summaries rebuilt, {reconcile()} rows corrected.")
+
+
+    @app.cli.command("gc-uploads")
+    @click.option("--grace", type=int, default=None, help="Keep files younger than this many seconds.")
+    @click.option("--dry-run/--delete", default=None,
+                  help="Only list what would be removed (default: UPLOAD_GC_DRY_RUN).")
+    def gc_uploads_command(grace, dry_run):
+        """Remove released upload files that no company, project or unit refers to any more."""
+        from upload_gc import sweep
+
+        if grace is None:
+            grace = current_app.config["UPLOAD_GC_GRACE_SECONDS"]
+        if dry_run is None:
+            dry_run = current_app.config["UPLOAD_GC_DRY_RUN"]
+        result = sweep(current_app.config["UPLOAD_FOLDER"], grace, dry_run=dry_run)
+        for name in result["removed"]:
+            click.echo(f"  {name}")
+        click.echo(f"{'Would remove' if dry_run else 'Removed'} {len(result['removed'])} files "
+                   f"({result['bytes']} bytes), kept {result['kept']}.")
+        if not dry_run:
+            from resumable import expire
+            expired = expire(current_app.config["UPLOAD_FOLDER"], current_app.config["RESUMABLE_EXPIRE_SECONDS"])
+            click.echo(f"Expired {expired} stale resumable uploads.")
+
+    @app.cli.command("normalize-images")
+    @click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    @click.option("--keep-originals/--no-keep-originals", default=None,
+                  help="Copy each original to originals/ first (default: IMAGE_KEEP_ORIGINAL).")
+    def normalize_images_command(workers, keep_originals):
+        """Apply the upload ingest (EXIF rotation, metadata strip, resize) to existing images."""
+        import time
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from imaging import normalize
+        from uploads import allowed_file
+
+        config = current_app.config
+        folder = config["UPLOAD_FOLDER"]
+        if keep_originals is None:
+            keep_originals = config["IMAGE_KEEP_ORIGINAL"]
+        with os.scandir(folder) as entries:
+            paths = [e.path for e in entries if e.is_file() and allowed_file(e.name)]
+        started = time.perf_counter()
+        totals = {"normalized": 0, "skipped": 0, "failed": 0}
+        before = after = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(normalize, path, config["IMAGE_MAX_EDGE"], config["IMAGE_QUALITY"],
+                                   keep_originals): path for path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    totals["failed"] += 1
+                    click.echo(f"  {os.path.basename(futures[future])}: {e}", err=True)
+                else:
+                    totals[result["result"]] += 1
+                    before += result["before"]
+                    after += result["after"]
+                if done % 50 == 0 or done == len(paths):
+                    elapsed = time.perf_counter() - started
+                    click.echo(f"  {done:>7}/{len(paths)} images  {done / elapsed if elapsed else 0:,.1f}/s", err=True)
+        click.echo(f"Normalized {totals['normalized']}, skipped {totals['skipped']}, failed {totals['failed']}; "
+                   f"{before:,} -> {after:,} bytes.")
+
+if __name__ == "__main__":
+    from flask.cli import FlaskGroup
+
+    def _create_app():
+        from app import create_app
+        return create_app()
+
+    FlaskGroup(create_app=_create_app)()
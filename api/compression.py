@@ -0,0 +1,63 @@
+# api/compression.py - gzip/brotli للـ responses حسب Accept-Encoding
+#
+# br لو مكتبة brotli متسطبة وإلا gzip. الـ responses الأصغر من COMPRESS_MIN_SIZE
+# بتطلع زي ما هي (الـ header overhead أكبر من المكسب). الـ responses اللي جاية من
+# catalog_cache بتاخد النسخة المضغوطة المتخزنة جنبها بدل ما تتضغط كل مرة.
+import gzip
+
+from flask import request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # اختياري - من غيره gzip بس
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "application/javascript", "image/svg+xml")
+
+COMPRESS_IN = metrics.registry.register(metrics.Counter(
+    "api_compression_input_bytes_total", "Response bytes before compression.", ("encoding",)))
+COMPRESS_OUT = metrics.registry.register(metrics.Counter(
+    "api_compression_output_bytes_total", "Response bytes after compression.", ("encoding",)))
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE
+
+
+def init_app(app):
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BR_QUALITY", 5)
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def compress(data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=app.config["COMPRESS_BR_QUALITY"])
+        # mtime=0 عشان نفس الـ body يطلع نفس البايتات (ETag/كاش الـ proxies)
+        return gzip.compress(data, compresslevel=app.config["COMPRESS_LEVEL"], mtime=0)
+
+    @app.after_request
+    def compress_response(response):
+        # الملفات (send_from_directory) والـ SSE بيتبعتوا stream - بنسيبهم
+        if (response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or not _compressible(response)):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(offered)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        entry = getattr(response, "catalog_entry", None)
+        body = entry.variant(encoding, compress) if entry is not None else compress(data, encoding)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        COMPRESS_IN.inc(len(data), encoding=encoding)
+        COMPRESS_OUT.inc(len(body), encoding=encoding)
+        return response
@@ -0,0 +1,214 @@
+# api/idempotency.py - Idempotency-Key للـ POST/PUT/PATCH
+#
+# الـ client (البوت / الداشبورد) بيبعت "Idempotency-Key: <uuid>" ثابت لكل عملية، ولو
+# نفس الـ request اتبعت تاني (timeout، retry بعد refresh للتوكن) بياخد الـ response
+# المتخزن من غير ما الشغل يتعمل تاني - لا وحدة مكررة ولا ملف بيترفع مرتين.
+#
+# المفتاح (لكل مستخدم) بيتحجز بصف من غير status قبل ما الـ handler يشتغل، فنسخة تانية
+# بنفس المفتاح في نفس الوقت بتاخد 409. بعد الـ handler الـ response بيتخزن ومعاه hash
+# للـ method/path/body - نفس المفتاح مع request مختلف = 422. الـ 5xx مش بيتخزن (الـ
+# transaction اترجعت) فالمفتاح بيفضى للـ retry. الـ hash بيتحسب والـ body بيتقري
+# (الـ uploads فاضلة stream)، وفي الـ multipart بيتحسب من الحقول و sha256 كل ملف لأن
+# الـ boundary بيتغير مع كل إرسال. الصفوف أقدم من IDEMPOTENCY_TTL بتتمسح.
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+from uploads import UploadSink
+import metrics
+import tokens
+
+HEADER = "Idempotency-Key"
+METHODS = ("POST", "PUT", "PATCH")
+MAX_KEY_LENGTH = 255
+CHUNK = 64 * 1024
+# بتتحسب تاني وقت الـ replay
+SKIPPED_HEADERS = {"content-length"}
+
+K = IdempotencyKey.__table__
+
+IDEMPOTENCY = metrics.registry.register(metrics.Counter(
+    "api_idempotency_requests_total", "Requests that carried an Idempotency-Key.", ("result",)))
+
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+
+
+class _HashingInput:
+    """``wsgi.input`` wrapper that feeds every byte read into ``digest``."""
+
+    def __init__(self, stream, digest):
+        self._stream = stream
+        self.digest = digest
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self.digest.update(data)
+        return data
+
+    def readline(self, *args):
+        data = self._stream.readline(*args)
+        self.digest.update(data)
+        return data
+
+
+def _identity():
+    try:
+        tokens.verify_cached()
+    except Exception:
+        return None
+    return get_jwt_identity()
+
+
+def _drain():
+    # الـ handler ممكن يرد قبل ما يقرا الـ body كله - الـ hash لازم يغطيه كله
+    try:
+        while request.stream.read(CHUNK):
+            pass
+    except Exception:
+        pass
+
+
+def _request_hash(digest):
+    if request.mimetype != "multipart/form-data":
+        _drain()
+        return digest.hexdigest()
+    for name, value in request.form.items(multi=True):
+        digest.update(f"{name}={value}\n".encode())
+    for name, storage in request.files.items(multi=True):
+        stream = storage.stream
+        file_hash = stream.sha256 if isinstance(stream, UploadSink) else hashlib.sha256(stream.getvalue()).hexdigest()
+        digest.update(f"{name}:{storage.filename}:{file_hash}\n".encode())
+    return digest.hexdigest()
+
+
+def _key_row(user, key):
+    return (K.c.user_id == user) & (K.c.key == key)
+
+
+def _claim(user, key):
+    """Reserve ``key`` for this request; returns None or the existing row."""
+    config = current_app.config
+    now = datetime.utcnow()
+    try:
+        db.session.execute(insert(K).values(user_id=user, key=key, created_at=now))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+
+    row = db.session.execute(select(K).where(_key_row(user, key))).first()
+    if row is None:
+        # اتمسح بين الـ INSERT والـ SELECT (purge) - نتعامل معاه كأنه لسه شغال والـ client يعيد
+        return {"status_code": None}
+    expired = row.created_at < now - timedelta(seconds=config["IDEMPOTENCY_TTL"])
+    abandoned = (row.status_code is None
+                 and row.created_at < now - timedelta(seconds=config["IDEMPOTENCY_PENDING_TIMEOUT"]))
+    if not expired and not abandoned:
+        return row._mapping
+    # الصف قديم: ناخده بـ compare-and-set عشان لو اتنين لقوه مع بعض واحد بس يكمل
+    taken = db.session.execute(
+        update(K).where(K.c.id == row.id, K.c.created_at == row.created_at)
+        .values(created_at=now, status_code=None, request_hash=None, headers=None, body=None)).rowcount
+    db.session.commit()
+    return None if taken else {"status_code": None}
+
+
+def _begin():
+    key = request.headers.get(HEADER)
+    if key is None or request.method not in METHODS:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return jsonify({"ok": False, "error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+    user = _identity()
+    if user is None:
+        # من غير مستخدم (login، توكن منتهي) مفيش scope للمفتاح - الـ route بيرد زي العادي
+        return None
+
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n{request.mimetype}\n".encode())
+    if request.mimetype != "multipart/form-data":
+        request.environ["wsgi.input"] = _HashingInput(request.environ["wsgi.input"], digest)
+    row = _claim(str(user), key)
+    if row is None:
+        g.idempotency = (str(user), key, digest)
+        IDEMPOTENCY.inc(result="new")
+        return None
+    if row["status_code"] is None:
+        IDEMPOTENCY.inc(result="in_progress")
+        return jsonify({"ok": False, "error": f"A request with this {HEADER} is still in progress"}), 409
+
+    if _request_hash(digest) != row["request_hash"]:
+        IDEMPOTENCY.inc(result="mismatch")
+        return jsonify({"ok": False, "error": f"{HEADER} was already used for a different request"}), 422
+    IDEMPOTENCY.inc(result="replayed")
+    response = current_app.response_class(row["body"], status=row["status_code"],
+                                          headers=json.loads(row["headers"] or "[]"))
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _finish(response):
+    state = g.pop("idempotency", None)
+    if state is None:
+        return response
+    user, key, digest = state
+    # الـ handler عمل commit للي يخصه؛ أي حاجة فاضلة كانت هتترمي في الـ teardown
+    db.session.rollback()
+    request_hash = None
+    if response.status_code < 500 and not response.direct_passthrough and not response.is_streamed:
+        try:
+            request_hash = _request_hash(digest)
+        except Exception:
+            # multipart اترفض وهو بيتقري (413/415) - مفيش fingerprint نقارن بيه
+            pass
+    try:
+        if request_hash is None:
+            # مفيش حاجة تتعاد - المفتاح يفضى والـ retry يشتغل من الأول
+            db.session.execute(delete(K).where(_key_row(user, key)))
+        else:
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS]
+            db.session.execute(update(K).where(_key_row(user, key)).values(
+                status_code=response.status_code, request_hash=request_hash,
+                headers=json.dumps(headers), body=response.get_data()))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Could not store the response for %s %s", HEADER, key)
+    try:
+        _purge()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Idempotency key purge failed")
+    return response
+
+
+def _purge():
+    """Delete keys older than IDEMPOTENCY_TTL, at most once per IDEMPOTENCY_PURGE_INTERVAL."""
+    global _last_purge
+    config = current_app.config
+    with _purge_lock:
+        if time.monotonic() - _last_purge < config["IDEMPOTENCY_PURGE_INTERVAL"]:
+            return
+        _last_purge = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(seconds=config["IDEMPOTENCY_TTL"])
+    removed = db.session.execute(delete(K).where(K.c.created_at < cutoff)).rowcount
+    db.session.commit()
+    if removed:
+        current_app.logger.info("Purged %s expired idempotency keys", removed)
+
+
+def init_app(app):
+    app.config.setdefault("IDEMPOTENCY_TTL", 24 * 3600)
+    app.config.setdefault("IDEMPOTENCY_PENDING_TIMEOUT", 600)
+    app.config.setdefault("IDEMPOTENCY_PURGE_INTERVAL", 300)
+    # بعد compression.init_app: الـ after_request ده بيشتغل قبل الضغط فبيخزن الـ body الأصلي
+    app.before_request(_begin)
+    app.after_request(_finish)
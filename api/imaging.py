@@ -0,0 +1,157 @@
+# api/imaging.py - تجهيز الصور بعد الرفع: اتجاه EXIF، مسح الـ metadata، تصغير وإعادة ضغط
+#
+# صور الموبايل بتيجي 12MP ومعاها EXIF (اتجاه + GPS). normalize() بتلف الصورة حسب
+# الـ EXIF، بتشيل الـ metadata، بتصغر أطول ضلع لـ IMAGE_MAX_EDGE وبتضغط بـ IMAGE_QUALITY
+# وبتكتب فوق نفس الملف (نفس الاسم، فالصفوف مش محتاجة تتغير). الشغل تقيل على الـ CPU
+# فبيتعمل في process pool بدل threads الـ API. الأصل بيتحفظ في originals/ لو
+# IMAGE_KEEP_ORIGINAL. PIL والـ pool بيتحملوا أول ما صورة تيجي بس (create_app خفيف)،
+# و IMAGE_WORKERS=0 أو TESTING بيشغلوا normalize() في نفس الـ thread من غير processes.
+#
+# الـ pool بيعمل spawn: كل worker بيعمل import للـ __main__ من أوله، فأي script بيعمل
+# create_app() ويرفع صور لازم كوده يبقى تحت if __name__ == "__main__".
+import hashlib
+import os
+import shutil
+import threading
+
+import metrics
+
+FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+ORIGINALS_DIR = "originals"
+
+IMAGE_BYTES_SAVED = metrics.registry.register(metrics.Counter(
+    "api_image_ingest_bytes_saved_total", "Bytes saved by re-encoding uploaded images."))
+IMAGE_INGESTED = metrics.registry.register(metrics.Counter(
+    "api_image_ingest_total", "Uploaded images processed by the ingest stage.", ("result",)))
+
+
+def normalize(path, max_edge, quality, keep_original=False):
+    """Re-encode one image in place; runs in a worker process.
+
+    Returns ``{"name", "before", "after", "result", "sha256"}`` where result is
+    "normalized" or "skipped" (already small and metadata-free, or a GIF).
+    """
+    from PIL import Image, ImageOps
+
+    name = os.path.basename(path)
+    before = os.path.getsize(path)
+    with Image.open(path) as img:
+        fmt = img.format
+        has_metadata = bool(img.getexif()) or any(k in img.info for k in ("exif", "xmp", "comment"))
+        if fmt not in FORMATS or getattr(img, "is_animated", False):
+            return {"name": name, "before": before, "after": before, "result": "skipped", "sha256": None}
+        if max(img.size) <= max_edge and not has_metadata:
+            return {"name": name, "before": before, "after": before, "result": "skipped", "sha256": None}
+
+        out = ImageOps.exif_transpose(img)
+        out.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if fmt == "JPEG" and out.mode not in ("RGB", "L"):
+            out = out.convert("RGB")
+        out.info = {}
+        # ICC بيفضل (الألوان)، وكل الباقي (EXIF/GPS/XMP) بيتشال
+        options = {"icc_profile": img.info.get("icc_profile")}
+        if fmt == "JPEG":
+            options.update(quality=quality, optimize=True, progressive=True)
+        elif fmt == "WEBP":
+            options.update(quality=quality, method=4)
+        else:
+            options.update(optimize=True)
+
+        tmp = f"{path}.ingest"
+        out.save(tmp, fmt, **{k: v for k, v in options.items() if v is not None})
+
+    if keep_original:
+        originals = os.path.join(os.path.dirname(path), ORIGINALS_DIR)
+        os.makedirs(originals, exist_ok=True)
+        shutil.copy2(path, os.path.join(originals, name))
+    with open(tmp, "rb") as f:
+        data = f.read()
+    os.replace(tmp, path)
+    return {"name": name, "before": before, "after": len(data), "result": "normalized",
+            "sha256": hashlib.sha256(data).hexdigest()}
+
+
+class ImageIngest:
+    """Process pool for ``normalize()``; started on first use."""
+
+    def __init__(self, app=None):
+        self._pool = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault("IMAGE_INGEST", True)
+        app.config.setdefault("IMAGE_MAX_EDGE", 2560)
+        app.config.setdefault("IMAGE_QUALITY", 82)
+        app.config.setdefault("IMAGE_KEEP_ORIGINAL", False)
+        app.config.setdefault("IMAGE_WORKERS", 2)
+        app.config.setdefault("IMAGE_TIMEOUT", 60)
+        app.extensions["image_ingest"] = self
+
+    def pool(self, workers=None):
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # spawn: fork من process فيه threads (waitress) مش آمن
+                self._pool = ProcessPoolExecutor(max_workers=workers or self.app.config["IMAGE_WORKERS"],
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _reset(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def in_thread(self):
+        return self.app.config["IMAGE_WORKERS"] <= 0 or self.app.testing
+
+    def submit(self, path):
+        config = self.app.config
+        args = (path, config["IMAGE_MAX_EDGE"], config["IMAGE_QUALITY"], config["IMAGE_KEEP_ORIGINAL"])
+        if self.in_thread:
+            from concurrent.futures import Future
+
+            future = Future()
+            try:
+                future.set_result(normalize(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.pool().submit(normalize, *args)
+
+    def process(self, filenames):
+        """Normalize freshly stored uploads; returns ``{filename: result}``.
+
+        A file that fails is left as it was.
+        """
+        results = {}
+        if not self.app.config["IMAGE_INGEST"] or not filenames:
+            return results
+        folder = self.app.config["UPLOAD_FOLDER"]
+        try:
+            futures = [(name, self.submit(os.path.join(folder, name))) for name in filenames]
+        except Exception:
+            # pool مكسور (worker مات) - المرة الجاية يتعمل من جديد
+            self.app.logger.exception("Image ingest pool unavailable")
+            self._reset()
+            return results
+        for name, future in futures:
+            try:
+                result = future.result(timeout=self.app.config["IMAGE_TIMEOUT"])
+            except Exception as e:
+                IMAGE_INGESTED.inc(result="failed")
+                self.app.logger.warning("Image ingest failed for %s: %s", name, e)
+                continue
+            IMAGE_INGESTED.inc(result=result["result"])
+            IMAGE_BYTES_SAVED.inc(result["before"] - result["after"])
+            results[name] = result
+        return results
+
+
+image_ingest = ImageIngest()
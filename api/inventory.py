@@ -0,0 +1,203 @@
+# api/inventory.py - ملخص المخزون (متاح/محجوز/مباع + الأسعار) لكل مشروع وشركة
+#
+# كل كتابة على وحدة بتعدل صف المشروع بـ UPDATE نسبي (+1/-1) وبعدين صف الشركة
+# بيتحسب من صفوف مشاريعها. القراءة دايماً صف واحد.
+import threading
+
+from sqlalchemy import BigInteger, case, cast, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, InventorySummary, Project, Unit
+import catalog_cache
+
+TRACKED_STATUSES = ("available", "reserved", "sold")
+COLUMNS = ("units_count", *TRACKED_STATUSES, "min_price", "max_price", "sum_price_per_sqm")
+
+S = InventorySummary.__table__
+U = Unit.__table__
+P = Project.__table__
+
+TOTAL_PRICE = cast(U.c.sqm * U.c.price_per_sqm, BigInteger)
+
+
+def snapshot(u):
+    """The fields of a unit the summary depends on - take it before editing."""
+    if u is None:
+        return None
+    return (u.project_id, u.status, int(u.sqm * u.price_per_sqm), u.price_per_sqm)
+
+
+def _company_of(project_id):
+    project = db.session.get(Project, project_id)
+    return project.company_id if project else None
+
+
+def _ensure_row(scope, ref_id, company_id=None):
+    exists = db.session.execute(select(S.c.ref_id).where(S.c.scope == scope, S.c.ref_id == ref_id)).first()
+    if exists:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(S).values(
+                scope=scope, ref_id=ref_id, company_id=company_id,
+                units_count=0, available=0, reserved=0, sold=0, sum_price_per_sqm=0))
+    except IntegrityError:
+        # request تاني أنشأ نفس الصف في نفس اللحظة
+        pass
+
+
+def _project_row(project_id):
+    return (S.c.scope == "project") & (S.c.ref_id == project_id)
+
+
+def _add(project_id, status, price, price_per_sqm):
+    values = {"units_count": S.c.units_count + 1, "sum_price_per_sqm": S.c.sum_price_per_sqm + price_per_sqm,
+              "min_price": case((S.c.min_price.is_(None) | (S.c.min_price > price), price), else_=S.c.min_price),
+              "max_price": case((S.c.max_price.is_(None) | (S.c.max_price < price), price), else_=S.c.max_price)}
+    if status in TRACKED_STATUSES:
+        values[status] = S.c[status] + 1
+    db.session.execute(update(S).where(_project_row(project_id)).values(**values))
+
+
+def _remove(project_id, status, price, price_per_sqm):
+    values = {"units_count": S.c.units_count - 1, "sum_price_per_sqm": S.c.sum_price_per_sqm - price_per_sqm}
+    if status in TRACKED_STATUSES:
+        values[status] = S.c[status] - 1
+    db.session.execute(update(S).where(_project_row(project_id)).values(**values))
+    # لو كانت أرخص أو أغلى وحدة: min/max يتحسبوا من وحدات المشروع بس (index على project_id)
+    project_units = U.c.project_id == project_id
+    db.session.execute(
+        update(S)
+        .where(_project_row(project_id), (S.c.min_price >= price) | (S.c.max_price <= price))
+        .values(min_price=select(func.min(TOTAL_PRICE)).where(project_units).scalar_subquery(),
+                max_price=select(func.max(TOTAL_PRICE)).where(project_units).scalar_subquery()))
+
+
+def _rollup_companies(company_ids):
+    """Recompute company rows from their project rows."""
+    for cid in {c for c in company_ids if c is not None}:
+        row = db.session.execute(
+            select(
+                func.coalesce(func.sum(S.c.units_count), 0),
+                *[func.coalesce(func.sum(S.c[s]), 0) for s in TRACKED_STATUSES],
+                func.min(S.c.min_price),
+                func.max(S.c.max_price),
+                func.coalesce(func.sum(S.c.sum_price_per_sqm), 0),
+            ).where(S.c.scope == "project", S.c.company_id == cid)
+        ).one()
+        _ensure_row("company", cid, cid)
+        db.session.execute(
+            update(S).where(S.c.scope == "company", S.c.ref_id == cid).values(dict(zip(COLUMNS, row))))
+
+
+def unit_changed(before, u):
+    """Apply one unit create/update/delete.
+
+    ``before`` is ``snapshot()`` taken before the edit (None on create) and
+    ``u`` the unit after it (None on delete). Runs in the handler's
+    transaction, before its commit.
+    """
+    after = snapshot(u)
+    if before == after:
+        return
+    db.session.flush()
+    companies = []
+    if before is not None:
+        cid = _company_of(before[0])
+        _ensure_row("project", before[0], cid)
+        _remove(*before)
+        companies.append(cid)
+    if after is not None:
+        cid = _company_of(after[0])
+        _ensure_row("project", after[0], cid)
+        _add(*after)
+        companies.append(cid)
+    _rollup_companies(companies)
+
+
+def _aggregate_projects():
+    return (
+        select(
+            literal("project"),
+            P.c.id,
+            P.c.company_id,
+            func.count(U.c.id),
+            *[func.coalesce(func.sum(case((U.c.status == s, 1), else_=0)), 0) for s in TRACKED_STATUSES],
+            func.min(TOTAL_PRICE),
+            func.max(TOTAL_PRICE),
+            func.coalesce(func.sum(U.c.price_per_sqm), 0),
+        )
+        .select_from(P.outerjoin(U, U.c.project_id == P.c.id))
+        .group_by(P.c.id, P.c.company_id)
+    )
+
+
+def refresh_projects(project_ids):
+    """Recompute the given projects (and their companies) from the units table."""
+    project_ids = set(project_ids)
+    if not project_ids:
+        return
+    db.session.flush()
+    company_ids = [cid for (cid,) in db.session.execute(select(P.c.company_id).where(P.c.id.in_(project_ids)))]
+    db.session.execute(delete(S).where(S.c.scope == "project", S.c.ref_id.in_(project_ids)))
+    db.session.execute(insert(S).from_select(
+        ["scope", "ref_id", "company_id", *COLUMNS], _aggregate_projects().where(P.c.id.in_(project_ids))))
+    _rollup_companies(company_ids)
+
+
+def project_deleted(project_id, company_id):
+    db.session.execute(delete(S).where(_project_row(project_id)))
+    _rollup_companies([company_id])
+
+
+def company_deleted(company_id):
+    db.session.execute(delete(S).where(S.c.company_id == company_id))
+
+
+def _current_rows():
+    rows = db.session.execute(select(S.c.scope, S.c.ref_id, *[S.c[c] for c in COLUMNS]))
+    return {(r[0], r[1]): tuple(r[2:]) for r in rows}
+
+
+def reconcile():
+    """Rebuild every summary row from the units table; returns how many rows were wrong.
+
+    Done in one transaction with two GROUP BY queries, so it is cheap enough
+    to run periodically.
+    """
+    before = _current_rows()
+
+    db.session.execute(delete(S))
+    db.session.execute(insert(S).from_select(["scope", "ref_id", "company_id", *COLUMNS], _aggregate_projects()))
+    db.session.execute(insert(S).from_select(
+        ["scope", "ref_id", "company_id", *COLUMNS],
+        select(
+            literal("company"), S.c.company_id, S.c.company_id,
+            func.sum(S.c.units_count), *[func.sum(S.c[s]) for s in TRACKED_STATUSES],
+            func.min(S.c.min_price), func.max(S.c.max_price), func.sum(S.c.sum_price_per_sqm),
+        ).where(S.c.scope == "project").group_by(S.c.company_id)))
+
+    after = _current_rows()
+    drift = sum(1 for k in before.keys() | after.keys() if before.get(k) != after.get(k))
+    if drift:
+        catalog_cache.mark_dirty()
+    db.session.commit()
+    return drift
+
+
+def start_reconciler(app, interval):
+    """Daemon thread that runs ``reconcile()`` every ``interval`` seconds."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                with app.app_context():
+                    drift = reconcile()
+                if drift:
+                    app.logger.warning("Inventory reconcile fixed %s rows", drift)
+            except Exception:
+                app.logger.exception("Inventory reconcile failed")
+
+    threading.Thread(target=loop, name="inventory-reconcile", daemon=True).start()
+    return stop
@@ -0,0 +1,196 @@
+# api/log_setup.py - لوج JSON غير متزامن (QueueHandler) + توقيت كل request
+import atexit
+import json
+import logging
+import queue
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_listener = None
+_listener_key = None
+# اللي عايز توقيت كل SQL statement (metrics، profiling) بيسجل هنا بدل hook تاني على الـ Engine
+_query_observers = []
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request's id and route.
+
+    Must sit on the QueueHandler: it runs in the request thread, the
+    listener thread has no request context.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, "request_id", None)
+            record.method = request.method
+            record.path = request.path
+            record.route = request.url_rule.rule if request.url_rule else None
+        return True
+
+
+class QueueHandlerKeepExtras(QueueHandler):
+    def prepare(self, record):
+        # نفس QueueHandler.prepare بس من غير ما نفرمت الرسالة هنا (الفرمتة في thread الـ listener)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that adds its time to the request's serialize_ms."""
+
+    def response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            if has_request_context() and "serialize_ms" in g:
+                g.serialize_ms += (time.perf_counter() - start) * 1000
+
+
+def on_query(fn):
+    """Call ``fn(statement, start, seconds)`` after every SQL statement; ``start`` is a perf_counter value."""
+    _query_observers.append(fn)
+    return fn
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    elapsed = time.perf_counter() - start
+    if has_request_context() and "db_ms" in g:
+        g.db_ms += elapsed * 1000
+        g.db_queries += 1
+    for fn in _query_observers:
+        fn(statement, start, elapsed)
+
+
+def _file_handler(path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=10*1024*1024, backupCount=5, encoding="utf-8", delay=True)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _start_listener(log_file, slow_file, console):
+    """One listener thread per process, shared by every app instance."""
+    global _listener, _listener_key
+    key = (log_file, slow_file, console)
+    if _listener is not None:
+        if _listener_key == key:
+            return _listener.queue
+        _listener.stop()
+
+    handlers = []
+    if log_file:
+        handler = _file_handler(log_file)
+        handler.setLevel(logging.INFO)
+        handlers.append(handler)
+    if slow_file:
+        handler = _file_handler(slow_file)
+        handler.addFilter(lambda record: getattr(record, "slow", False))
+        handlers.append(handler)
+    if console:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        handlers.append(handler)
+
+    _listener = QueueListener(queue.Queue(-1), *handlers, respect_handler_level=True)
+    _listener_key = key
+    _listener.start()
+    return _listener.queue
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+
+
+def init_app(app):
+    app.config.setdefault("SLOW_REQUEST_MS", 500)
+    log_file = app.config.get("LOG_FILE")
+    slow_file = app.config.get("SLOW_LOG_FILE")
+    console = app.config.get("LOG_CONSOLE", True)
+
+    app.logger.setLevel(logging.INFO)
+    if log_file or slow_file:
+        # كل الكتابة (ملفات + console) بتحصل في thread الـ listener مش في thread الـ request
+        app.logger.removeHandler(default_handler)
+        handler = QueueHandlerKeepExtras(_start_listener(log_file, slow_file, console))
+        handler.addFilter(RequestContextFilter())
+        app.logger.addHandler(handler)
+        # alembic (fileConfig) بيضيف handler على الـ root - ما نبعتش له نسخة متزامنة
+        app.logger.propagate = False
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        g.request_start = time.perf_counter()
+        g.db_ms = 0.0
+        g.db_queries = 0
+        g.serialize_ms = 0.0
+
+    @app.after_request
+    def log_request(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+        total_ms = (time.perf_counter() - start) * 1000
+        slow = total_ms >= app.config["SLOW_REQUEST_MS"]
+        response.headers["X-Request-ID"] = g.request_id
+        app.logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "%s %s %s %.1fms", request.method, request.path, response.status_code, total_ms,
+            extra={
+                "status": response.status_code,
+                "duration_ms": round(total_ms, 2),
+                "db_ms": round(g.db_ms, 2),
+                "db_queries": g.db_queries,
+                "serialize_ms": round(g.serialize_ms, 2),
+                "remote_addr": request.remote_addr,
+                "slow": slow,
+            },
+        )
+        return response
@@ -0,0 +1,99 @@
+# api/media.py - روابط ملفات الـ uploads من غير url_for
+#
+# الرابط = prefix + اسم الملف. الـ prefix بيتحسب مرة لكل request: MEDIA_BASE_URL
+# لو متظبط (CDN أو دومين تاني) وإلا نفس السيرفر + /api/uploads/.
+#
+# صور الكتالوج والشعارات عامة وروابطها ثابتة (البوت والداشبورد بيبنوها بنفسهم). الحقول
+# اللي في MEDIA_PRIVATE_FIELDS (مثلاً floor_plan) بتتخزن في UPLOAD_FOLDER/private/،
+# ورابطها بس اللي بياخد ?e=<expires>&s=<hmac> بـ MEDIA_SIGNING_KEY، والـ endpoint بيرفض
+# أي رابط لـ private/ من غيرهم أو منتهي. الـ expires بيتقرب لحدود MEDIA_URL_TTL عشان نفس
+# الملف ياخد نفس الرابط طول الفترة (كاش الكتالوج والـ CDN) وصلاحيته بين TTL و 2×TTL.
+import base64
+import hashlib
+import hmac
+import re
+import time
+from urllib.parse import quote
+
+from flask import current_app, request
+
+UPLOADS_PATH = "/api/uploads/"
+PRIVATE_DIR = "private"
+# الحقول اللي ينفع تبقى private
+PRIVATE_FIELD_CHOICES = ("images", "videos", "floor_plan")
+
+_PRIVATE_PREFIX = PRIVATE_DIR + "/"
+
+# الأسماء اللي secure_filename بيطلعها مش محتاجة quoting
+_SAFE_FILENAME = re.compile(r"^[A-Za-z0-9_.\-/]+$")
+
+
+def _signature(mac, filename, expires):
+    mac = mac.copy()
+    mac.update(f"{filename}\n{expires}".encode())
+    return base64.urlsafe_b64encode(mac.digest()[:16]).rstrip(b"=").decode()
+
+
+class MediaUrls:
+    """``filename -> URL`` with the prefix (and signing key) prepared once; only private files are signed."""
+
+    __slots__ = ("prefix", "expires", "_mac")
+
+    def __init__(self, prefix, mac=None, expires=None):
+        self.prefix = prefix
+        self.expires = expires
+        self._mac = mac
+
+    def __call__(self, filename):
+        path = filename if _SAFE_FILENAME.match(filename) else quote(filename)
+        if self._mac is None or not filename.startswith(_PRIVATE_PREFIX):
+            return self.prefix + path
+        return f"{self.prefix}{path}?e={self.expires}&s={_signature(self._mac, filename, self.expires)}"
+
+
+def urls():
+    """URL builder for the current request."""
+    config = current_app.config
+    prefix = config["MEDIA_BASE_URL"] or request.host_url[:-1] + request.script_root + UPLOADS_PATH
+    mac = current_app.extensions["media_mac"]
+    if mac is None:
+        return MediaUrls(prefix)
+    ttl = config["MEDIA_URL_TTL"]
+    return MediaUrls(prefix, mac, (int(time.time()) // ttl + 2) * ttl)
+
+
+def is_private(field):
+    """Whether new uploads for ``field`` go to private/ and are served through signed links."""
+    return field in current_app.config["MEDIA_PRIVATE_FIELDS"]
+
+
+def verify(filename, expires, signature):
+    """Check the ``e``/``s`` query arguments of a media URL; public files need none."""
+    mac = current_app.extensions["media_mac"]
+    if mac is None or not filename.startswith(_PRIVATE_PREFIX):
+        return True
+    if not expires or not signature or not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(mac, filename, int(expires)))
+
+
+def init_app(app):
+    app.config.setdefault("MEDIA_BASE_URL", "")
+    app.config.setdefault("MEDIA_SIGNING_KEY", "")
+    app.config.setdefault("MEDIA_URL_TTL", 3600)
+    app.config.setdefault("MEDIA_PRIVATE_FIELDS", "")
+    base = app.config["MEDIA_BASE_URL"]
+    if base and not base.endswith("/"):
+        app.config["MEDIA_BASE_URL"] = base + "/"
+    key = app.config["MEDIA_SIGNING_KEY"]
+    fields = app.config["MEDIA_PRIVATE_FIELDS"]
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    fields = frozenset(fields)
+    unknown = fields - set(PRIVATE_FIELD_CHOICES)
+    if unknown:
+        raise RuntimeError(f"MEDIA_PRIVATE_FIELDS: unknown field(s) {', '.join(sorted(unknown))}")
+    if fields and not key:
+        raise RuntimeError("MEDIA_PRIVATE_FIELDS needs MEDIA_SIGNING_KEY")
+    app.config["MEDIA_PRIVATE_FIELDS"] = fields
+    app.extensions["media_mac"] = hmac.new(key.encode(), digestmod=hashlib.sha256) if key else None
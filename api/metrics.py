@@ -0,0 +1,251 @@
+# api/metrics.py - metrics بصيغة Prometheus من غير أي مكتبة خارجية
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt
+
+import log_setup
+import tokens
+
+metrics_bp = Blueprint("metrics", __name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackMetric(_Metric):
+    """Values are read at scrape time from ``fn() -> {labels: value}``."""
+
+    def __init__(self, name, documentation, labelnames, fn, type="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+        self.type = type
+
+    def collect(self):
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self.fn().items()]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                # عدادات غير تراكمية لكل bucket + [sum, count]
+                item = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            item[0][i] += 1
+            item[1] += value
+            item[2] += 1
+
+    def collect(self):
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        self._metrics.pop(name, None)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "api_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")))
+LATENCY = registry.register(Histogram(
+    "api_request_duration_seconds", "HTTP request latency by route.", ("route", "method")))
+IN_FLIGHT = registry.register(Gauge(
+    "api_requests_in_flight", "Requests currently being handled."))
+DB_STATEMENTS = registry.register(Counter(
+    "api_db_statements_total", "SQL statements executed, by verb.", ("verb",)))
+DB_SECONDS = registry.register(Histogram(
+    "api_db_statement_duration_seconds", "SQL statement execution time, by verb.", ("verb",), DB_BUCKETS))
+UPLOAD_BYTES = registry.register(Counter(
+    "api_upload_bytes_total", "Bytes written to the upload folder.", ("kind",)))
+UPLOAD_FILES = registry.register(Counter(
+    "api_upload_files_total", "Files written to the upload folder.", ("kind",)))
+
+# الكاشات بتسجل نفسها هنا: اسم -> function بترجع (hits, misses)
+_caches = {}
+
+
+def register_cache(name, stats):
+    _caches[name] = stats
+
+
+def _cache_values():
+    values = {}
+    for name, stats in list(_caches.items()):
+        hits, misses = stats()
+        values[(name, "hit")] = hits
+        values[(name, "miss")] = misses
+    return values
+
+
+def _cache_ratios():
+    ratios = {}
+    for name, stats in list(_caches.items()):
+        hits, misses = stats()
+        ratios[(name,)] = round(hits / (hits + misses), 4) if hits + misses else 0
+    return ratios
+
+
+registry.register(CallbackMetric(
+    "api_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"), _cache_values, "counter"))
+registry.register(CallbackMetric(
+    "api_cache_hit_ratio", "Cache hit ratio since start.", ("cache",), _cache_ratios))
+
+
+def record_upload(kind, path):
+    UPLOAD_FILES.inc(kind=kind)
+    UPLOAD_BYTES.inc(os.path.getsize(path), kind=kind)
+
+
+@log_setup.on_query
+def _statement_timed(statement, start, seconds):
+    verb = statement.lstrip()[:6].upper()
+    if verb not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        verb = "OTHER"
+    DB_STATEMENTS.inc(verb=verb)
+    DB_SECONDS.observe(seconds, verb=verb)
+
+
+def _authorized():
+    # الـ scraper بـ METRICS_TOKEN، وغير كده أدمن بس
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    try:
+        tokens.verify_cached()
+    except Exception:
+        return False
+    return get_jwt().get("role") == "admin"
+
+
+@metrics_bp.get("/api/metrics")
+def metrics_endpoint():
+    if not _authorized():
+        return jsonify({"ok": False, "error": "Unauthorized"}), 401
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    if not app.config.setdefault("METRICS_ENABLED", True):
+        return
+
+    @app.before_request
+    def metrics_start():
+        g.metrics_start = time.perf_counter()
+        g.metrics_in_flight = True
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def metrics_observe(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            # نستخدم الـ rule مش الـ path عشان /api/units/1 و /api/units/2 يبقوا سطر واحد
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+            REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def metrics_done(exc):
+        if g.pop("metrics_in_flight", False):
+            IN_FLIGHT.dec()
+
+    cache = app.extensions.get("token_cache")
+    if cache is not None:
+        register_cache("jwt_verified", lambda: (cache.hits, cache.misses))
+    catalog = app.extensions.get("catalog_cache")
+    if catalog is not None:
+        register_cache("catalog", lambda: (catalog.hits, catalog.misses))
+
+    app.register_blueprint(metrics_bp)
@@ -0,0 +1,30 @@
+"""Add updated_at to units
+
+Revision ID: 3a7c1e9b5d42
+Revises: cfb3d60664d0
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7c1e9b5d42'
+down_revision = 'cfb3d60664d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_units_updated_at'), ['updated_at'], unique=False)
+
+    op.execute("UPDATE units SET updated_at = created_at WHERE updated_at IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_units_updated_at'))
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,70 @@
+"""Add inventory_summary table and units.project_id index
+
+Revision ID: 5c9d2a7e4b13
+Revises: 8e2f4b6c1a90
+Create Date: 2026-10-19 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c9d2a7e4b13'
+down_revision = '8e2f4b6c1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_summary',
+        sa.Column('scope', sa.String(length=10), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.Column('units_count', sa.Integer(), nullable=False),
+        sa.Column('available', sa.Integer(), nullable=False),
+        sa.Column('reserved', sa.Integer(), nullable=False),
+        sa.Column('sold', sa.Integer(), nullable=False),
+        sa.Column('min_price', sa.BigInteger(), nullable=True),
+        sa.Column('max_price', sa.BigInteger(), nullable=True),
+        sa.Column('sum_price_per_sqm', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('scope', 'ref_id')
+    )
+    with op.batch_alter_table('inventory_summary', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inventory_summary_company_id'), ['company_id'], unique=False)
+
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_units_project_id'), ['project_id'], unique=False)
+
+    # الأرقام الحالية من الوحدات الموجودة
+    op.execute("""
+        INSERT INTO inventory_summary (scope, ref_id, company_id, units_count, available, reserved, sold,
+                                       min_price, max_price, sum_price_per_sqm)
+        SELECT 'project', p.id, p.company_id, COUNT(u.id),
+               COALESCE(SUM(CASE WHEN u.status = 'available' THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN u.status = 'reserved' THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN u.status = 'sold' THEN 1 ELSE 0 END), 0),
+               MIN(CAST(u.sqm * u.price_per_sqm AS BIGINT)), MAX(CAST(u.sqm * u.price_per_sqm AS BIGINT)),
+               COALESCE(SUM(u.price_per_sqm), 0)
+        FROM projects p LEFT OUTER JOIN units u ON u.project_id = p.id
+        GROUP BY p.id, p.company_id
+    """)
+    op.execute("""
+        INSERT INTO inventory_summary (scope, ref_id, company_id, units_count, available, reserved, sold,
+                                       min_price, max_price, sum_price_per_sqm)
+        SELECT 'company', company_id, company_id, SUM(units_count), SUM(available), SUM(reserved), SUM(sold),
+               MIN(min_price), MAX(max_price), SUM(sum_price_per_sqm)
+        FROM inventory_summary WHERE scope = 'project'
+        GROUP BY company_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_units_project_id'))
+
+    with op.batch_alter_table('inventory_summary', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventory_summary_company_id'))
+
+    op.drop_table('inventory_summary')
@@ -0,0 +1,34 @@
+"""Add upload_candidates table
+
+Revision ID: a5d8e3c7f190
+Revises: f3a9c7e1b6d4
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d8e3c7f190'
+down_revision = 'f3a9c7e1b6d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_candidates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('released_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_candidates', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_candidates_released_at'), ['released_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('upload_candidates', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_candidates_released_at'))
+
+    op.drop_table('upload_candidates')
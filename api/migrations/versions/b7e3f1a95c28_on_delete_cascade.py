@@ -0,0 +1,47 @@
+"""ON DELETE CASCADE for projects.company_id and units.project_id
+
+Revision ID: b7e3f1a95c28
+Revises: 5c9d2a7e4b13
+Create Date: 2026-10-19 20:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f1a95c28'
+down_revision = '5c9d2a7e4b13'
+branch_labels = None
+depends_on = None
+
+# الجداول اتعملت بـ create_all فالـ FK ملهاش اسم على SQLite - batch بيديها الاسم ده
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+FOREIGN_KEYS = [
+    ('projects', 'company_id', 'companies'),
+    ('units', 'project_id', 'projects'),
+]
+
+
+def _fk_name(table, column, referred):
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if fk['constrained_columns'] == [column] and fk.get('name'):
+            return fk['name']
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _set_ondelete(ondelete):
+    for table, column, referred in FOREIGN_KEYS:
+        name = _fk_name(table, column, referred)
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(f'fk_{table}_{column}_{referred}', referred, [column], ['id'],
+                                        ondelete=ondelete)
+
+
+def upgrade():
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
@@ -0,0 +1,32 @@
+"""Add videos to projects and units
+
+Revision ID: d41a6c8e2f57
+Revises: b7e3f1a95c28
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a6c8e2f57'
+down_revision = 'b7e3f1a95c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('videos', sa.Text(), nullable=True))
+
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('videos', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_column('videos')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('videos')
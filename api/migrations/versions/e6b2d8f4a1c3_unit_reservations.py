@@ -0,0 +1,32 @@
+"""Add version and reservation columns to units
+
+Revision ID: e6b2d8f4a1c3
+Revises: d41a6c8e2f57
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b2d8f4a1c3'
+down_revision = 'd41a6c8e2f57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('reserved_by', sa.String(length=80), nullable=True))
+        batch_op.add_column(sa.Column('reserved_until', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_units_reserved_until'), ['reserved_until'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_units_reserved_until'))
+        batch_op.drop_column('reserved_until')
+        batch_op.drop_column('reserved_by')
+        batch_op.drop_column('version')
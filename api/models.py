@@ -1,11 +1,26 @@
 # 3. api/models.py - الإصدار المصحح
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
+import sqlite3
 
 db = SQLAlchemy()
 
+
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # SQLite بيتجاهل ON DELETE CASCADE إلا لو foreign_keys شغالة على الاتصال
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        # WAL: القراية مش بتستنى الكتابة، والكتابات بتستنى بعض (busy timeout) بدل "database is locked"
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
 class User(db.Model):
     __tablename__ = "users"
     
@@ -16,7 +31,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, raw):
-        self.password_hash = generate_password_hash(raw)
+        method = current_app.config.get("PASSWORD_HASH_METHOD") if has_app_context() else None
+        self.password_hash = generate_password_hash(raw, method=method) if method else generate_password_hash(raw)
 
     def check_password(self, raw):
         return check_password_hash(self.password_hash, raw)
@@ -39,7 +55,11 @@ class Company(db.Model):
     description = db.Column(db.Text)
     contact_info = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    projects = db.relationship("Project", backref="company", cascade="all, delete-orphan")
+    # الحذف بيتعمل في الداتابيز (ON DELETE CASCADE) بدل ما SQLAlchemy يحمل كل الأبناء
+    projects = db.relationship("Project", backref="company", cascade="all, delete-orphan", passive_deletes=True)
+    inventory = db.relationship(
+        "InventorySummary", uselist=False, viewonly=True, lazy="selectin",
+        primaryjoin="and_(InventorySummary.scope == 'company', foreign(InventorySummary.ref_id) == Company.id)")
     
     def get_contact_info(self):
         try:
@@ -55,30 +75,41 @@ class Company(db.Model):
             "logo": self.logo,
             "description": self.description,
             "contact_info": self.get_contact_info(),
-            "created_at": self.created_at.isoformat()
+            "created_at": self.created_at.isoformat(),
+            "inventory": InventorySummary.summary_dict(self.inventory)
         }
 
 class Project(db.Model):
     __tablename__ = "projects"
     
     id = db.Column(db.Integer, primary_key=True)
-    company_id = db.Column(db.Integer, db.ForeignKey("companies.id"), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
     slug = db.Column(db.String(80), index=True, nullable=False)
     title = db.Column(db.String(150), nullable=False)
     location = db.Column(db.String(150))
     description = db.Column(db.Text)
     images = db.Column(db.Text)
+    videos = db.Column(db.Text)
     features = db.Column(db.Text)
     status = db.Column(db.String(20), default="active")
     order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    units = db.relationship("Unit", backref="project", cascade="all, delete-orphan")
+    units = db.relationship("Unit", backref="project", cascade="all, delete-orphan", passive_deletes=True)
+    inventory = db.relationship(
+        "InventorySummary", uselist=False, viewonly=True, lazy="selectin",
+        primaryjoin="and_(InventorySummary.scope == 'project', foreign(InventorySummary.ref_id) == Project.id)")
     
     def get_images(self):
         try:
             return json.loads(self.images or "[]")
         except:
             return []
+
+    def get_videos(self):
+        try:
+            return json.loads(self.videos or "[]")
+        except:
+            return []
     
     def get_features(self):
         try:
@@ -95,18 +126,21 @@ class Project(db.Model):
             "location": self.location,
             "description": self.description,
             "images": self.get_images(),
+            "videos": self.get_videos(),
             "features": self.get_features(),
             "status": self.status,
             "order": self.order,
             "created_at": self.created_at.isoformat(),
-            "units_count": len(self.units)
+            # من جدول الملخص بدل ما نحمل كل الوحدات
+            "units_count": self.inventory.units_count if self.inventory else 0,
+            "inventory": InventorySummary.summary_dict(self.inventory)
         }
 
 class Unit(db.Model):
     __tablename__ = "units"
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     code = db.Column(db.String(80), index=True, nullable=False)
     title = db.Column(db.String(150))
     sqm = db.Column(db.Float, nullable=False)
@@ -115,11 +149,20 @@ class Unit(db.Model):
     bedrooms = db.Column(db.Integer, default=0)
     bathrooms = db.Column(db.Integer, default=0)
     images = db.Column(db.Text)
+    videos = db.Column(db.Text)
     floor_plan = db.Column(db.String(255))
     amenities = db.Column(db.Text)
     status = db.Column(db.String(20), default="available")
+    # بيزيد مع كل كتابة - الحجز والتعديل بيكتبوا بشرط إن النسخة ما اتغيرتش (reservations.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    reserved_by = db.Column(db.String(80))
+    reserved_until = db.Column(db.DateTime, index=True)
     unit_metadata = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # أي flush للوحدة = UPDATE ... WHERE version=<اللي اتقرا>؛ لو حد سبقنا بيطلع StaleDataError
+    __mapper_args__ = {"version_id_col": version}
 
     # الدوال المضافة للإصلاح
     def get_images(self):
@@ -128,6 +171,12 @@ class Unit(db.Model):
         except:
             return []
 
+    def get_videos(self):
+        try:
+            return json.loads(self.videos or "[]")
+        except:
+            return []
+
     def get_amenities(self):
         try:
             return json.loads(self.amenities or "[]")
@@ -156,10 +205,97 @@ class Unit(db.Model):
             "bedrooms": self.bedrooms,
             "bathrooms": self.bathrooms,
             "images": self.get_images(),
+            "videos": self.get_videos(),
             "floor_plan": self.floor_plan,
             "amenities": self.get_amenities(),
             "status": self.status,
+            "version": self.version,
+            "reserved_until": self.reserved_until.isoformat() if self.reserved_until else None,
             "total_price": self.total_price,
             "metadata": self.get_metadata(),
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ChangeLog(db.Model):
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_data(self):
+        try:
+            return json.loads(self.data) if self.data else None
+        except:
+            return None
+
+    def to_dict(self):
+        return {
+            "seq": self.seq,
+            "entity": self.entity,
+            "entity_id": self.entity_id,
+            "op": self.op,
+            "data": self.get_data(),
             "created_at": self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (db.UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(80), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64))
+    # NULL = الـ request الأصلي لسه شغال
+    status_code = db.Column(db.Integer)
+    headers = db.Column(db.Text)
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class UploadCandidate(db.Model):
+    __tablename__ = "upload_candidates"
+
+    # ملف اتفك من صف (حذف أو استبدال) - upload_gc بيمسحه لو ما حدش رجع شاور عليه
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    released_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class InventorySummary(db.Model):
+    # عدد الوحدات والأسعار لكل مشروع/شركة (scope + ref_id) - inventory.py بيحدثها مع كل تعديل وحدة
+    __tablename__ = "inventory_summary"
+
+    scope = db.Column(db.String(10), primary_key=True)
+    ref_id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, index=True)
+    units_count = db.Column(db.Integer, nullable=False, default=0)
+    available = db.Column(db.Integer, nullable=False, default=0)
+    reserved = db.Column(db.Integer, nullable=False, default=0)
+    sold = db.Column(db.Integer, nullable=False, default=0)
+    min_price = db.Column(db.BigInteger)
+    max_price = db.Column(db.BigInteger)
+    sum_price_per_sqm = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def summary_dict(row):
+        if row is None:
+            return {"units_count": 0, "available": 0, "reserved": 0, "sold": 0,
+                    "min_price": None, "max_price": None, "avg_price_per_sqm": None}
+        return row.to_dict()
+
+    def to_dict(self):
+        return {
+            "units_count": self.units_count,
+            "available": self.available,
+            "reserved": self.reserved,
+            "sold": self.sold,
+            "min_price": self.min_price,
+            "max_price": self.max_price,
+            "avg_price_per_sqm": round(self.sum_price_per_sqm / self.units_count) if self.units_count else None
+        }
@@ -0,0 +1,138 @@
+# api/profiling.py - profiling لعينة من الـ requests (أو بطلب من الأدمن بـ X-Profile)
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt
+
+import log_setup
+import tokens
+
+
+class ProfileStore:
+    """Keeps the last ``size`` profiles of this process in memory."""
+
+    def __init__(self, size=50):
+        self._items = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            entry["id"] = next(self._ids)
+            self._items.append(entry)
+        return entry["id"]
+
+    def list(self):
+        with self._lock:
+            items = list(self._items)
+        return [{k: v for k, v in e.items() if k not in ("profile", "sql")} for e in reversed(items)]
+
+    def get(self, pid):
+        with self._lock:
+            for entry in self._items:
+                if entry["id"] == pid:
+                    return entry
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+@log_setup.on_query
+def _sql_timed(statement, start, seconds):
+    if not has_request_context() or "profile_sql" not in g:
+        return
+    timeline = g.profile_sql
+    if len(timeline) < g.profile_sql_limit:
+        timeline.append({
+            "at_ms": round((start - g.profile_started) * 1000, 2),
+            "ms": round(seconds * 1000, 2),
+            "sql": statement[:500],
+        })
+    else:
+        g.profile_sql_dropped += 1
+
+
+def _admin_requested():
+    if not request.headers.get("X-Profile"):
+        return False
+    try:
+        tokens.verify_cached()
+    except Exception:
+        return False
+    return get_jwt().get("role") == "admin"
+
+
+def init_app(app):
+    app.config.setdefault("PROFILE_SAMPLE_RATE", 0.0)
+    app.config.setdefault("PROFILE_MAX_ENTRIES", 50)
+    app.config.setdefault("PROFILE_TOP_FUNCTIONS", 40)
+    app.config.setdefault("PROFILE_MAX_SQL", 200)
+    store = ProfileStore(app.config["PROFILE_MAX_ENTRIES"])
+    app.extensions["profiles"] = store
+
+    @app.before_request
+    def start_profile():
+        rate = app.config["PROFILE_SAMPLE_RATE"]
+        if rate > 0 and random.random() < rate:
+            reason = "sampled"
+        elif _admin_requested():
+            reason = "requested"
+        else:
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # فيه profiler تاني شغال على نفس الـ thread
+            return
+        g.profiler = profiler
+        g.profile_reason = reason
+        g.profile_started = time.perf_counter()
+        g.profile_sql = []
+        g.profile_sql_limit = app.config["PROFILE_MAX_SQL"]
+        g.profile_sql_dropped = 0
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        duration_ms = (time.perf_counter() - g.profile_started) * 1000
+
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(app.config["PROFILE_TOP_FUNCTIONS"])
+        sql = g.pop("profile_sql")
+        pid = store.add({
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "reason": g.profile_reason,
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "route": request.url_rule.rule if request.url_rule else None,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 2),
+            "sql_count": len(sql) + g.profile_sql_dropped,
+            "sql_ms": round(sum(q["ms"] for q in sql), 2),
+            "sql": sql,
+            "profile": out.getvalue(),
+        })
+        response.headers["X-Profile-Id"] = str(pid)
+        return response
+
+    @app.teardown_request
+    def drop_profile(exc):
+        # لو الـ request وقع قبل after_request
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
@@ -0,0 +1,175 @@
+# api/reservations.py - حجز وحدة من غير ما اتنين ياخدوها في نفس اللحظة
+#
+#   POST /api/units/<id>/reserve   {"version": n اختياري, "ttl": ثواني اختياري}
+#   POST /api/units/<id>/release   {"version": n اختياري}
+#
+# الحجز UPDATE واحد شرطه status='available' (و version لو اتبعت). مفيش قراءة قبل
+# الكتابة: الـ database بترتب الـ UPDATEs المتزامنة (row lock في Postgres/MySQL،
+# write lock في SQLite) واللي الـ UPDATE بتاعه لمس صف هو اللي كسب، والباقي 409.
+# كل كتابة بتزود version، فالـ client اللي معاه نسخة قديمة بياخد 409 بدل ما يكتب
+# فوق تعديل حد تاني. الحجز اللي وقته خلص بيرجع available من start_sweeper، ولحد ما
+# الـ sweeper يعدي reserve بيعتبره متاح.
+import threading
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import select, update
+
+from models import db, Unit
+from changes import record_change
+from tokens import token_required
+import inventory
+import metrics
+
+reservations_bp = Blueprint("reservations", __name__, url_prefix="/api/units")
+
+RESERVATIONS = metrics.registry.register(metrics.Counter(
+    "api_unit_reservations_total", "Reserve/release attempts on units.", ("op", "result")))
+
+SWEEP_BATCH = 500
+
+# الـ UPDATE بيعدي على الـ session من غير ما يدور على objects في الـ identity map
+_NO_SYNC = {"synchronize_session": False}
+
+
+def _expected_version(data):
+    version = data.get("version")
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        return False
+    return version
+
+
+def _is_admin():
+    return get_jwt().get("role") == "admin"
+
+
+def _conflict(uid, op, version):
+    # الـ UPDATE ما لمسش حاجة - نرجع الحالة الحالية عشان الـ client يعرف ليه
+    db.session.rollback()
+    row = db.session.execute(
+        select(Unit.status, Unit.version, Unit.reserved_by).where(Unit.id == uid)).first()
+    if row is None:
+        return jsonify({"ok": False, "error": "Unit not found"}), 404
+    data = {"id": uid, "status": row.status, "version": row.version}
+    if op == "release" and row.status == "reserved" and row.reserved_by != get_jwt_identity() and not _is_admin():
+        RESERVATIONS.inc(op=op, result="forbidden")
+        return jsonify({"ok": False, "error": "Unit is reserved by another user", "data": data}), 403
+    RESERVATIONS.inc(op=op, result="conflict")
+    if version is not None and version != row.version:
+        error = "Unit was modified, reload and retry"
+    else:
+        error = f"Unit is {row.status}"
+    return jsonify({"ok": False, "error": error, "data": data}), 409
+
+
+def _reserve(uid, condition, values):
+    result = db.session.execute(
+        update(Unit).where(Unit.id == uid, *condition).values(**values), execution_options=_NO_SYNC)
+    return result.rowcount == 1
+
+
+@reservations_bp.post("/<int:uid>/reserve")
+@token_required()
+def reserve_unit(uid):
+    data = request.get_json(silent=True) or {}
+    version = _expected_version(data)
+    ttl = data.get("ttl", current_app.config["RESERVATION_TTL"])
+    if version is False or not isinstance(ttl, int) or isinstance(ttl, bool) or ttl <= 0:
+        return jsonify({"ok": False, "error": "version and ttl must be integers"}), 400
+    ttl = min(ttl, current_app.config["RESERVATION_MAX_TTL"])
+
+    now = datetime.utcnow()
+    condition = [Unit.version == version] if version is not None else []
+    values = {"status": "reserved", "reserved_by": get_jwt_identity(),
+              "reserved_until": now + timedelta(seconds=ttl), "version": Unit.version + 1}
+
+    if _reserve(uid, [Unit.status == "available", *condition], values):
+        u = db.session.get(Unit, uid)
+        project_id, _, price, price_per_sqm = inventory.snapshot(u)
+        inventory.unit_changed((project_id, "available", price, price_per_sqm), u)
+    elif _reserve(uid, [Unit.status == "reserved", Unit.reserved_until < now, *condition], values):
+        # حجز قديم خلص وقته والـ sweeper لسه ما عداش: reserved -> reserved، المخزون زي ما هو
+        u = db.session.get(Unit, uid)
+    else:
+        return _conflict(uid, "reserve", version)
+
+    record_change("unit", uid, "update", u.to_dict())
+    db.session.commit()
+    RESERVATIONS.inc(op="reserve", result="ok")
+    current_app.logger.info("Unit %s reserved by %s until %s", uid, values["reserved_by"], values["reserved_until"])
+    return jsonify({"ok": True, "data": u.to_dict()})
+
+
+@reservations_bp.post("/<int:uid>/release")
+@token_required()
+def release_unit(uid):
+    data = request.get_json(silent=True) or {}
+    version = _expected_version(data)
+    if version is False:
+        return jsonify({"ok": False, "error": "version must be an integer"}), 400
+
+    condition = [Unit.status == "reserved"]
+    if version is not None:
+        condition.append(Unit.version == version)
+    if not _is_admin():
+        # غير الأدمن يفك حجزه هو بس (غير كده 403)
+        condition.append(Unit.reserved_by == get_jwt_identity())
+    values = {"status": "available", "reserved_by": None, "reserved_until": None, "version": Unit.version + 1}
+    if not _reserve(uid, condition, values):
+        return _conflict(uid, "release", version)
+
+    u = db.session.get(Unit, uid)
+    project_id, _, price, price_per_sqm = inventory.snapshot(u)
+    inventory.unit_changed((project_id, "reserved", price, price_per_sqm), u)
+    record_change("unit", uid, "update", u.to_dict())
+    db.session.commit()
+    RESERVATIONS.inc(op="release", result="ok")
+    current_app.logger.info("Unit %s released", uid)
+    return jsonify({"ok": True, "data": u.to_dict()})
+
+
+def expire_reservations(now=None):
+    """Return expired reservations to "available"; returns how many units changed."""
+    now = now or datetime.utcnow()
+    expired = (Unit.status == "reserved") & (Unit.reserved_until < now)
+    rows = db.session.execute(select(Unit.id, Unit.project_id).where(expired).limit(SWEEP_BATCH)).all()
+    if not rows:
+        return 0
+    ids = [r.id for r in rows]
+    # نفس الشرط تاني في الـ UPDATE: وحدة اتحجزت من جديد بين الـ SELECT والـ UPDATE ما تتلمسش
+    result = db.session.execute(
+        update(Unit).where(Unit.id.in_(ids), expired)
+        .values(status="available", reserved_by=None, reserved_until=None, version=Unit.version + 1),
+        execution_options=_NO_SYNC)
+    inventory.refresh_projects({r.project_id for r in rows})
+    for u in db.session.scalars(select(Unit).where(Unit.id.in_(ids), Unit.status == "available")):
+        record_change("unit", u.id, "update", u.to_dict())
+    db.session.commit()
+    RESERVATIONS.inc(result.rowcount, op="expire", result="ok")
+    return result.rowcount
+
+
+def start_sweeper(app, interval):
+    """Daemon thread that runs ``expire_reservations()`` every ``interval`` seconds."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                with app.app_context():
+                    expired = expire_reservations()
+                if expired:
+                    app.logger.info("Expired %s unit reservations", expired)
+            except Exception:
+                app.logger.exception("Reservation sweep failed")
+
+    threading.Thread(target=loop, name="reservation-sweeper", daemon=True).start()
+    return stop
+
+
+def init_app(app):
+    app.config.setdefault("RESERVATION_TTL", 15 * 60)
+    app.config.setdefault("RESERVATION_MAX_TTL", 24 * 3600)
+    app.config.setdefault("RESERVATION_SWEEP_INTERVAL", 60)
+    app.register_blueprint(reservations_bp)
@@ -0,0 +1,192 @@
+# api/resumable.py - رفع الملفات الكبيرة (فيديو، مخططات) على أجزاء وقابل للاستكمال
+#
+#   POST   /api/uploads/resumable              {"filename", "size", "attach": {"project_id"|"unit_id", "field"}}
+#   PATCH  /api/uploads/resumable/<id>         Upload-Offset: <n> + الـ bytes من n
+#   HEAD   /api/uploads/resumable/<id>         Upload-Offset / Upload-Length (يكمل منين بعد انقطاع)
+#   POST   /api/uploads/resumable/<id>/complete   ينقل الملف لـ UPLOAD_FOLDER ويربطه بالمشروع/الوحدة
+#   DELETE /api/uploads/resumable/<id>
+#
+# كل upload = <id>.part + <id>.json جوه UPLOAD_FOLDER/.resumable. الـ offset هو حجم الـ
+# .part على الديسك، فأي bytes وصلت قبل ما الاتصال يقع محسوبة. الـ uploads اللي
+# ما اتلمستش من RESUMABLE_EXPIRE_SECONDS بتتمسح من upload_gc.
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from werkzeug.exceptions import BadRequest, Conflict, NotFound, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.utils import secure_filename
+
+import media
+import uploads
+
+CHUNK = 1024 * 1024
+_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+# الحقول اللي ممكن الملف يتربط بيها والامتدادات المسموحة لكل واحد
+FIELDS = {
+    "project": {"images": uploads.ALLOWED_IMAGE_EXT, "videos": uploads.VIDEO_EXT},
+    "unit": {"images": uploads.ALLOWED_IMAGE_EXT, "videos": uploads.VIDEO_EXT,
+             "floor_plan": uploads.ALLOWED_IMAGE_EXT},
+}
+
+# PATCH (أو complete) واحد بس في نفس الوقت لكل upload
+_busy = set()
+_busy_lock = threading.Lock()
+
+
+@contextmanager
+def _claim(upload_id):
+    with _busy_lock:
+        if upload_id in _busy:
+            raise Conflict("Another request for this upload is in progress")
+        _busy.add(upload_id)
+    try:
+        yield
+    finally:
+        with _busy_lock:
+            _busy.discard(upload_id)
+
+
+def _dir(folder):
+    path = os.path.join(folder, ".resumable")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(folder, upload_id):
+    base = os.path.join(_dir(folder), upload_id)
+    return base + ".part", base + ".json"
+
+
+def _extension(filename):
+    return filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+
+
+def create(folder, filename, size, max_bytes, attach=None):
+    """Start an upload; ``attach`` is ``(entity, id, field)`` or None."""
+    if not isinstance(filename, str) or not filename:
+        raise BadRequest("filename required")
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise BadRequest("size must be a positive integer")
+    if size > max_bytes:
+        raise RequestEntityTooLarge(f"size is larger than {max_bytes} bytes")
+    allowed = FIELDS[attach[0]][attach[2]] if attach else uploads.ALLOWED_IMAGE_EXT | uploads.VIDEO_EXT
+    if _extension(filename) not in allowed:
+        raise UnsupportedMediaType(f"'{filename}': file type not allowed")
+
+    upload_id = secrets.token_urlsafe(18)
+    part, meta = _paths(folder, upload_id)
+    open(part, "xb").close()
+    state = {"id": upload_id, "filename": filename, "size": size, "attach": attach, "created_at": time.time()}
+    with open(meta, "x", encoding="utf-8") as f:
+        json.dump(state, f)
+    return state
+
+
+def load(folder, upload_id):
+    if not _ID.match(upload_id):
+        raise NotFound("Upload not found")
+    part, meta = _paths(folder, upload_id)
+    try:
+        with open(meta, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        raise NotFound("Upload not found")
+    try:
+        state["offset"] = os.path.getsize(part)
+    except FileNotFoundError:
+        raise NotFound("Upload not found")
+    return state
+
+
+def append(folder, state, offset, stream):
+    """Write ``stream`` at ``offset``; returns the new offset.
+
+    ``offset`` has to be the current size (409 otherwise), so a client
+    that lost its connection asks with HEAD first and resends from there.
+    """
+    part, _ = _paths(folder, state["id"])
+    with _claim(state["id"]):
+        current = os.path.getsize(part)
+        if offset != current:
+            raise Conflict(f"Upload-Offset is {offset} but the upload is at {current}")
+        written = current
+        with open(part, "r+b") as f:
+            f.seek(current)
+            try:
+                for chunk in iter(lambda: stream.read(CHUNK), b""):
+                    if written + len(chunk) > state["size"]:
+                        raise RequestEntityTooLarge(f"More than the declared {state['size']} bytes")
+                    if written < uploads.SNIFF_BYTES:
+                        _check_head(f, written, chunk, state)
+                    f.write(chunk)
+                    written += len(chunk)
+            finally:
+                # اللي اتكتب قبل انقطاع الاتصال بيفضل - الـ client يكمل من عنده
+                f.truncate(written)
+        return written
+
+
+def _check_head(f, written, chunk, state):
+    f.seek(0)
+    head = (f.read(written) + chunk)[:uploads.SNIFF_BYTES]
+    f.seek(written)
+    if len(head) < uploads.SNIFF_BYTES and written + len(chunk) < state["size"]:
+        return
+    _sniff(head, state)
+
+
+def _sniff(head, state):
+    kind = uploads.sniff(head) or uploads.sniff_video(head)
+    if kind is None or (kind in ("mp4", "mov", "webm")) != (_extension(state["filename"]) in uploads.VIDEO_EXT):
+        uploads.UPLOAD_REJECTED.inc(reason="type")
+        raise UnsupportedMediaType(f"'{state['filename']}' content does not match its type")
+    return kind
+
+
+def finish(folder, state, private=False):
+    """Move a complete upload into ``folder`` (or its private/ folder); returns the stored filename."""
+    part, meta = _paths(folder, state["id"])
+    target = os.path.join(folder, media.PRIVATE_DIR) if private else folder
+    with _claim(state["id"]):
+        offset = os.path.getsize(part)
+        if offset != state["size"]:
+            raise Conflict(f"Upload is at {offset} of {state['size']} bytes")
+        with open(part, "rb") as f:
+            kind = _sniff(f.read(uploads.SNIFF_BYTES), state)
+        filename = secure_filename(state["filename"])
+        if not _extension(filename):
+            # secure_filename بيشيل الحروف العربي
+            filename = f"upload.{kind}"
+        if private:
+            os.makedirs(target, exist_ok=True)
+        filename = uploads.reserve(target, filename)
+        os.replace(part, os.path.join(target, filename))
+        os.remove(meta)
+    return f"{media.PRIVATE_DIR}/{filename}" if private else filename
+
+
+def discard(folder, upload_id):
+    for path in _paths(folder, upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def expire(folder, max_age):
+    """Remove uploads with no PATCH for ``max_age`` seconds; returns how many."""
+    last = {}
+    with os.scandir(_dir(folder)) as entries:
+        for entry in entries:
+            upload_id = os.path.splitext(entry.name)[0]
+            last[upload_id] = max(last.get(upload_id, 0), entry.stat().st_mtime)
+    cutoff = time.time() - max_age
+    stale = [upload_id for upload_id, mtime in last.items() if mtime < cutoff and upload_id not in _busy]
+    for upload_id in stale:
+        discard(folder, upload_id)
+    return len(stale)
@@ -1,5 +1,6 @@
 # api/test_seed.py
 from app import create_app
+from cli import init_db
 from models import db, Company, Project, Unit
 
 # أنشئ التطبيق
@@ -7,7 +8,7 @@ app = create_app()
 
 with app.app_context():
     print("🔹 جاري إنشاء الجداول...")
-    db.create_all()
+    init_db()
     print("✅ تم إنشاء الجداول")
     
     # تحقق أولاً إذا الشركة موجودة
@@ -0,0 +1,166 @@
+# api/security.py - سياسة الهاش + تنفيذ محدود للتحقق من كلمات السر + limiter للـ login
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def normalize_method(method):
+    """Expand a Werkzeug method string to the exact prefix it writes into hashes."""
+    parts = method.split(":")
+    if parts[0] == "scrypt":
+        defaults = ["scrypt", "32768", "8", "1"]
+    elif parts[0] == "pbkdf2":
+        defaults = ["pbkdf2", "sha256", str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return method
+    return ":".join(parts + defaults[len(parts):])
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated pool.
+
+    At most ``workers`` hashes run at once and at most ``queue`` more may
+    wait; anything beyond that is rejected with ``HasherBusy`` so a login
+    storm can't take every request thread and core away from catalog reads.
+    """
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_HASH_METHOD
+        self._pool = None
+        self._slots = None
+        self._timeout = 10.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.setdefault("PASSWORD_HASH_METHOD", DEFAULT_HASH_METHOD))
+        workers = app.config.setdefault("PASSWORD_HASH_WORKERS", 2)
+        queue = app.config.setdefault("PASSWORD_HASH_QUEUE", 16)
+        self._timeout = app.config.setdefault("PASSWORD_HASH_TIMEOUT", 10.0)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        app.extensions["password_hasher"] = self
+
+    def _run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self._timeout)
+        except FutureTimeout:
+            raise HasherBusy()
+
+    def hash(self, raw):
+        return self._run(generate_password_hash, raw, method=self.method)
+
+    def verify(self, pwhash, raw):
+        return self._run(check_password_hash, pwhash, raw)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split("$", 1)[0] != self.method
+
+
+class MemoryStore:
+    """Thread-safe in-memory counter store with per-key expiry."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return 0, 0.0
+            count, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return 0, 0.0
+            return count, expires
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            count, expires = self._data.get(key, (0, 0.0))
+            if expires <= now:
+                count, expires = 0, now + ttl
+            count += 1
+            self._data[key] = (count, expires)
+            if len(self._data) > self.max_keys:
+                self._prune(now)
+            return count, expires
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _prune(self, now):
+        for k in [k for k, (_, exp) in self._data.items() if exp <= now]:
+            del self._data[k]
+        # لو لسه كبير: نشيل الأقدم
+        overflow = len(self._data) - self.max_keys
+        if overflow > 0:
+            for k in sorted(self._data, key=lambda k: self._data[k][1])[:overflow]:
+                del self._data[k]
+
+
+class LoginLimiter:
+    """Locks a username or client IP out after too many failed logins."""
+
+    def __init__(self, app=None, store=None):
+        self.store = store or MemoryStore()
+        self.max_per_user = 5
+        self.max_per_ip = 20
+        self.window = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_per_user = app.config.setdefault("LOGIN_MAX_FAILURES", 5)
+        self.max_per_ip = app.config.setdefault("LOGIN_MAX_FAILURES_PER_IP", 20)
+        self.window = app.config.setdefault("LOGIN_LOCKOUT_SECONDS", 300)
+        app.extensions["login_limiter"] = self
+
+    @staticmethod
+    def keys(username, ip):
+        return f"user:{str(username).lower()}", f"ip:{ip}"
+
+    def retry_after(self, username, ip):
+        """Seconds until login is allowed again, 0 if not locked."""
+        user_key, ip_key = self.keys(username, ip)
+        wait = 0.0
+        for key, limit in ((user_key, self.max_per_user), (ip_key, self.max_per_ip)):
+            count, expires = self.store.get(key)
+            if count >= limit:
+                wait = max(wait, expires - time.monotonic())
+        return int(wait) + 1 if wait > 0 else 0
+
+    def record_failure(self, username, ip):
+        user_key, ip_key = self.keys(username, ip)
+        self.store.incr(user_key, self.window)
+        self.store.incr(ip_key, self.window)
+
+    def record_success(self, username, ip):
+        # عداد الـ IP لا يتصفر حتى لا يستخدم حساب صحيح لتصفير محاولات التخمين
+        user_key, _ = self.keys(username, ip)
+        self.store.delete(user_key)
+
+
+password_hasher = PasswordHasher()
+login_limiter = LoginLimiter()
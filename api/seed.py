@@ -1,11 +1,14 @@
 # api/seed.py
 from app import create_app
+from cli import bootstrap
 from models import db, Company, Project, Unit
 
 def run_seed():
     app = create_app()
     
     with app.app_context():
+        bootstrap()
+
         # ---------------- شركة ----------------
         company_slug = "Abu Zahra Developments"
         company_name = "Abu Zahra Developments"
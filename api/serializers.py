@@ -0,0 +1,307 @@
+# api/serializers.py - قراءة الكتالوج من غير ORM objects
+#
+# الـ endpoints بتاعة القراءة بتختار الأعمدة اللي محتاجاها بس كـ Core rows (tuple)
+# وبتحولها لنفس الـ dict اللي بيطلعه to_dict() في models.py بالظبط، والـ JSON
+# بيطلع بـ orjson لو متسطب.
+#
+#   ?fields=id,code,sqm              الأعمدة دي بس (لحد الـ SELECT)
+#   ?include=projects,units          الأبناء/الأب في query واحدة لكل مستوى
+#   ?fields[units]=id,code           fields للحاجات اللي اتعملها include
+import json
+
+from flask import abort
+from sqlalchemy import and_, select
+
+from models import db, Company, Project, Unit, InventorySummary
+from log_setup import TimedJSONProvider
+
+try:
+    import orjson
+except ImportError:  # اختياري - من غيره بنرجع للـ json العادي
+    orjson = None
+
+
+class FastJSONProvider(TimedJSONProvider):
+    """orjson-backed provider; same keys, order and types as Flask's default."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.pop("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.pop("indent", None):
+            option |= orjson.OPT_INDENT_2
+        # التواريخ وأي نوع مش معروف بيعدوا على نفس default بتاع Flask
+        return orjson.dumps(obj, default=kwargs.pop("default", self.default), option=option).decode()
+
+
+def _loads(text, fallback):
+    # نفس سلوك get_images/get_amenities/get_metadata
+    try:
+        return json.loads(text or fallback)
+    except Exception:
+        return json.loads(fallback)
+
+
+# ---------- Shapes ----------
+# كل entity = مجموعة fields، وكل field عارف الأعمدة اللي محتاجها والـ function
+# اللي بتطلع قيمته. ?fields= بيختار منهم، فالـ SELECT بيجيب الأعمدة دي بس.
+
+class Field:
+    __slots__ = ("columns", "fn")
+
+    def __init__(self, *columns, fn=None):
+        self.columns = columns
+        self.fn = fn
+
+
+def _json_list(urls, value):
+    return _loads(value, "[]")
+
+
+def _json_dict(urls, value):
+    return _loads(value, "{}")
+
+
+def _iso(urls, value):
+    return value.isoformat()
+
+
+def _image_urls(urls, value):
+    images = _loads(value, "[]")
+    return [urls(fn) for fn in images] if urls is not None else images
+
+
+def _file_url(urls, value):
+    return urls(value) if urls is not None and value else value
+
+
+def _inventory_dict(urls, units_count, available, reserved, sold, min_price, max_price, sum_price_per_sqm):
+    if units_count is None:
+        # مفيش صف ملخص لسه - زي InventorySummary.summary_dict(None)
+        units_count = available = reserved = sold = 0
+    return {
+        "units_count": units_count,
+        "available": available,
+        "reserved": reserved,
+        "sold": sold,
+        "min_price": min_price,
+        "max_price": max_price,
+        "avg_price_per_sqm": round(sum_price_per_sqm / units_count) if units_count else None,
+    }
+
+
+INVENTORY = Field(
+    InventorySummary.units_count, InventorySummary.available, InventorySummary.reserved,
+    InventorySummary.sold, InventorySummary.min_price, InventorySummary.max_price,
+    InventorySummary.sum_price_per_sqm, fn=_inventory_dict)
+
+
+class Shape:
+    """The public fields of one model, in ``to_dict()`` order."""
+
+    def __init__(self, name, model, fields, inventory_scope=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.inventory_scope = inventory_scope
+        self._plans = {}
+
+    def plan(self, wanted=None, extra=()):
+        """Columns and getters for ``wanted`` fields (all when None).
+
+        ``extra`` fields are selected too so ``Plan.value()`` can read them
+        (filters, include keys) but are left out of the output dicts.
+        """
+        wanted = tuple(self.fields) if wanted is None else tuple(wanted)
+        for name in wanted:
+            if name not in self.fields:
+                abort(400, f"Unknown field '{name}' for {self.name}")
+        key = (wanted, tuple(extra))
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = Plan(self, wanted, [name for name in extra if name not in wanted])
+            # عدد التركيبات محدود عملياً (الـ clients بيبعتوا نفس الـ fields دايماً)
+            if len(self._plans) < 256:
+                self._plans[key] = plan
+        return plan
+
+
+class Plan:
+    def __init__(self, shape, wanted, extra):
+        self.shape = shape
+        positions = {}
+        columns = []
+        getters = {}
+        for name in [*wanted, *extra]:
+            field = shape.fields[name]
+            indexes = []
+            for column in field.columns:
+                key = (column.class_.__name__, column.key)
+                if key not in positions:
+                    positions[key] = len(columns)
+                    columns.append(column)
+                indexes.append(positions[key])
+            getters[name] = (field.fn, indexes)
+        self.columns = columns
+        self.getters = getters
+        self.output = [(name, *getters[name]) for name in wanted]
+        self.needs_inventory = any(c.class_ is InventorySummary for c in columns)
+
+        stmt = select(*columns).select_from(shape.model)
+        if self.needs_inventory:
+            stmt = stmt.outerjoin(InventorySummary, and_(InventorySummary.scope == shape.inventory_scope,
+                                                         InventorySummary.ref_id == shape.model.id))
+        self._select = stmt
+        # الأعمدة العادية بتتنسخ بالـ index، والباقي بيعدي على الـ function بتاعته
+        self._plain = [(name, indexes[0]) for name, fn, indexes in self.output if fn is None]
+        self._computed = [(name, fn, indexes) for name, fn, indexes in self.output if fn is not None]
+
+    def select(self):
+        return self._select
+
+    def dict(self, row, urls=None):
+        out = {name: row[i] for name, i in self._plain}
+        for name, fn, indexes in self._computed:
+            out[name] = fn(urls, *[row[i] for i in indexes])
+        return out
+
+    def value(self, row, name, urls=None):
+        fn, indexes = self.getters[name]
+        return row[indexes[0]] if fn is None else fn(urls, *[row[i] for i in indexes])
+
+
+UNITS = Shape("units", Unit, {
+    "id": Field(Unit.id),
+    "project_id": Field(Unit.project_id),
+    "code": Field(Unit.code),
+    "title": Field(Unit.title),
+    "sqm": Field(Unit.sqm),
+    "price_per_sqm": Field(Unit.price_per_sqm),
+    "floor": Field(Unit.floor),
+    "bedrooms": Field(Unit.bedrooms),
+    "bathrooms": Field(Unit.bathrooms),
+    "images": Field(Unit.images, fn=_image_urls),
+    "videos": Field(Unit.videos, fn=_image_urls),
+    "floor_plan": Field(Unit.floor_plan, fn=_file_url),
+    "amenities": Field(Unit.amenities, fn=_json_list),
+    "status": Field(Unit.status),
+    "version": Field(Unit.version),
+    "reserved_until": Field(Unit.reserved_until, fn=lambda urls, value: value.isoformat() if value else None),
+    "total_price": Field(Unit.sqm, Unit.price_per_sqm, fn=lambda urls, sqm, price: int(sqm * price)),
+    "metadata": Field(Unit.unit_metadata, fn=_json_dict),
+    "created_at": Field(Unit.created_at, fn=_iso),
+    "updated_at": Field(Unit.updated_at, fn=lambda urls, value: value.isoformat() if value else None),
+})
+
+COMPANIES = Shape("companies", Company, {
+    "id": Field(Company.id),
+    "slug": Field(Company.slug),
+    "name": Field(Company.name),
+    "logo": Field(Company.logo),
+    "description": Field(Company.description),
+    "contact_info": Field(Company.contact_info, fn=_json_dict),
+    "created_at": Field(Company.created_at, fn=_iso),
+    "inventory": INVENTORY,
+}, inventory_scope="company")
+
+PROJECTS = Shape("projects", Project, {
+    "id": Field(Project.id),
+    "company_id": Field(Project.company_id),
+    "slug": Field(Project.slug),
+    "title": Field(Project.title),
+    "location": Field(Project.location),
+    "description": Field(Project.description),
+    "images": Field(Project.images, fn=_image_urls),
+    "videos": Field(Project.videos, fn=_image_urls),
+    "features": Field(Project.features, fn=_json_list),
+    "status": Field(Project.status),
+    "order": Field(Project.order),
+    "created_at": Field(Project.created_at, fn=_iso),
+    # من جدول الملخص بدل ما نحمل كل الوحدات
+    "units_count": Field(InventorySummary.units_count, fn=lambda urls, value: value or 0),
+    "inventory": INVENTORY,
+}, inventory_scope="project")
+
+PROJECT_ORDER = (Project.order.asc().nullslast(), Project.created_at.desc())
+UNIT_ORDER = (Unit.created_at.desc(),)
+
+
+# ---------- ?fields= / ?include= ----------
+
+def requested_fields(args, key="fields"):
+    """``?fields=id,code`` -> ["id", "code"]; None (all fields) when absent or empty."""
+    names = [name.strip() for name in (args.get(key) or "").split(",") if name.strip()]
+    return names or None
+
+
+def requested_includes(args, allowed):
+    value = args.get("include") or ""
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        abort(400, f"Unknown include '{sorted(unknown)[0]}'; allowed: {', '.join(allowed)}")
+    return names
+
+
+# الـ IN lists بتتقسم عشان عدد الـ queries يفضل محدود ومعروف
+IN_CHUNK = 500
+
+
+def _chunks(ids):
+    ids = list(dict.fromkeys(i for i in ids if i is not None))
+    for start in range(0, len(ids), IN_CHUNK):
+        yield ids[start:start + IN_CHUNK]
+
+
+def _children(shape, args, key, parent_column, parent_ids, order, urls):
+    """Rows of ``shape`` grouped by parent id: ({parent_id: [dict]}, [(id, dict)])."""
+    plan = shape.plan(requested_fields(args, f"fields[{key}]"), extra=("id", parent_column.key))
+    groups, items = {}, []
+    for chunk in _chunks(parent_ids):
+        for row in db.session.execute(plan.select().where(parent_column.in_(chunk)).order_by(*order)):
+            item = plan.dict(row, urls)
+            groups.setdefault(plan.value(row, parent_column.key), []).append(item)
+            items.append((plan.value(row, "id"), item))
+    return groups, items
+
+
+def _parents(shape, args, key, ids, urls, extra=()):
+    """Rows of ``shape`` by id: {id: (row values needed later, dict)}."""
+    plan = shape.plan(requested_fields(args, f"fields[{key}]"), extra=("id", *extra))
+    found = {}
+    for chunk in _chunks(ids):
+        for row in db.session.execute(plan.select().where(shape.model.id.in_(chunk))):
+            found[plan.value(row, "id")] = (row, plan.dict(row, urls))
+    return plan, found
+
+
+def embed_projects(companies, company_ids, args, urls, with_units=False):
+    """company["projects"] (and each project's "units") in one query per level."""
+    groups, projects = _children(PROJECTS, args, "projects", Project.company_id, company_ids, PROJECT_ORDER, urls)
+    for company, cid in zip(companies, company_ids):
+        company["projects"] = groups.get(cid, [])
+    if with_units:
+        embed_units([p for _, p in projects], [pid for pid, _ in projects], args, urls)
+
+
+def embed_units(projects, project_ids, args, urls):
+    groups, _ = _children(UNITS, args, "units", Unit.project_id, project_ids, UNIT_ORDER, urls)
+    for project, pid in zip(projects, project_ids):
+        project["units"] = groups.get(pid, [])
+
+
+def embed_company(projects, company_ids, args, urls):
+    _, found = _parents(COMPANIES, args, "company", company_ids, urls)
+    for project, cid in zip(projects, company_ids):
+        project["company"] = found[cid][1] if cid in found else None
+
+
+def embed_project(units, project_ids, args, urls, with_company=False):
+    plan, found = _parents(PROJECTS, args, "project", project_ids, urls, extra=("company_id",))
+    for unit, pid in zip(units, project_ids):
+        unit["project"] = found[pid][1] if pid in found else None
+    if with_company:
+        entries = list(found.values())
+        embed_company([d for _, d in entries], [plan.value(row, "company_id") for row, _ in entries], args, urls)
@@ -0,0 +1,71 @@
+# api/tests/conftest.py - app جديد بـ SQLite مؤقت لكل test
+#
+#   cd api && python -m pytest tests
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("JWT_SECRET_KEY", "test-secret-" + "x" * 32)
+    monkeypatch.setenv("LOG_FILE", "")
+    monkeypatch.setenv("IMAGE_WORKERS", "0")
+    monkeypatch.setenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+
+    from app import create_app
+    from cli import bootstrap
+    from models import db
+
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path / "uploads"))
+    os.makedirs(app.config["UPLOAD_FOLDER"])
+    with app.app_context():
+        bootstrap()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def token_for(app):
+    """``token_for(identity, role)`` -> Authorization headers for a fresh access token."""
+    from flask_jwt_extended import create_access_token
+
+    def make(identity, role="user"):
+        with app.app_context():
+            token = create_access_token(identity=identity, additional_claims={"role": role, "type": "access"})
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def admin(token_for):
+    return token_for("1", role="admin")
+
+
+@pytest.fixture
+def catalog(client, admin):
+    """One company, one project and three available units; returns their ids."""
+    client.post("/api/companies", json={"slug": "acme", "name": "Acme"}, headers=admin)
+    project = client.post("/api/projects", json={"company_slug": "acme", "slug": "tower", "title": "Tower"},
+                          headers=admin).get_json()["data"]
+    units = []
+    for i in range(3):
+        r = client.post("/api/units", json={"project_id": project["id"], "code": f"A-{i}", "sqm": 100 + i,
+                                            "price_per_sqm": 20000, "floor": str(i)}, headers=admin)
+        units.append(r.get_json()["data"]["id"])
+    return {"project_id": project["id"], "units": units}
@@ -0,0 +1,49 @@
+def _batch(client, headers, *requests):
+    return client.post("/api/batch", json={"requests": list(requests)}, headers=headers)
+
+
+def test_references_feed_later_requests(client, catalog, admin):
+    uid = catalog["units"][0]
+    r = _batch(client, admin,
+               {"method": "GET", "path": f"/api/units/{uid}", "query": {"fields": "id,project_id"}, "id": "unit"},
+               {"method": "GET", "path": "/api/projects/{{0.data.project_id}}"})
+    assert r.status_code == 200
+    first, second = r.get_json()["data"]
+    assert first["id"] == "unit" and first["status"] == 200
+    assert second["status"] == 200 and second["body"]["data"]["id"] == catalog["project_id"]
+
+
+def test_failed_dependency(client, catalog, admin):
+    r = _batch(client, admin,
+               {"method": "GET", "path": "/api/units/9999"},
+               {"method": "GET", "path": "/api/projects/{{0.data.project_id}}"})
+    statuses = [item["status"] for item in r.get_json()["data"]]
+    assert statuses == [404, 424]
+
+
+def test_writes_run_in_order_with_the_callers_token(client, catalog, admin, token_for):
+    uid = catalog["units"][1]
+    r = _batch(client, token_for("agent-1"),
+               {"method": "POST", "path": f"/api/units/{uid}/reserve", "body": {}},
+               {"method": "POST", "path": f"/api/units/{uid}/release", "body": {}})
+    assert [item["status"] for item in r.get_json()["data"]] == [200, 200]
+    assert client.get(f"/api/units/{uid}").get_json()["data"]["status"] == "available"
+
+
+def test_endpoints_outside_the_allowlist_are_rejected(client, catalog, admin):
+    r = _batch(client, admin,
+               {"method": "GET", "path": "/api/changes/stream"},
+               {"method": "GET", "path": "/api/metrics"},
+               {"method": "POST", "path": "/api/auth/login", "body": {}},
+               {"method": "GET", "path": "/api/health"})
+    statuses = [item["status"] for item in r.get_json()["data"]]
+    assert statuses == [400, 400, 400, 200]
+
+
+def test_invalid_items_fail_validation(client, admin, app):
+    assert _batch(client, admin).status_code == 400
+    r = _batch(client, admin, {"method": "TRACE", "path": "/api/health"}, {"path": "/api/batch"})
+    assert r.status_code == 400
+    assert [e["index"] for e in r.get_json()["errors"]] == [0, 1]
+    too_many = [{"path": "/api/health"}] * (app.config["BATCH_MAX_REQUESTS"] + 1)
+    assert _batch(client, admin, *too_many).status_code == 400
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from changes import fetch_changes, last_seq
+from models import db, ChangeLog
+
+
+def _feed(client, since, limit=100):
+    return client.get(f"/api/changes?since={since}&limit={limit}").get_json()
+
+
+def test_writes_show_up_in_seq_order(client, catalog, admin):
+    start = _feed(client, 0)["last_seq"]
+    uid = catalog["units"][0]
+    client.put(f"/api/units/{uid}", json={"title": "corner"}, headers=admin)
+    client.delete(f"/api/units/{uid}", headers=admin)
+
+    page = _feed(client, start)
+    assert [(c["entity"], c["entity_id"], c["op"]) for c in page["data"]] == [
+        ("unit", uid, "update"), ("unit", uid, "delete")]
+    assert page["last_seq"] == page["data"][-1]["seq"] and page["has_more"] is False
+    assert _feed(client, page["last_seq"]) == {"ok": True, "data": [], "last_seq": page["last_seq"],
+                                               "has_more": False}
+
+
+def test_pages_chain_through_last_seq(client, catalog):
+    seen, since = [], 0
+    while True:
+        page = _feed(client, since, limit=2)
+        seen += [c["seq"] for c in page["data"]]
+        since = page["last_seq"]
+        if not page["has_more"]:
+            break
+    assert seen == sorted(seen) and len(seen) == len(set(seen)) >= 5
+
+
+def _add(seq, created_at):
+    db.session.add(ChangeLog(seq=seq, entity="unit", entity_id=1, op="update", created_at=created_at))
+
+
+def test_sqlite_returns_rows_past_a_gap(app, catalog):
+    with app.app_context():
+        top = last_seq()
+        _add(top + 2, datetime.utcnow())
+        db.session.commit()
+        assert [c["seq"] for c in fetch_changes(top, 10)] == [top + 2]
+
+
+def test_other_databases_hold_back_at_a_fresh_gap(app, catalog, monkeypatch):
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, "name", "postgresql")
+        top = last_seq()
+        _add(top + 1, datetime.utcnow())
+        _add(top + 3, datetime.utcnow())
+        db.session.commit()
+        # top+2 ممكن تكون transaction لسه ما عملتش commit
+        assert [c["seq"] for c in fetch_changes(top, 10)] == [top + 1]
+
+        old = datetime.utcnow() - timedelta(seconds=app.config["CHANGES_GAP_TIMEOUT"] + 1)
+        db.session.query(ChangeLog).filter_by(seq=top + 3).update({"created_at": old})
+        db.session.commit()
+        assert [c["seq"] for c in fetch_changes(top, 10)] == [top + 1, top + 3]
+
+
+def test_stream_is_refused_when_all_slots_are_taken(app, client, monkeypatch):
+    import changes
+
+    monkeypatch.setattr(changes, "_streams", app.config.get("CHANGES_MAX_STREAMS", 4))
+    r = client.get("/api/changes/stream")
+    assert r.status_code == 503 and r.headers["Retry-After"] == "30"
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from models import db, IdempotencyKey, Unit
+
+
+def _create(client, headers, project_id, code="B-1", key="k-1"):
+    return client.post("/api/units", json={"project_id": project_id, "code": code, "sqm": 90,
+                                           "price_per_sqm": 10000, "floor": "1"},
+                       headers={**headers, "Idempotency-Key": key})
+
+
+def test_retry_replays_the_stored_response(app, client, catalog, admin):
+    first = _create(client, admin, catalog["project_id"])
+    assert first.status_code == 201
+    again = _create(client, admin, catalog["project_id"])
+    assert again.status_code == first.status_code
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
+    with app.app_context():
+        assert db.session.query(Unit).filter_by(code="B-1").count() == 1
+
+
+def test_same_key_with_a_different_body_is_rejected(client, catalog, admin):
+    _create(client, admin, catalog["project_id"])
+    r = _create(client, admin, catalog["project_id"], code="B-2")
+    assert r.status_code == 422
+
+
+def test_keys_are_scoped_per_user(client, catalog, admin, token_for):
+    _create(client, admin, catalog["project_id"])
+    r = _create(client, token_for("2", role="admin"), catalog["project_id"], code="B-2")
+    assert r.status_code == 201 and "Idempotent-Replayed" not in r.headers
+
+
+def test_key_still_pending_conflicts(app, client, catalog, admin):
+    with app.app_context():
+        db.session.add(IdempotencyKey(user_id="1", key="k-1", created_at=datetime.utcnow()))
+        db.session.commit()
+    assert _create(client, admin, catalog["project_id"]).status_code == 409
+
+
+def test_abandoned_key_is_taken_over(app, client, catalog, admin):
+    stale = datetime.utcnow() - timedelta(seconds=app.config["IDEMPOTENCY_PENDING_TIMEOUT"] + 5)
+    with app.app_context():
+        db.session.add(IdempotencyKey(user_id="1", key="k-1", created_at=stale))
+        db.session.commit()
+    r = _create(client, admin, catalog["project_id"])
+    assert r.status_code == 201 and "Idempotent-Replayed" not in r.headers
+
+
+def test_client_error_is_replayed(app, client, catalog, admin):
+    r = client.post("/api/units", json={"project_id": 9999, "code": "B-1", "sqm": 90, "price_per_sqm": 1,
+                                        "floor": "1"}, headers={**admin, "Idempotency-Key": "k-1"})
+    assert r.status_code == 404
+    # الـ 4xx بيتخزن زي أي response؛ الـ 5xx بس اللي بيفضّي المفتاح
+    again = client.post("/api/units", json={"project_id": 9999, "code": "B-1", "sqm": 90, "price_per_sqm": 1,
+                                            "floor": "1"}, headers={**admin, "Idempotency-Key": "k-1"})
+    assert again.status_code == 404 and again.headers["Idempotent-Replayed"] == "true"
+
+
+def test_invalid_key_is_rejected(client, catalog, admin):
+    r = _create(client, admin, catalog["project_id"], key="x" * 256)
+    assert r.status_code == 400
@@ -0,0 +1,54 @@
+from sqlalchemy import update
+
+from inventory import reconcile
+from models import db, InventorySummary
+
+
+def _totals(client, **args):
+    return client.get("/api/stats", query_string=args).get_json()["data"]["totals"]
+
+
+def test_writes_keep_the_summary_current(app, client, catalog, admin):
+    a, b, c = catalog["units"]
+    totals = _totals(client)
+    assert (totals["units_count"], totals["available"]) == (3, 3)
+    assert (totals["min_price"], totals["max_price"]) == (2_000_000, 2_040_000)
+
+    client.put(f"/api/units/{b}", json={"status": "sold"}, headers=admin)
+    client.delete(f"/api/units/{a}", headers=admin)
+    client.put(f"/api/units/{c}", json={"price_per_sqm": 10000}, headers=admin)
+
+    totals = _totals(client, company_slug="acme")
+    assert (totals["units_count"], totals["available"], totals["sold"]) == (2, 1, 1)
+    assert (totals["min_price"], totals["max_price"]) == (1_020_000, 2_020_000)
+    with app.app_context():
+        assert reconcile() == 0
+
+
+def test_reconcile_repairs_drift(app, client, catalog):
+    before = _totals(client)
+    with app.app_context():
+        db.session.execute(update(InventorySummary.__table__).values(available=99, min_price=1))
+        db.session.commit()
+
+        assert reconcile() == 2  # صف المشروع وصف الشركة
+        assert reconcile() == 0
+        rows = db.session.query(InventorySummary).all()
+        assert [(row.scope, row.available, row.min_price) for row in sorted(rows, key=lambda r: r.scope)] == [
+            ("company", 3, 2_000_000), ("project", 3, 2_000_000)]
+    assert _totals(client) == before
+
+
+def test_project_breakdown(client, catalog, token_for):
+    uid = catalog["units"][0]
+    client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-1"))
+    projects = client.get("/api/stats", query_string={"project_id": catalog["project_id"]}).get_json()["data"]["projects"]
+    assert len(projects) == 1
+    assert projects[0]["project_id"] == catalog["project_id"]
+    assert (projects[0]["available"], projects[0]["reserved"]) == (2, 1)
+
+
+def test_deleting_a_project_drops_it_from_the_company_row(client, catalog, admin):
+    client.delete(f"/api/projects/{catalog['project_id']}", headers=admin)
+    totals = _totals(client, company_slug="acme")
+    assert (totals["units_count"], totals["min_price"]) == (0, None)
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from models import db, Unit
+
+
+def test_reserve_then_second_reserver_conflicts(client, catalog, token_for):
+    uid = catalog["units"][0]
+    r = client.post(f"/api/units/{uid}/reserve", json={"ttl": 60}, headers=token_for("agent-1"))
+    assert r.status_code == 200
+    data = r.get_json()["data"]
+    assert data["status"] == "reserved" and data["version"] == 2 and data["reserved_until"]
+
+    r = client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-2"))
+    assert r.status_code == 409
+    assert r.get_json()["data"]["status"] == "reserved"
+
+
+def test_reserve_with_stale_version_conflicts(client, catalog, token_for):
+    uid = catalog["units"][0]
+    r = client.post(f"/api/units/{uid}/reserve", json={"version": 7}, headers=token_for("agent-1"))
+    assert r.status_code == 409
+    assert r.get_json()["error"] == "Unit was modified, reload and retry"
+
+
+def test_reserve_rejects_bad_arguments(client, catalog, token_for):
+    uid = catalog["units"][0]
+    assert client.post(f"/api/units/{uid}/reserve", json={"ttl": "1h"}, headers=token_for("a")).status_code == 400
+    assert client.post("/api/units/9999/reserve", json={}, headers=token_for("a")).status_code == 404
+
+
+def test_release_is_limited_to_the_holder_or_an_admin(client, catalog, token_for, admin):
+    uid = catalog["units"][0]
+    client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-1"))
+
+    r = client.post(f"/api/units/{uid}/release", json={}, headers=token_for("agent-2"))
+    assert r.status_code == 403
+
+    r = client.post(f"/api/units/{uid}/release", json={}, headers=token_for("agent-1"))
+    assert r.status_code == 200 and r.get_json()["data"]["status"] == "available"
+
+    client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-1"))
+    assert client.post(f"/api/units/{uid}/release", json={}, headers=admin).status_code == 200
+
+
+def test_put_cannot_reserve_without_a_holder(client, catalog, admin):
+    uid = catalog["units"][0]
+    r = client.put(f"/api/units/{uid}", json={"status": "reserved"}, headers=admin)
+    assert r.status_code == 409
+    assert "/reserve" in r.get_json()["error"]
+
+
+def test_put_with_stale_version_conflicts(client, catalog, admin):
+    uid = catalog["units"][0]
+    assert client.put(f"/api/units/{uid}", json={"title": "x", "version": 1}, headers=admin).status_code == 200
+    assert client.put(f"/api/units/{uid}", json={"title": "y", "version": 1}, headers=admin).status_code == 409
+
+
+def test_expired_reservation_is_swept_back_to_available(app, client, catalog, token_for):
+    from inventory import reconcile
+    from reservations import expire_reservations
+
+    uid = catalog["units"][0]
+    client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-1"))
+    with app.app_context():
+        assert expire_reservations() == 0
+        assert expire_reservations(now=datetime.utcnow() + timedelta(days=2)) == 1
+        unit = db.session.get(Unit, uid)
+        assert (unit.status, unit.reserved_by, unit.reserved_until) == ("available", None, None)
+        assert reconcile() == 0
+
+
+def test_expired_hold_can_be_taken_before_the_sweep(app, client, catalog, token_for):
+    uid = catalog["units"][0]
+    client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-1"))
+    with app.app_context():
+        db.session.execute(db.update(Unit).where(Unit.id == uid)
+                           .values(reserved_until=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+    r = client.post(f"/api/units/{uid}/reserve", json={}, headers=token_for("agent-2"))
+    assert r.status_code == 200
+    with app.app_context():
+        assert db.session.get(Unit, uid).reserved_by == "agent-2"
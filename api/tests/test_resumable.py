@@ -0,0 +1,90 @@
+import io
+import os
+
+from PIL import Image
+
+CHUNK_TYPE = {"Content-Type": "application/offset+octet-stream"}
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), "blue").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _start(client, headers, size, filename="plan.png", attach=None):
+    body = {"filename": filename, "size": size}
+    if attach:
+        body["attach"] = attach
+    return client.post("/api/uploads/resumable", json=body, headers=headers)
+
+
+def _patch(client, headers, upload_id, offset, data):
+    return client.patch(f"/api/uploads/resumable/{upload_id}", data=data,
+                        headers={**headers, **CHUNK_TYPE, "Upload-Offset": str(offset)})
+
+
+def test_chunks_resume_from_the_reported_offset(app, client, admin):
+    data = _png()
+    r = _start(client, admin, len(data))
+    assert r.status_code == 201 and r.headers["Upload-Offset"] == "0"
+    upload_id = r.get_json()["data"]["id"]
+
+    assert _patch(client, admin, upload_id, 0, data[:20]).headers["Upload-Offset"] == "20"
+    # الاتصال وقع: الـ client بيسأل وصل لحد فين
+    status = client.head(f"/api/uploads/resumable/{upload_id}", headers=admin)
+    assert (status.headers["Upload-Offset"], status.headers["Upload-Length"]) == ("20", str(len(data)))
+    # offset غلط بياخد 409 ومفيش حاجة بتتكتب
+    assert _patch(client, admin, upload_id, 0, data).status_code == 409
+    assert _patch(client, admin, upload_id, 20, data[20:]).headers["Upload-Offset"] == str(len(data))
+
+    r = client.post(f"/api/uploads/resumable/{upload_id}/complete", headers=admin)
+    assert r.status_code == 200
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], r.get_json()["filename"]), "rb") as f:
+        assert f.read() == data
+    assert client.head(f"/api/uploads/resumable/{upload_id}", headers=admin).status_code == 404
+
+
+def test_complete_before_the_last_byte_conflicts(client, admin):
+    data = _png()
+    upload_id = _start(client, admin, len(data)).get_json()["data"]["id"]
+    _patch(client, admin, upload_id, 0, data[:30])
+    assert client.post(f"/api/uploads/resumable/{upload_id}/complete", headers=admin).status_code == 409
+
+
+def test_more_than_the_declared_size_is_rejected(client, admin):
+    data = _png()
+    upload_id = _start(client, admin, len(data)).get_json()["data"]["id"]
+    assert _patch(client, admin, upload_id, 0, data + b"extra").status_code == 413
+
+
+def test_content_is_sniffed_from_the_first_bytes(client, admin):
+    upload_id = _start(client, admin, 100).get_json()["data"]["id"]
+    assert _patch(client, admin, upload_id, 0, b"MZ" + b"\0" * 98).status_code == 415
+    assert client.head(f"/api/uploads/resumable/{upload_id}", headers=admin).headers["Upload-Offset"] == "0"
+
+
+def test_create_validates_size_type_and_target(app, client, admin, catalog):
+    assert _start(client, admin, 0).status_code == 400
+    assert _start(client, admin, 10, filename="run.exe").status_code == 415
+    assert _start(client, admin, app.config["RESUMABLE_MAX_BYTES"] + 1).status_code == 413
+    assert _start(client, admin, 10, attach={"unit_id": catalog["units"][0], "field": "logo"}).status_code == 400
+    assert _start(client, admin, 10, attach={"unit_id": 9999, "field": "floor_plan"}).status_code == 404
+
+
+def test_complete_attaches_the_floor_plan(client, admin, catalog):
+    uid = catalog["units"][0]
+    data = _png()
+    upload_id = _start(client, admin, len(data),
+                       attach={"unit_id": uid, "field": "floor_plan"}).get_json()["data"]["id"]
+    _patch(client, admin, upload_id, 0, data)
+    r = client.post(f"/api/uploads/resumable/{upload_id}/complete", headers=admin)
+    assert r.status_code == 200
+    floor_plan = client.get(f"/api/units/{uid}").get_json()["data"]["floor_plan"]
+    assert floor_plan.endswith("/uploads/" + r.get_json()["filename"])
+
+
+def test_cancel_discards_the_upload(client, admin):
+    upload_id = _start(client, admin, 100).get_json()["data"]["id"]
+    assert client.delete(f"/api/uploads/resumable/{upload_id}", headers=admin).status_code == 200
+    assert client.head(f"/api/uploads/resumable/{upload_id}", headers=admin).status_code == 404
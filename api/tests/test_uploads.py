@@ -0,0 +1,56 @@
+import io
+import os
+
+from PIL import Image
+
+
+def _png(size=(8, 8)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, "red").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _upload(client, headers, data, name="photo.png"):
+    return client.post("/api/upload", data={"file": (io.BytesIO(data), name)},
+                       content_type="multipart/form-data", headers=headers)
+
+
+def _leftovers(app):
+    return [name for name in os.listdir(app.config["UPLOAD_FOLDER"]) if name.endswith(".part")]
+
+
+def test_image_is_stored_with_its_hash(app, client, admin):
+    r = _upload(client, admin, _png())
+    assert r.status_code == 200
+    body = r.get_json()
+    assert os.path.exists(os.path.join(app.config["UPLOAD_FOLDER"], body["filename"]))
+    assert len(body["sha256"]) == 64
+    assert _leftovers(app) == []
+
+
+def test_content_must_match_an_image_signature(app, client, admin):
+    r = _upload(client, admin, b"<?php echo 'hi'; ?>" + b"\0" * 64)
+    assert r.status_code == 415
+    assert _leftovers(app) == []
+
+
+def test_tiny_file_is_sniffed_on_close(app, client, admin):
+    assert _upload(client, admin, b"GIF").status_code == 415
+
+
+def test_extension_must_be_allowed(client, admin):
+    assert _upload(client, admin, _png(), name="photo.svg").status_code == 415
+
+
+def test_file_over_the_limit_is_rejected(app, client, admin):
+    app.config["UPLOAD_MAX_FILE_BYTES"] = 1024
+    r = _upload(client, admin, _png() + b"\0" * 2048)
+    assert r.status_code == 413
+    assert _leftovers(app) == []
+    assert os.listdir(app.config["UPLOAD_FOLDER"]) == []
+
+
+def test_non_ascii_name_keeps_the_real_type(app, client, admin):
+    r = _upload(client, admin, _png(), name="صورة.png")
+    assert r.status_code == 200
+    assert r.get_json()["filename"].endswith(".png")
@@ -0,0 +1,171 @@
+# api/tokens.py - إبطال التوكنات (logout) + كاش للتوكنات اللي اتعمل لها verify
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+
+from flask import current_app, g, request
+from flask_jwt_extended import decode_token, get_jwt, get_jwt_header, verify_jwt_in_request
+from flask_jwt_extended.exceptions import RevokedTokenError
+
+
+class RevocationStore:
+    """In-memory set of revoked ``jti`` values, kept until the token expires."""
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def revoke(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+            self._prune()
+
+    def is_revoked(self, jti):
+        return jti in self._revoked
+
+    def _prune(self):
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        for jti in [j for j, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+
+
+class RedisRevocationStore(RevocationStore):
+    """Shares revocations between worker processes through Redis.
+
+    Revocations made by this process are answered from memory; anything else
+    costs one ``EXISTS`` round trip, never a database query.
+    """
+
+    def __init__(self, url, prefix="revoked:"):
+        super().__init__()
+        import redis  # اختياري - مطلوب فقط مع REVOCATION_REDIS_URL
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def revoke(self, jti, exp):
+        super().revoke(jti, exp)
+        ttl = max(1, int(exp - time.time()))
+        self._redis.set(self._prefix + jti, 1, ex=ttl)
+
+    def is_revoked(self, jti):
+        return super().is_revoked(jti) or bool(self._redis.exists(self._prefix + jti))
+
+
+class VerifiedTokenCache:
+    """Small LRU of raw token -> (header, claims) whose signature was verified.
+
+    Entries are only served until the token's own ``exp``; revocation is
+    still checked on every request.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        with self._lock:
+            item = self._items.get(token)
+            if item is None:
+                self.misses += 1
+                return None
+            header, claims = item
+            if claims.get("exp") is not None and claims["exp"] <= time.time():
+                del self._items[token]
+                self.misses += 1
+                return None
+            self._items.move_to_end(token)
+            self.hits += 1
+            return item
+
+    def put(self, token, header, claims):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[token] = (header, claims)
+            self._items.move_to_end(token)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+def _read_key(path):
+    return Path(path).read_text(encoding="utf-8") if path else None
+
+
+def configure_keys(app, secret):
+    """HS256 with JWT_SECRET_KEY by default; RS*/ES*/PS* read PEM key files."""
+    algorithm = app.config.get("JWT_ALGORITHM", "HS256")
+    if algorithm.startswith(("RS", "ES", "PS", "Ed")):
+        app.config["JWT_PRIVATE_KEY"] = _read_key(app.config.get("JWT_PRIVATE_KEY_FILE"))
+        app.config["JWT_PUBLIC_KEY"] = _read_key(app.config.get("JWT_PUBLIC_KEY_FILE"))
+        if not app.config["JWT_PUBLIC_KEY"]:
+            raise RuntimeError(f"JWT_PUBLIC_KEY_FILE is required for {algorithm}")
+    else:
+        app.config["JWT_SECRET_KEY"] = secret
+
+
+def init_app(app, jwt):
+    url = app.config.get("REVOCATION_REDIS_URL")
+    store = RedisRevocationStore(url) if url else RevocationStore()
+    app.extensions["token_revocation"] = store
+    app.extensions["token_cache"] = VerifiedTokenCache(app.config.get("JWT_VERIFIED_CACHE_SIZE", 1024))
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return store.is_revoked(jwt_payload["jti"])
+
+
+def revoke_token(claims):
+    current_app.extensions["token_revocation"].revoke(claims["jti"], claims.get("exp", time.time() + 86400))
+
+
+def revoke_encoded_token(encoded):
+    revoke_token(decode_token(encoded, allow_expired=True))
+
+
+def verify_cached(refresh=False):
+    """Drop-in for ``verify_jwt_in_request()`` that skips signature checks
+    for tokens verified recently by this process.
+    """
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else None
+    if not token or request.method == "OPTIONS":
+        return verify_jwt_in_request(refresh=refresh)
+
+    cache = current_app.extensions["token_cache"]
+    cached = cache.get(token)
+    if cached is not None:
+        header, claims = cached
+        if claims.get("type") == ("refresh" if refresh else "access"):
+            if current_app.extensions["token_revocation"].is_revoked(claims["jti"]):
+                raise RevokedTokenError(header, claims)
+            # نفس اللي بيحفظه verify_jwt_in_request عشان get_jwt() تشتغل عادي
+            g._jwt_extended_jwt_user = {"loaded_user": None}
+            g._jwt_extended_jwt_header = header
+            g._jwt_extended_jwt = claims
+            g._jwt_extended_jwt_location = "headers"
+            return header, claims
+
+    result = verify_jwt_in_request(refresh=refresh)
+    cache.put(token, get_jwt_header(), get_jwt())
+    return result
+
+
+def token_required(refresh=False):
+    """Same contract as ``jwt_required()`` but uses the verified-token cache."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_cached(refresh=refresh)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,215 @@
+# api/upload_gc.py - مسح ملفات الـ uploads اللي التطبيق نفسه فكها
+#
+# الـ collector ما بيمسحش "أي ملف مالوش صف": ملفات /api/upload قبل ما تتربط، والملفات
+# اللي اتحطت بإيدها في UPLOAD_FOLDER، والشعارات المتخزنة كـ path أو URL كلها شكلها
+# يتيم. بدل كده حذف صف أو استبدال صورة بيسجل أسماء ملفاته في upload_candidates في نفس
+# الـ transaction (release/release_rows)، والـ sweep بيعدي على المرشحين الأقدم من
+# UPLOAD_GC_GRACE_SECONDS بس: لو ما حدش رجع شاور على الاسم (المراجع بتتعد بعد ما
+# الـ path/URL يتحول لاسم الملف) الملف بيتمسح. غير كده بيتمسح بس ملفات .upload-*.part
+# اللي process وقعت وهي بتكتبها، والـ .resumable اللي وقفت (resumable.expire).
+# UPLOAD_GC_DRY_RUN (افتراضي) = بيسجل في اللوج اللي كان هيتمسح من غير ما يمسح.
+import json
+import os
+import posixpath
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import unquote, urlsplit
+
+from sqlalchemy import delete, insert, select
+
+from models import db, Company, Project, Unit, UploadCandidate
+import metrics
+import resumable
+from imaging import ORIGINALS_DIR
+from media import PRIVATE_DIR
+
+GC_FILES = metrics.registry.register(metrics.Counter(
+    "api_upload_gc_files_total", "Orphaned upload files removed by the collector."))
+GC_BYTES = metrics.registry.register(metrics.Counter(
+    "api_upload_gc_bytes_total", "Bytes reclaimed by the upload collector."))
+
+C = UploadCandidate.__table__
+
+# الأعمدة اللي بتشاور على ملفات؛ True = JSON list
+FILE_COLUMNS = {
+    Company: ((Company.logo, False),),
+    Project: ((Project.images, True), (Project.videos, True)),
+    Unit: ((Unit.images, True), (Unit.videos, True), (Unit.floor_plan, False)),
+}
+
+PARTIAL_PREFIX, PARTIAL_SUFFIX = ".upload-", ".part"
+
+
+def _json_list(value):
+    try:
+        items = json.loads(value or "[]")
+    except (TypeError, ValueError):
+        return []
+    return items if isinstance(items, list) else []
+
+
+def file_name(value):
+    """The upload filename a column value points at ("a.png", "/uploads/a.png", "https://cdn/x/a.png?sig=...").
+
+    Files in the private folder keep their "private/" prefix.
+    """
+    if not isinstance(value, str):
+        return None
+    parent, name = posixpath.split(unquote(urlsplit(value.strip()).path).replace("\\", "/"))
+    if not name or name.startswith("."):
+        return None
+    if posixpath.basename(parent) == PRIVATE_DIR:
+        return f"{PRIVATE_DIR}/{name}"
+    return name
+
+
+def _names(value, is_list):
+    values = [item for item in _json_list(value) if isinstance(item, str)] if is_list else [value]
+    return [name for name in map(file_name, values) if name]
+
+
+def reference_counts(chunk=2000):
+    """How many rows point at each upload filename (streamed, columns only)."""
+    refs = Counter()
+    for columns in FILE_COLUMNS.values():
+        for column, is_list in columns:
+            query = select(column).where(column.isnot(None)).execution_options(yield_per=chunk)
+            for (value,) in db.session.execute(query):
+                refs.update(_names(value, is_list))
+    return refs
+
+
+def release(values):
+    """Mark files as no longer used by the row being written; committed with the caller's transaction."""
+    names = {file_name(v) for v in values if v} - {None}
+    if names:
+        now = datetime.utcnow()
+        db.session.execute(insert(C), [{"filename": name, "released_at": now} for name in sorted(names)])
+
+
+def release_rows(model, *criteria):
+    """``release()`` every file referenced by the ``model`` rows matching ``criteria`` (call before deleting them)."""
+    columns = FILE_COLUMNS[model]
+    names = []
+    for row in db.session.execute(select(*(c for c, _ in columns)).where(*criteria)):
+        for value, (_, is_list) in zip(row, columns):
+            names.extend(_names(value, is_list))
+    release(names)
+
+
+def _remove(path, dry_run):
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+    if not dry_run:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        GC_FILES.inc()
+        GC_BYTES.inc(size)
+    return size
+
+
+def sweep(folder, grace_seconds, dry_run=False):
+    """Remove released files that nothing refers to any more, plus abandoned partial uploads.
+
+    Only files recorded by ``release()`` at least ``grace_seconds`` ago are
+    considered; kept originals (see imaging.py) go with their file. In a
+    dry run nothing is deleted and the candidates stay queued.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    candidates = db.session.execute(select(C.c.id, C.c.filename).where(C.c.released_at < cutoff)).all()
+    removed, reclaimed, kept = [], 0, 0
+    if candidates:
+        refs = reference_counts()
+        for name in sorted({c.filename for c in candidates}):
+            if refs[name]:
+                # اتربط بصف تاني - مش زبالة
+                kept += 1
+                continue
+            parent, base = posixpath.split(name)
+            original = posixpath.join(parent, ORIGINALS_DIR, base)
+            for path, label in ((os.path.join(folder, name), name), (os.path.join(folder, original), original)):
+                size = _remove(path, dry_run)
+                if size is not None:
+                    removed.append(label)
+                    reclaimed += size
+        if not dry_run:
+            db.session.execute(delete(C).where(C.c.id.in_([c.id for c in candidates])))
+            db.session.commit()
+
+    if os.path.isdir(folder):
+        stale = time.time() - grace_seconds
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not (entry.name.startswith(PARTIAL_PREFIX) and entry.name.endswith(PARTIAL_SUFFIX)):
+                    continue
+                if not entry.is_file() or entry.stat().st_mtime > stale:
+                    continue
+                size = _remove(entry.path, dry_run)
+                if size is not None:
+                    removed.append(entry.name)
+                    reclaimed += size
+    return {"removed": removed, "bytes": reclaimed, "kept": kept}
+
+
+class UploadCollector:
+    """Background thread that runs ``sweep()`` on request and every ``interval`` seconds."""
+
+    def __init__(self, app):
+        self.app = app
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="upload-gc", daemon=True)
+                self._thread.start()
+
+    def request(self):
+        """Ask for a sweep soon; several requests in a row collapse into one run."""
+        self._ensure_thread()
+        self._wake.set()
+
+    def start(self):
+        self._ensure_thread()
+
+    def _run(self):
+        interval = self.app.config["UPLOAD_GC_INTERVAL"] or None
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    dry_run = self.app.config["UPLOAD_GC_DRY_RUN"]
+                    result = sweep(self.app.config["UPLOAD_FOLDER"], self.app.config["UPLOAD_GC_GRACE_SECONDS"],
+                                   dry_run=dry_run)
+                    db.session.remove()
+                if result["removed"]:
+                    self.app.logger.info("Upload GC %s %s files (%s bytes): %s",
+                                         "would remove" if dry_run else "removed",
+                                         len(result["removed"]), result["bytes"], ", ".join(result["removed"]))
+                expired = resumable.expire(self.app.config["UPLOAD_FOLDER"],
+                                           self.app.config["RESUMABLE_EXPIRE_SECONDS"])
+                if expired:
+                    self.app.logger.info("Upload GC expired %s partial resumable uploads", expired)
+            except Exception:
+                self.app.logger.exception("Upload GC failed")
+
+
+def init_app(app):
+    app.config.setdefault("UPLOAD_GC_GRACE_SECONDS", 3600)
+    app.config.setdefault("UPLOAD_GC_INTERVAL", 6 * 3600)
+    app.config.setdefault("UPLOAD_GC_DRY_RUN", True)
+    app.config.setdefault("RESUMABLE_EXPIRE_SECONDS", 24 * 3600)
+    app.extensions["upload_gc"] = UploadCollector(app)
+
+
+def request_sweep(app):
+    app.extensions["upload_gc"].request()
@@ -0,0 +1,197 @@
+# api/uploads.py - استقبال الملفات stream على الديسك مباشرة
+#
+# Werkzeug بيدي كل ملف في الـ multipart لـ _get_file_stream؛ هنا بنرجع UploadSink
+# بيكتب الـ chunks في ملف مؤقت جوه UPLOAD_FOLDER نفسه (وبيحسب sha256 وهو بيكتب)،
+# فالحفظ في الآخر مجرد rename. نوع الملف بيتعرف من أول كام بايت (مش من الامتداد بس)،
+# والملف اللي أكبر من UPLOAD_MAX_FILE_BYTES بيترفض أول ما يعدي الحد - من غير ما
+# نستنى باقي الـ request. حجم الـ request كله محدود بـ MAX_CONTENT_LENGTH.
+import hashlib
+import io
+import os
+import tempfile
+
+from flask import Request, current_app, g
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.utils import secure_filename
+
+import media
+import metrics
+
+ALLOWED_IMAGE_EXT = {"png", "jpg", "jpeg", "gif", "webp"}
+VIDEO_EXT = {"mp4", "m4v", "mov", "webm"}
+
+# أول بايتات كل نوع مسموح
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+SNIFF_BYTES = 12
+
+UPLOAD_REJECTED = metrics.registry.register(metrics.Counter(
+    "api_upload_rejected_total", "Uploaded files rejected while streaming.", ("reason",)))
+
+
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_IMAGE_EXT
+
+
+def sniff(head):
+    """Image type from the first bytes of a file, or None."""
+    for signature, kind in SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def sniff_video(head):
+    # MP4/MOV: صندوق ftyp (أو moov/mdat في ملفات QuickTime القديمة) بعد الـ size؛ WebM: EBML header
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        return "mov"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    return None
+
+
+class UploadSink:
+    """Writable file for one multipart part: size cap, type sniffing and sha256 while writing."""
+
+    def __init__(self, folder, filename, limit):
+        fd, self.tmp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=folder)
+        self._file = os.fdopen(fd, "w+b")
+        self.filename = filename
+        self.limit = limit
+        self.size = 0
+        self.kind = None
+        self.path = None
+        self._head = b""
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def _sniff(self):
+        self.kind = sniff(self._head)
+        if self.kind is None:
+            UPLOAD_REJECTED.inc(reason="type")
+            raise UnsupportedMediaType(f"'{self.filename}' is not a PNG, JPEG, GIF or WebP image")
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            UPLOAD_REJECTED.inc(reason="size")
+            raise RequestEntityTooLarge(f"'{self.filename}' is larger than {self.limit} bytes")
+        if self.kind is None:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset, whence=0):
+        # الـ parser بيعمل seek(0) لما الجزء يخلص - ملف أصغر من SNIFF_BYTES يتفحص هنا
+        if self.kind is None:
+            self._sniff()
+        return self._file.seek(offset, whence)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def tell(self):
+        return self._file.tell()
+
+    def commit(self, target):
+        self._file.close()
+        os.replace(self.tmp_path, target)
+        self.path = target
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def close(self):
+        """Close the file; a part that was never committed is deleted."""
+        if not self._file.closed:
+            self._file.close()
+        if self.path is None:
+            try:
+                os.remove(self.tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+class UploadRequest(Request):
+    @property
+    def max_form_memory_size(self):
+        # حقول النص في الـ multipart (مش الملفات)
+        return current_app.config["MAX_FORM_MEMORY_SIZE"]
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename:
+            # <input type="file"> فاضي - مفيش ملف يتحفظ
+            return io.BytesIO()
+        if not allowed_file(filename):
+            UPLOAD_REJECTED.inc(reason="type")
+            raise UnsupportedMediaType(f"'{filename}': file type not allowed")
+        limit = current_app.config["UPLOAD_MAX_FILE_BYTES"]
+        if content_length and content_length > limit:
+            UPLOAD_REJECTED.inc(reason="size")
+            raise RequestEntityTooLarge(f"'{filename}' is larger than {limit} bytes")
+        sink = UploadSink(current_app.config["UPLOAD_FOLDER"], filename, limit)
+        g.setdefault("upload_sinks", []).append(sink)
+        return sink
+
+
+def reserve(folder, filename):
+    """Create an empty ``filename`` (or ``name_1.ext``, ...) atomically; returns the name taken."""
+    base, ext = os.path.splitext(filename)
+    idx = 1
+    while True:
+        try:
+            os.close(os.open(os.path.join(folder, filename), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return filename
+        except FileExistsError:
+            filename = f"{base}_{idx}{ext}"
+            idx += 1
+
+
+def store(storage, kind, private=False):
+    """Move an uploaded file to its final name in UPLOAD_FOLDER (or its private/ folder); returns the filename."""
+    folder = current_app.config["UPLOAD_FOLDER"]
+    if private:
+        folder = os.path.join(folder, media.PRIVATE_DIR)
+        os.makedirs(folder, exist_ok=True)
+    sink = storage.stream
+    filename = secure_filename(storage.filename)
+    if not allowed_file(filename):
+        # secure_filename بيشيل الحروف العربي - نرجع لاسم عام بامتداد النوع الحقيقي
+        filename = f"upload.{sink.kind if isinstance(sink, UploadSink) else filename.rsplit('.', 1)[-1]}"
+    filename = reserve(folder, filename)
+    target = os.path.join(folder, filename)
+    if isinstance(sink, UploadSink):
+        sink.commit(target)
+    else:
+        storage.save(target)
+    metrics.record_upload(kind, target)
+    return f"{media.PRIVATE_DIR}/{filename}" if private else filename
+
+
+def init_app(app):
+    app.config.setdefault("UPLOAD_MAX_FILE_BYTES", 10 * 1024 * 1024)
+    app.config.setdefault("MAX_FORM_MEMORY_SIZE", 500 * 1024)
+    app.request_class = UploadRequest
+
+    @app.teardown_request
+    def discard_partial_uploads(exc):
+        # لو الـ parsing وقف في النص (ملف كبير/نوع غلط) الأجزاء اللي اتكتبت تتمسح
+        for sink in g.pop("upload_sinks", ()):
+            sink.close()
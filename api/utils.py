@@ -1,6 +1,6 @@
 from flask import request
 
-def paginate_query(query, default_limit=10, max_limit=50):
+def page_args(default_limit=10, max_limit=50):
     try:
         page = int(request.args.get("page", 1))
         limit = int(request.args.get("limit", default_limit))
@@ -8,6 +8,9 @@ def paginate_query(query, default_limit=10, max_limit=50):
             limit = max_limit
     except:
         page, limit = 1, default_limit
+    return page, limit
 
+def paginate_query(query, default_limit=10, max_limit=50):
+    page, limit = page_args(default_limit, max_limit)
     items = query.offset((page - 1) * limit).limit(limit).all()
     return items, page, limit
@@ -0,0 +1,239 @@
+# bot/benchmarks/bench_bot.py - سيناريو تصفح كامل للبوت ضد Telegram و API وهميين
+#
+#   cd bot
+#   python benchmarks/bench_bot.py --users 200 --out bot_bench.json
+#   python ../api/benchmarks/compare.py old.json bot_bench.json
+#
+# كل مستخدم بيعمل: /start -> يختار شركة -> مشروع -> وحدة. بنقيس زمن معالجة كل update
+# لحد ما ردود تليجرام تخلص (شاملة طابور الإرسال).
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+import httpx  # noqa: E402
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+import telegram_bot  # noqa: E402
+from throttle import FairSendScheduler  # noqa: E402
+
+STEPS = ("start", "company", "project", "unit")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, elapsed, errors):
+    values = sorted(latencies)
+    return {
+        "n": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+class FakeApi:
+    """httpx transport that answers the catalog endpoints the bot browses."""
+
+    def __init__(self, companies=5, projects=8, units=20, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.companies = [{"id": i, "slug": f"co-{i}", "name": f"Company {i}"} for i in range(companies)]
+        self.projects = {
+            c["slug"]: [{"id": c["id"] * 100 + j, "title": f"Project {j}"} for j in range(projects)]
+            for c in self.companies
+        }
+        self.units = [
+            {"id": i, "code": f"U-{i}", "title": f"Unit {i}", "sqm": 120.0, "price_per_sqm": 25000,
+             "floor": "3", "bedrooms": 3, "bathrooms": 2, "status": "available", "images": []}
+            for i in range(units)
+        ]
+
+    async def handler(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path.split("/api", 1)[-1]
+        self.calls[re.sub(r"/\d+$", "/:id", path)] += 1
+        if path == "/companies":
+            data = self.companies
+        elif path == "/projects":
+            data = self.projects.get(request.url.params.get("company_slug"), [])
+        elif path == "/units":
+            data = self.units
+        elif path.startswith("/units/"):
+            data = self.units[int(path.rsplit("/", 1)[1]) % len(self.units)]
+        else:
+            return httpx.Response(404, json={"ok": False, "error": "Not Found"})
+        return httpx.Response(200, json={"ok": True, "data": data})
+
+
+class FakeTelegram(BaseRequest):
+    """Answers Bot API calls locally after ``latency`` seconds."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._ids = itertools.count(1000)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = request_data.parameters if request_data else {}
+        if endpoint == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                      "can_join_groups": True, "can_read_all_group_messages": False,
+                      "supports_inline_queries": False}
+        elif endpoint in ("sendMessage", "editMessageText", "sendPhoto"):
+            result = {"message_id": params.get("message_id") or next(self._ids), "date": int(time.time()),
+                      "chat": {"id": params.get("chat_id", 0), "type": "private"}, "text": params.get("text", "")}
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def make_updates(bot, chat_id, api, rng, update_ids):
+    user = {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"}
+    chat = {"id": chat_id, "type": "private"}
+    message = {"message_id": 1, "date": int(time.time()), "chat": chat, "from": user, "text": "..."}
+    company = rng.choice(api.companies)["slug"]
+    project = rng.choice(api.projects[company])["id"]
+    unit = rng.choice(api.units)["id"]
+
+    def callback(data):
+        return {"update_id": next(update_ids), "callback_query": {
+            "id": str(next(update_ids)), "from": user, "chat_instance": str(chat_id),
+            "message": message, "data": data}}
+
+    raw = [
+        {"update_id": next(update_ids), "message": {
+            **message, "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}]}},
+        callback(f"comp:{company}"),
+        callback(f"proj:{company}:{project}"),
+        callback(f"unit:{unit}"),
+    ]
+    return [Update.de_json(u, bot) for u in raw]
+
+
+async def run(args):
+    api = FakeApi(latency=args.api_latency_ms / 1000)
+    telegram_bot.client._client = httpx.AsyncClient(
+        base_url=telegram_bot.API, transport=httpx.MockTransport(api.handler))
+    tg = FakeTelegram(latency=args.telegram_latency_ms / 1000)
+    if args.real_limits:
+        limiter = telegram_bot.send_scheduler
+    else:
+        # نقيس تكلفة البوت نفسه، مش حدود تليجرام
+        limiter = FairSendScheduler(global_rate=1e6, private_rate=1e6, group_per_minute=1e6, burst=1000)
+    application = telegram_bot.build_application(request=tg, rate_limiter=limiter)
+
+    latencies = {step: [] for step in STEPS}
+    errors = Counter()
+    update_ids = itertools.count(1)
+    rng = random.Random(7)
+
+    async def user_session(chat_id):
+        for step, update in zip(STEPS, make_updates(application.bot, chat_id, api, rng, update_ids)):
+            start = time.perf_counter()
+            try:
+                await application.process_update(update)
+            except Exception:
+                errors[step] += 1
+            latencies[step].append(time.perf_counter() - start)
+
+    async with application:
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(10_000 + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    await telegram_bot.client.aclose()
+    total = sum((v for v in latencies.values()), [])
+    results = [
+        {"case": f"bot_{step}", "kind": "bot", "scale": args.users, "mode": "bot", "concurrency": args.users,
+         **summarize(latencies[step], elapsed, errors[step])}
+        for step in STEPS
+    ]
+    results.append({"case": "bot_all_updates", "kind": "bot", "scale": args.users, "mode": "bot",
+                    "concurrency": args.users, **summarize(total, elapsed, sum(errors.values()))})
+    return results, dict(api.calls), dict(tg.calls), telegram_bot.client.snapshot()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot browsing scenario against fake Telegram and API")
+    parser.add_argument("--users", type=int, default=200, help="concurrent simulated chats")
+    parser.add_argument("--api-latency-ms", type=float, default=5.0)
+    parser.add_argument("--telegram-latency-ms", type=float, default=30.0)
+    parser.add_argument("--real-limits", action="store_true", help="use the configured send rate limits")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results, api_calls, telegram_calls, client_stats = asyncio.run(run(args))
+    for row in results:
+        print(f"  {row['case']:<18} {row['throughput_rps']:>8.1f} upd/s  p50 {row['p50_ms']:>8.2f} ms  "
+              f"p99 {row['p99_ms']:>8.2f} ms" + (f"  errors {row['errors']}" if row["errors"] else ""))
+    print(f"  API calls: {api_calls}")
+    print(f"  Telegram calls: {telegram_calls}")
+
+    if args.out:
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+                "api_calls": api_calls,
+                "telegram_calls": telegram_calls,
+                "api_client": client_stats,
+            },
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bot/bulk_upload.py - قراءة ملفات الوحدات (XLSX/CSV) للإضافة/الحذف الجماعي
+import io
+from collections import Counter
+
+REQUIRED_COLUMNS = ["project_id", "code", "sqm", "price_per_sqm", "floor"]
+OPTIONAL_COLUMNS = ["title", "bedrooms", "bathrooms", "status"]
+SUPPORTED_EXT = (".xlsx", ".xls", ".csv")
+MAX_ROWS = 20000
+
+
+def is_supported(filename):
+    return bool(filename) and filename.lower().endswith(SUPPORTED_EXT)
+
+
+def read_frame(content, filename):
+    import pandas as pd  # ثقيل - يحمل عند أول استخدام فقط
+
+    buf = io.BytesIO(content)
+    if filename.lower().endswith(".csv"):
+        df = pd.read_csv(buf, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(buf, dtype=str, keep_default_na=False)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    return df
+
+
+def parse_units_file(content, filename):
+    """Parse and validate an uploaded sheet; blocking, run it in a worker thread.
+
+    Each row is an add by default; rows with ``action=delete`` only need ``id``.
+    Returns ``{"create": [...], "delete": [...], "errors": [...]}`` where the
+    errors carry 1-based sheet row numbers (header is row 1).
+    """
+    result = {"create": [], "delete": [], "errors": []}
+    try:
+        df = read_frame(content, filename)
+    except Exception as e:
+        result["errors"].append(f"تعذر قراءة الملف: {e}")
+        return result
+
+    if len(df) > MAX_ROWS:
+        result["errors"].append(f"عدد الصفوف {len(df)} أكبر من الحد المسموح {MAX_ROWS}")
+        return result
+
+    has_action = "action" in df.columns
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing and not has_action:
+        result["errors"].append(f"أعمدة ناقصة: {', '.join(missing)}")
+        return result
+
+    seen_codes = set()
+    for i, row in enumerate(df.to_dict("records"), start=2):
+        row = {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+        action = (row.get("action") or "add").lower()
+
+        if action == "delete":
+            try:
+                result["delete"].append(int(row.get("id") or row.get("unit_id")))
+            except (TypeError, ValueError):
+                result["errors"].append(f"صف {i}: id غير صالح للحذف")
+            continue
+        if action != "add":
+            result["errors"].append(f"صف {i}: action غير معروف '{action}'")
+            continue
+
+        empty = [c for c in REQUIRED_COLUMNS if not row.get(c)]
+        if empty:
+            result["errors"].append(f"صف {i}: قيم ناقصة ({', '.join(empty)})")
+            continue
+        try:
+            item = {
+                "project_id": int(row["project_id"]),
+                "code": row["code"],
+                "sqm": float(row["sqm"]),
+                "price_per_sqm": int(float(row["price_per_sqm"])),
+                "floor": row["floor"],
+            }
+            for col in ("bedrooms", "bathrooms"):
+                if row.get(col):
+                    item[col] = int(float(row[col]))
+        except ValueError as e:
+            result["errors"].append(f"صف {i}: قيمة رقمية غير صالحة ({e})")
+            continue
+        if item["sqm"] <= 0 or item["price_per_sqm"] <= 0:
+            result["errors"].append(f"صف {i}: المساحة والسعر لازم يكونوا أكبر من صفر")
+            continue
+
+        key = (item["project_id"], item["code"])
+        if key in seen_codes:
+            result["errors"].append(f"صف {i}: كود مكرر {item['code']} في نفس المشروع")
+            continue
+        seen_codes.add(key)
+
+        for col in ("title", "status"):
+            if row.get(col):
+                item[col] = row[col]
+        result["create"].append(item)
+
+    return result
+
+
+def summarize(parsed, max_errors=10):
+    lines = [
+        "📄 ملخص الملف (تجربة بدون تنفيذ):",
+        f"➕ وحدات للإضافة: {len(parsed['create'])}",
+        f"🗑️ وحدات للحذف: {len(parsed['delete'])}",
+    ]
+    per_project = Counter(item["project_id"] for item in parsed["create"])
+    for pid, count in sorted(per_project.items()):
+        lines.append(f"   • مشروع {pid}: {count} وحدة")
+
+    errors = parsed["errors"]
+    if errors:
+        lines.append(f"\n❌ أخطاء ({len(errors)}):")
+        lines.extend(errors[:max_errors])
+        if len(errors) > max_errors:
+            lines.append(f"... و {len(errors) - max_errors} أخطاء أخرى")
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+# bot/http_client.py - طبقة الاتصال بالـ API
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+# الـ API بيرجع نفس الـ response لنفس الـ Idempotency-Key، فالـ retry آمن
+KEYED_METHODS = {"POST", "PUT", "PATCH"}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Fails fast after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds one probe request is let through
+    (half-open); success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=15.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self._probe_in_flight = False
+
+    def before_request(self):
+        if self.state == "closed":
+            return
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("circuit open")
+            self.state = "half-open"
+            self._probe_in_flight = False
+        # half-open: a single probe at a time
+        if self._probe_in_flight:
+            raise CircuitOpenError("circuit half-open")
+        self._probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.open_count += 1
+                logger.warning("API circuit opened after %s failures", self.failures)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class ApiClient:
+    """Pooled httpx client with retries, a circuit breaker and single-flight GETs."""
+
+    def __init__(self, base_url, max_connections=20, max_keepalive=10,
+                 connect_timeout=3.0, read_timeout=10.0, retries=2,
+                 backoff_base=0.2, backoff_max=2.0, http2=False,
+                 failure_threshold=5, reset_timeout=15.0):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 غير مثبت - سيتم استخدام HTTP/1.1")
+                http2 = False
+
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self._inflight = {}
+
+        self.stats = {
+            "requests": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "pool_saturated": 0,
+            "retries": 0,
+            "coalesced": 0,
+            "circuit_rejected": 0,
+            "errors": 0,
+        }
+
+    @classmethod
+    def from_config(cls, base_url, cfg):
+        http_cfg = cfg.get("HTTP", {})
+        return cls(
+            base_url,
+            max_connections=http_cfg.get("MAX_CONNECTIONS", 20),
+            max_keepalive=http_cfg.get("MAX_KEEPALIVE", 10),
+            connect_timeout=http_cfg.get("CONNECT_TIMEOUT", 3.0),
+            read_timeout=http_cfg.get("READ_TIMEOUT", 10.0),
+            retries=http_cfg.get("RETRIES", 2),
+            http2=http_cfg.get("HTTP2", False),
+            failure_threshold=http_cfg.get("BREAKER_FAILURES", 5),
+            reset_timeout=http_cfg.get("BREAKER_RESET", 15.0),
+        )
+
+    def snapshot(self):
+        data = dict(self.stats)
+        data["max_connections"] = self.max_connections
+        data["pool_utilization"] = round(self.stats["in_flight"] / self.max_connections, 3)
+        data["coalescing_keys"] = len(self._inflight)
+        data["circuit_state"] = self.breaker.state
+        data["circuit_opened"] = self.breaker.open_count
+        return data
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def request(self, method, path, params=None, data=None, token=None, timeout=None):
+        headers = {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError:
+                pass
+
+        if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            return {"ok": False, "error": "Invalid method"}
+
+        if method not in IDEMPOTENT_METHODS:
+            if method in KEYED_METHODS:
+                # مفتاح واحد للعملية كلها - كل المحاولات بتبعته هو نفسه
+                headers["Idempotency-Key"] = uuid.uuid4().hex
+            return await self._send(method, path, params, data, headers, timeout)
+
+        key = (method, path, tuple(sorted((params or {}).items())), token)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(task)
+
+        # أول طلب ينفذ فعلياً والباقي ينتظر نفس النتيجة
+        task = asyncio.ensure_future(self._send(method, path, params, data, headers, timeout))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _send(self, method, path, params, data, headers, timeout=None):
+        url = f"{self.base_url}{path}"
+        retryable = method in IDEMPOTENT_METHODS or "Idempotency-Key" in headers
+        attempts = 1 + (self.retries if retryable else 0)
+
+        for attempt in range(attempts):
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                self.stats["circuit_rejected"] += 1
+                metrics.API_CALLS.inc(method=method, path=metrics.path_label(path), outcome="circuit_open")
+                return {"ok": False, "error": "API unavailable (circuit open)"}
+
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            if self.stats["in_flight"] > self.stats["peak_in_flight"]:
+                self.stats["peak_in_flight"] = self.stats["in_flight"]
+            if self.stats["in_flight"] > self.max_connections:
+                self.stats["pool_saturated"] += 1
+
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                response = await self._client.request(
+                    method, url, params=params,
+                    json=data if method != "GET" and data is not None else None,
+                    headers=headers,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+                outcome = f"{response.status_code // 100}xx"
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status >= 500 and attempt + 1 < attempts:
+                    await self._backoff(attempt)
+                    continue
+                self.stats["errors"] += 1
+                logger.error(f"API HTTP Error: {status} - {e.response.text}")
+                return {"ok": False, "error": f"HTTP error: {status}"}
+            except httpx.RequestError as e:
+                outcome = "network"
+                self.breaker.record_failure()
+                if attempt + 1 < attempts:
+                    await self._backoff(attempt)
+                    continue
+                self.stats["errors"] += 1
+                logger.error(f"API Request Error: {e}")
+                return {"ok": False, "error": f"Request error: {str(e)}"}
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"API General Error: {e}")
+                return {"ok": False, "error": f"General error: {str(e)}"}
+            finally:
+                self.stats["in_flight"] -= 1
+                label = metrics.path_label(path)
+                metrics.API_LATENCY.observe(time.perf_counter() - started, method=method, path=label)
+                metrics.API_CALLS.inc(method=method, path=label, outcome=outcome)
+
+    async def _backoff(self, attempt):
+        self.stats["retries"] += 1
+        # full jitter
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        await asyncio.sleep(delay)
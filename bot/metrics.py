@@ -0,0 +1,161 @@
+# bot/metrics.py - metrics بصيغة Prometheus للبوت على بورت محلي
+#
+# كل حاجة هنا بتشتغل على نفس الـ event loop بتاع البوت، فمفيش locks.
+import asyncio
+import logging
+import re
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from telegram.ext import ApplicationHandlerStop
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_RE = re.compile(r"/\d+(?=/|$)")
+
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Counter):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        item = self._values.get(key)
+        if item is None:
+            item = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        item[0][bisect_left(self.buckets, value)] += 1
+        item[1] += value
+        item[2] += 1
+
+    def collect(self):
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (None,), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound is None else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+API_CALLS = Counter("bot_api_requests_total", "Calls to the backend API.", ("method", "path", "outcome"))
+API_LATENCY = Histogram("bot_api_request_duration_seconds", "Backend API call latency.", ("method", "path"))
+SEND_CALLS = Counter("bot_telegram_requests_total", "Bot API calls to Telegram.", ("endpoint", "outcome"))
+SEND_LATENCY = Histogram(
+    "bot_telegram_request_duration_seconds", "Telegram call latency including queueing.", ("endpoint",))
+HANDLER_CALLS = Counter("bot_handler_calls_total", "Handler invocations.", ("handler", "outcome"))
+HANDLER_LATENCY = Histogram("bot_handler_duration_seconds", "Handler run time.", ("handler",))
+HANDLERS_IN_FLIGHT = Gauge("bot_handlers_in_flight", "Handlers currently running.")
+
+METRICS = [API_CALLS, API_LATENCY, SEND_CALLS, SEND_LATENCY, HANDLER_CALLS, HANDLER_LATENCY, HANDLERS_IN_FLIGHT]
+
+
+def path_label(path):
+    # /units/15 -> /units/:id عشان عدد السطور يفضل ثابت
+    return _ID_RE.sub("/:id", path.split("?", 1)[0])
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def timed(callback):
+    """Wrap a PTB handler callback to record its duration and outcome."""
+    name = getattr(callback, "__name__", "handler")
+
+    @wraps(callback)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = "ok"
+        HANDLERS_IN_FLIGHT.inc()
+        try:
+            return await callback(*args, **kwargs)
+        except ApplicationHandlerStop:
+            outcome = "stop"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            HANDLERS_IN_FLIGHT.dec()
+            HANDLER_LATENCY.observe(time.perf_counter() - start, handler=name)
+            HANDLER_CALLS.inc(handler=name, outcome=outcome)
+    return wrapper
+
+
+def instrument_handlers(application):
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = timed(handler.callback)
+
+
+async def _serve(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # نقرأ باقي الـ headers ونتجاهلها
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host="127.0.0.1", port=9105):
+    server = await asyncio.start_server(_serve, host, port)
+    logger.info("Metrics on http://%s:%s/metrics", host, port)
+    return server
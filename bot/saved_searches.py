@@ -0,0 +1,344 @@
+# bot/saved_searches.py - البحث المحفوظ وتنبيهات الوحدات الجديدة/انخفاض السعر
+#
+# الـ cursor (updated_at, id) بيتاخد دايماً من الـ API - أول تشغيل بيبدأ من آخر وحدة
+# اتعدلت هناك، مش من ساعة البوت. كل استدعاءات sqlite بتتعمل في thread (asyncio.to_thread)
+# عشان ما توقفش الـ event loop، و hits الوحدات اللي اتمسحت أو اتباعت بتتشال كل دورة.
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# نفس فلاتر GET /api/units
+FILTER_KEYS = {
+    "project_id": int,
+    "min_sqm": float,
+    "max_price": int,
+    "floor": str,
+    "status": str,
+    "bedrooms": int,
+    "bathrooms": int,
+}
+MAX_SEARCHES_PER_CHAT = 10
+# نقطة البداية لو الكتالوج فاضي - أي وحدة تنزل بعد كده جديدة
+EPOCH = "1970-01-01T00:00:00"
+
+
+def parse_filter(args):
+    """Parse ``key=value`` command args into a filter dict; raises ValueError."""
+    flt = {}
+    for arg in args:
+        if "=" not in arg:
+            raise ValueError(f"صيغة غير صحيحة: {arg}")
+        key, value = arg.split("=", 1)
+        key = key.strip().lower()
+        if key not in FILTER_KEYS:
+            raise ValueError(f"فلتر غير معروف: {key}")
+        flt[key] = FILTER_KEYS[key](value.strip())
+    if not flt:
+        raise ValueError("لازم فلتر واحد على الأقل")
+    return flt
+
+
+def total_price(unit):
+    return int((unit.get("sqm") or 0) * (unit.get("price_per_sqm") or 0))
+
+
+def matches(flt, unit):
+    # نفس منطق list_units، والحالة الافتراضية "available"
+    if unit.get("status") != flt.get("status", "available"):
+        return False
+    if "project_id" in flt and unit.get("project_id") != flt["project_id"]:
+        return False
+    if "min_sqm" in flt and (unit.get("sqm") or 0) < flt["min_sqm"]:
+        return False
+    if "max_price" in flt and total_price(unit) > flt["max_price"]:
+        return False
+    if "floor" in flt and str(unit.get("floor")) != flt["floor"]:
+        return False
+    if "bedrooms" in flt and unit.get("bedrooms") != flt["bedrooms"]:
+        return False
+    if "bathrooms" in flt and unit.get("bathrooms") != flt["bathrooms"]:
+        return False
+    return True
+
+
+def describe(flt):
+    return " ".join(f"{k}={v}" for k, v in flt.items())
+
+
+class SearchStore:
+    """sqlite storage for searches, hits and cursors; safe to call from worker threads."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS searches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                filters TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_searches_chat ON searches (chat_id);
+            -- آخر سعر تم التنبيه به لكل (بحث، وحدة)
+            CREATE TABLE IF NOT EXISTS hits (
+                search_id INTEGER NOT NULL,
+                unit_id INTEGER NOT NULL,
+                total_price INTEGER NOT NULL,
+                PRIMARY KEY (search_id, unit_id)
+            );
+            CREATE INDEX IF NOT EXISTS ix_hits_unit ON hits (unit_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    def add(self, chat_id, flt):
+        with self._lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM searches WHERE chat_id = ?", (chat_id,)).fetchone()[0]
+            if count >= MAX_SEARCHES_PER_CHAT:
+                raise ValueError(f"الحد الأقصى {MAX_SEARCHES_PER_CHAT} عمليات بحث محفوظة")
+            cur = self.conn.execute(
+                "INSERT INTO searches (chat_id, filters, created_at) VALUES (?, ?, ?)",
+                (chat_id, json.dumps(flt), datetime.utcnow().isoformat()),
+            )
+            self.conn.commit()
+            return cur.lastrowid
+
+    def for_chat(self, chat_id):
+        with self._lock:
+            rows = self.conn.execute("SELECT id, filters FROM searches WHERE chat_id = ? ORDER BY id", (chat_id,))
+            return [(sid, json.loads(f)) for sid, f in rows]
+
+    def delete(self, chat_id, search_id):
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM searches WHERE id = ? AND chat_id = ?", (search_id, chat_id))
+            self.conn.execute("DELETE FROM hits WHERE search_id = ?", (search_id,))
+            self.conn.commit()
+            return cur.rowcount > 0
+
+    def all(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT id, chat_id, filters FROM searches").fetchall()
+        return [(sid, chat_id, json.loads(f)) for sid, chat_id, f in rows]
+
+    def hits_for_units(self, unit_ids):
+        if not unit_ids:
+            return {}
+        marks = ",".join("?" * len(unit_ids))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT search_id, unit_id, total_price FROM hits WHERE unit_id IN ({marks})", list(unit_ids))
+            return {(sid, uid): price for sid, uid, price in rows}
+
+    def save_hits(self, upserts, removals):
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hits (search_id, unit_id, total_price) VALUES (?, ?, ?)", upserts)
+            self.conn.executemany("DELETE FROM hits WHERE search_id = ? AND unit_id = ?", removals)
+            self.conn.commit()
+
+    def hit_units(self, after_id, limit):
+        """Distinct unit ids with hits, above ``after_id`` (for pruning in slices)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT unit_id FROM hits WHERE unit_id > ? ORDER BY unit_id LIMIT ?", (after_id, limit))
+            return [uid for (uid,) in rows]
+
+    def forget_units(self, unit_ids):
+        with self._lock:
+            self.conn.executemany("DELETE FROM hits WHERE unit_id = ?", [(uid,) for uid in unit_ids])
+            self.conn.commit()
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self.conn.commit()
+
+    def set_cursor(self, since, after_id):
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  [("cursor_since", since), ("cursor_id", str(after_id))])
+            self.conn.commit()
+
+
+class SearchIndex:
+    """In-memory index of saved searches bucketed by (project_id, bedrooms).
+
+    A changed unit is only compared against the four buckets it can fall
+    into (exact/wildcard on each key) instead of every saved search.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    @staticmethod
+    def _key(flt):
+        return flt.get("project_id"), flt.get("bedrooms")
+
+    def add(self, search_id, chat_id, flt):
+        key = self._key(flt)
+        self._buckets.setdefault(key, {})[search_id] = (chat_id, flt)
+        self._where[search_id] = key
+
+    def remove(self, search_id):
+        key = self._where.pop(search_id, None)
+        if key is not None:
+            bucket = self._buckets.get(key, {})
+            bucket.pop(search_id, None)
+            if not bucket:
+                self._buckets.pop(key, None)
+
+    def candidates(self, unit):
+        pid, beds = unit.get("project_id"), unit.get("bedrooms")
+        for key in ((pid, beds), (pid, None), (None, beds), (None, None)):
+            bucket = self._buckets.get(key)
+            if bucket:
+                yield from bucket.items()
+
+
+class SearchMatcher:
+    """Evaluates saved searches against units changed since the last cursor.
+
+    ``fetch_page(since, after_id)`` must return the next page of changed units
+    ordered by (updated_at, id), ``fetch_latest()`` the most recently updated
+    unit (``{}`` for an empty catalog) and ``fetch_statuses(unit_ids)``
+    ``{unit_id: status or None if deleted}``; each returns None on error.
+    """
+
+    def __init__(self, store, fetch_page, fetch_latest, fetch_statuses, page_size=50, max_pages=200,
+                 prune_size=20, prune_batches=5):
+        self.store = store
+        self.fetch_page = fetch_page
+        self.fetch_latest = fetch_latest
+        self.fetch_statuses = fetch_statuses
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.prune_size = prune_size
+        self.prune_batches = prune_batches
+        self.index = SearchIndex()
+        for sid, chat_id, flt in store.all():
+            self.index.add(sid, chat_id, flt)
+
+    async def add_search(self, chat_id, flt):
+        sid = await asyncio.to_thread(self.store.add, chat_id, flt)
+        self.index.add(sid, chat_id, flt)
+        return sid
+
+    async def remove_search(self, chat_id, search_id):
+        if await asyncio.to_thread(self.store.delete, chat_id, search_id):
+            self.index.remove(search_id)
+            return True
+        return False
+
+    async def searches_for(self, chat_id):
+        return await asyncio.to_thread(self.store.for_chat, chat_id)
+
+    async def evaluate(self, units):
+        """Returns a list of (chat_id, text) alerts and records the new hit state."""
+        hits = await asyncio.to_thread(self.store.hits_for_units, [u["id"] for u in units])
+        alerts, upserts, removals = [], [], []
+        for unit in units:
+            price = total_price(unit)
+            matched = set()
+            for sid, (chat_id, flt) in self.index.candidates(unit):
+                if not matches(flt, unit):
+                    continue
+                matched.add(sid)
+                prev = hits.get((sid, unit["id"]))
+                if prev is None:
+                    alerts.append((chat_id, self._format("🔔 وحدة جديدة تطابق بحثك", sid, unit, price)))
+                elif price < prev:
+                    alerts.append((chat_id, self._format(f"📉 انخفض السعر من {prev:,} ج", sid, unit, price)))
+                if price != prev:
+                    upserts.append((sid, unit["id"], price))
+            # أي hit تاني للوحدة دي (اتباعت، اتنقلت لمشروع تاني، البحث ما بقاش يطابق) يتشال
+            removals.extend(key for key in hits if key[1] == unit["id"] and key[0] not in matched)
+        await asyncio.to_thread(self.store.save_hits, upserts, removals)
+        return alerts
+
+    @staticmethod
+    def _format(title, search_id, unit, price):
+        return (
+            f"{title} (#{search_id})\n"
+            f"🔢 {unit.get('code', 'N/A')} | {unit.get('sqm', 0)}م² | 🛏️ {unit.get('bedrooms', 0)}\n"
+            f"💵 {price:,} ج"
+        )
+
+    async def _seed_cursor(self):
+        # ساعة الـ API مش ساعة البوت: نبدأ من آخر (updated_at, id) عنده
+        latest = await self.fetch_latest()
+        if latest is None:
+            return False
+        since, after_id = (latest.get("updated_at") or EPOCH, latest.get("id") or 0) if latest else (EPOCH, 0)
+        await asyncio.to_thread(self.store.set_cursor, since, after_id)
+        return True
+
+    async def prune(self):
+        """Drop hits of deleted or sold units, a few slices per run; returns how many units were dropped."""
+        after_id = int(await asyncio.to_thread(self.store.get_meta, "prune_after", "0"))
+        dropped = 0
+        for _ in range(self.prune_batches):
+            unit_ids = await asyncio.to_thread(self.store.hit_units, after_id, self.prune_size)
+            if not unit_ids:
+                after_id = 0
+                break
+            statuses = await self.fetch_statuses(unit_ids)
+            if statuses is None:
+                break
+            gone = [uid for uid in unit_ids if uid in statuses and statuses[uid] in (None, "sold")]
+            if gone:
+                await asyncio.to_thread(self.store.forget_units, gone)
+                dropped += len(gone)
+            after_id = unit_ids[-1]
+            if len(unit_ids) < self.prune_size:
+                after_id = 0
+                break
+        await asyncio.to_thread(self.store.set_meta, "prune_after", str(after_id))
+        return dropped
+
+    async def run_once(self, notify):
+        """One matching cycle; ``notify(chat_id, text)`` sends one alert."""
+        since = await asyncio.to_thread(self.store.get_meta, "cursor_since")
+        after_id = int(await asyncio.to_thread(self.store.get_meta, "cursor_id", "0"))
+        if since is None:
+            # أول تشغيل: نبدأ من آخر تعديل في الـ API بدل ما ننبه على الكتالوج كله
+            await self._seed_cursor()
+            return 0
+
+        sent = 0
+        for _ in range(self.max_pages):
+            units = await self.fetch_page(since, after_id)
+            if units is None:
+                break
+            if units and len(self.index):
+                alerts = await self.evaluate(units)
+                # الإرسال كله يمر على FairSendScheduler فمفيش خوف من الـ flood
+                results = await asyncio.gather(
+                    *(notify(chat_id, text) for chat_id, text in alerts), return_exceptions=True)
+                for err in results:
+                    if isinstance(err, Exception):
+                        logger.warning("Saved search alert failed: %s", err)
+                sent += len(alerts)
+            if units:
+                since, after_id = units[-1]["updated_at"], units[-1]["id"]
+                await asyncio.to_thread(self.store.set_cursor, since, after_id)
+            if len(units) < self.page_size:
+                break
+
+        dropped = await self.prune()
+        if dropped:
+            logger.info("Pruned saved search hits for %s deleted or sold units", dropped)
+        return sent
@@ -5,9 +5,17 @@ import os
 import asyncio
 import signal
 import sys
-import httpx
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from telegram.ext import (
+    Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler,
+    MessageHandler, TypeHandler, ContextTypes, filters
+)
+
+import bulk_upload
+import metrics
+from http_client import ApiClient
+from saved_searches import SearchMatcher, SearchStore, describe, parse_filter
+from throttle import ChatLimiter, FairSendScheduler
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, "config_bot.json")
@@ -31,7 +39,19 @@ ADMIN_PASS = CFG.get("ADMIN_PASSWORD")
 ADMIN_CHAT_IDS = CFG.get("ADMIN_CHAT_IDS", [])
 
 ADMIN_TOKENS = {}
-client = httpx.AsyncClient(timeout=30.0)  # زيادة المهلة
+client = ApiClient.from_config(API, CFG)
+
+RATE_CFG = CFG.get("RATE_LIMIT", {})
+chat_limiter = ChatLimiter(rate=RATE_CFG.get("CHAT_RATE", 1.0), burst=RATE_CFG.get("CHAT_BURST", 5))
+send_scheduler = FairSendScheduler.from_config(CFG)
+
+SAVED_SEARCH_DB = os.path.join(BASE_DIR, CFG.get("SAVED_SEARCH_DB", "saved_searches.db"))
+SAVED_SEARCH_INTERVAL = CFG.get("SAVED_SEARCH_INTERVAL", 60)
+
+# METRICS_PORT = 0 يقفل endpoint الـ metrics
+METRICS_CFG = CFG.get("METRICS", {})
+METRICS_HOST = METRICS_CFG.get("HOST", "127.0.0.1")
+METRICS_PORT = METRICS_CFG.get("PORT", 9105)
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -42,50 +62,14 @@ logger = logging.getLogger(__name__)
 def is_admin(chat_id):
     return str(chat_id) in [str(cid) for cid in ADMIN_CHAT_IDS]
 
-async def api_request(method, path, params=None, data=None, token=None):
-    headers = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    
-    if data and not (isinstance(data, dict) or isinstance(data, list)):
-        headers["Content-Type"] = "application/json"
-        if isinstance(data, str):
-            try:
-                data = json.loads(data)
-            except json.JSONDecodeError:
-                pass
-    
-    url = f"{API}{path}"
-    
-    try:
-        if method == "GET":
-            response = await client.get(url, params=params, headers=headers)
-        elif method == "POST":
-            response = await client.post(url, json=data, headers=headers)
-        elif method == "PUT":
-            response = await client.put(url, json=data, headers=headers)
-        elif method == "DELETE":
-            response = await client.delete(url, headers=headers)
-        else:
-            return {"ok": False, "error": "Invalid method"}
-        
-        response.raise_for_status()
-        return response.json()
-    except httpx.RequestError as e:
-        logger.error(f"API Request Error: {e}")
-        return {"ok": False, "error": f"Request error: {str(e)}"}
-    except httpx.HTTPStatusError as e:
-        logger.error(f"API HTTP Error: {e.response.status_code} - {e.response.text}")
-        return {"ok": False, "error": f"HTTP error: {e.response.status_code}"}
-    except Exception as e:
-        logger.error(f"API General Error: {e}")
-        return {"ok": False, "error": f"General error: {str(e)}"}
+async def api_request(method, path, params=None, data=None, token=None, timeout=None):
+    return await client.request(method, path, params=params, data=data, token=token, timeout=timeout)
 
 async def api_get(path, params=None, token=None):
     return await api_request("GET", path, params=params, token=token)
 
-async def api_post(path, data=None, token=None):
-    return await api_request("POST", path, data=data, token=token)
+async def api_post(path, data=None, token=None, timeout=None):
+    return await api_request("POST", path, data=data, token=token, timeout=timeout)
 
 async def api_put(path, data=None, token=None):
     return await api_request("PUT", path, data=data, token=token)
@@ -93,9 +77,43 @@ async def api_put(path, data=None, token=None):
 async def api_delete(path, token=None):
     return await api_request("DELETE", path, token=token)
 
+async def fetch_changed_units(since, after_id):
+    data = await api_get("/units", params={"updated_since": since, "after_id": after_id, "limit": 50})
+    if not data or not data.get("ok"):
+        logger.error("Failed to fetch changed units: %s", data.get("error", "Unknown error"))
+        return None
+    return data.get("data", [])
+
+async def fetch_latest_unit():
+    # آخر وحدة اتعدلت بساعة الـ API - بداية الـ cursor في أول تشغيل
+    data = await api_get("/units", params={"sort": "-updated_at", "limit": 1, "fields": "id,updated_at"})
+    if not data or not data.get("ok"):
+        logger.error("Failed to fetch latest unit: %s", data.get("error", "Unknown error") if data else "No response")
+        return None
+    units = data.get("data", [])
+    return units[0] if units else {}
+
+async def fetch_unit_statuses(unit_ids):
+    # {unit_id: status} والوحدة الممسوحة None - request واحد عن طريق /api/batch
+    requests = [{"path": f"/api/units/{uid}", "query": {"fields": "id,status"}} for uid in unit_ids]
+    data = await api_post("/batch", data={"requests": requests})
+    if not data or not data.get("ok"):
+        logger.error("Failed to fetch unit statuses: %s", data.get("error", "Unknown error") if data else "No response")
+        return None
+    statuses = {}
+    for uid, item in zip(unit_ids, data.get("data", [])):
+        if item.get("status") == 404:
+            statuses[uid] = None
+        elif item.get("status") == 200:
+            statuses[uid] = (item.get("body") or {}).get("data", {}).get("status")
+    return statuses
+
+search_matcher = SearchMatcher(SearchStore(SAVED_SEARCH_DB), fetch_changed_units, fetch_latest_unit,
+                               fetch_unit_statuses)
+
 async def companies_keyboard():
     try:
-        data = await api_get("/companies")
+        data = await api_get("/companies", params={"fields": "slug,name"})
         if not data or not data.get("ok"):
             logger.error("Failed to fetch companies: %s", data.get("error", "Unknown error"))
             return InlineKeyboardMarkup([[InlineKeyboardButton("❌ خطأ في جلب البيانات", callback_data="noop")]])
@@ -113,7 +131,7 @@ async def companies_keyboard():
         return InlineKeyboardMarkup([[InlineKeyboardButton("❌ خطأ في جلب البيانات", callback_data="noop")]])
 
 async def projects_keyboard(company_slug: str):
-    data = await api_get(f"/projects", params={"company_slug": company_slug})
+    data = await api_get(f"/projects", params={"company_slug": company_slug, "fields": "id,title"})
     if not data or not data.get("ok"):
         logger.error("Failed to fetch projects for company %s: %s", company_slug, data.get("error", "Unknown error"))
         return InlineKeyboardMarkup([[InlineKeyboardButton("❌ خطأ في جلب البيانات", callback_data="back:companies")]])
@@ -128,7 +146,8 @@ async def projects_keyboard(company_slug: str):
     return InlineKeyboardMarkup(buttons or [[InlineKeyboardButton("لا يوجد مشاريع", callback_data="back:companies")]])
 
 async def units_keyboard(project_id: int):
-    data = await api_get("/units", params={"project_id": project_id})
+    # الكيبورد محتاج 4 حقول بس - باقي الوحدة (صور، مميزات...) مش بيتبعت
+    data = await api_get("/units", params={"project_id": project_id, "fields": "id,code,sqm,price_per_sqm"})
     if not data or not data.get("ok"):
         logger.error("Failed to fetch units for project %s: %s", project_id, data.get("error", "Unknown error"))
         return InlineKeyboardMarkup([[InlineKeyboardButton("❌ خطأ في جلب البيانات", callback_data=f"back:projects")]])
@@ -143,6 +162,19 @@ async def units_keyboard(project_id: int):
     buttons.append([InlineKeyboardButton("⬅ رجوع", callback_data=f"back:projects")])
     return InlineKeyboardMarkup(buttons or [[InlineKeyboardButton("لا يوجد وحدات", callback_data=f"back:projects")]])
 
+async def flood_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """يتم تنفيذه قبل كل الهاندلرز - يوقف الشات اللي بيبعت أسرع من المسموح"""
+    chat = update.effective_chat
+    if chat is None or chat_limiter.allow(chat.id):
+        return
+
+    if update.callback_query:
+        try:
+            await update.callback_query.answer("⏳ برجاء الانتظار قليلاً")
+        except Exception:
+            pass
+    raise ApplicationHandlerStop
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     await update.message.reply_text(
@@ -207,7 +239,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if images:
             # نرسل أول صورة كمثال
             try:
-                image_url = f"{API}/uploads/{images[0]}"
+                # الـ API بيرجع رابط كامل (ممكن CDN/موقع) - اسم ملف بس لو API قديم
+                image_url = images[0] if "://" in images[0] else f"{API}/uploads/{images[0]}"
                 await context.bot.send_photo(
                     chat_id=q.message.chat_id,
                     photo=image_url,
@@ -221,6 +254,9 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             await q.edit_message_text(msg, parse_mode='Markdown')
 
+    elif data[0] == "bulk":
+        await handle_bulk_callback(q, context, data[1])
+
     elif data[0] == "back":
         if data[1] == "companies":
             await q.edit_message_text(
@@ -316,6 +352,70 @@ async def delete_unit(update: Update, context: ContextTypes.DEFAULT_TYPE):
         error_msg = resp.get("error", "Unknown error") if resp else "No response"
         await update.message.reply_text(f"❌ فشل: {error_msg}")
 
+async def bulk_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """استقبال ملف XLSX/CSV لإضافة/حذف وحدات بالجملة"""
+    chat_id = update.effective_chat.id
+
+    if not is_admin(chat_id):
+        await update.message.reply_text("❌ مسموح للإدارة فقط")
+        return
+
+    if not ADMIN_TOKENS.get(chat_id):
+        await update.message.reply_text("⚠️ لازم تعمل /adminlogin أولاً.")
+        return
+
+    doc = update.message.document
+    if not bulk_upload.is_supported(doc.file_name):
+        await update.message.reply_text("❌ الملفات المدعومة: XLSX أو CSV")
+        return
+
+    # رسالة واحدة يتم تعديلها لعرض التقدم
+    progress = await update.message.reply_text("⏳ جاري تحميل الملف...")
+    tg_file = await doc.get_file()
+    content = bytes(await tg_file.download_as_bytearray())
+
+    await progress.edit_text("⏳ جاري قراءة الملف والتحقق من البيانات...")
+    parsed = await asyncio.to_thread(bulk_upload.parse_units_file, content, doc.file_name)
+    summary = bulk_upload.summarize(parsed)
+
+    if parsed["errors"] or not (parsed["create"] or parsed["delete"]):
+        context.chat_data.pop("bulk_pending", None)
+        await progress.edit_text(summary + "\n\n⚠️ صحح الملف وأرسله مرة أخرى.")
+        return
+
+    context.chat_data["bulk_pending"] = {"create": parsed["create"], "delete": parsed["delete"]}
+    kb = InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ تأكيد التنفيذ", callback_data="bulk:confirm"),
+        InlineKeyboardButton("❌ إلغاء", callback_data="bulk:cancel"),
+    ]])
+    await progress.edit_text(summary, reply_markup=kb)
+
+async def handle_bulk_callback(q, context, action):
+    chat_id = q.message.chat_id
+    pending = context.chat_data.pop("bulk_pending", None)
+
+    if action == "cancel" or not pending:
+        await q.edit_message_text("تم الإلغاء." if action == "cancel" else "⚠️ لا توجد عملية معلقة.")
+        return
+
+    token = ADMIN_TOKENS.get(chat_id)
+    if not is_admin(chat_id) or not token:
+        await q.edit_message_text("⚠️ لازم تعمل /adminlogin أولاً.")
+        return
+
+    total = len(pending["create"]) + len(pending["delete"])
+    await q.edit_message_text(f"⏳ جاري إرسال {total} عملية للـ API...")
+    resp = await api_post("/units/batch", data=pending, token=token, timeout=120.0)
+
+    if resp and resp.get("ok"):
+        result = resp["data"]
+        await q.edit_message_text(
+            f"✅ تم التنفيذ:\n➕ أضيفت {len(result.get('created', []))} وحدة\n🗑️ حذفت {result.get('deleted', 0)} وحدة"
+        )
+    else:
+        error_msg = resp.get("error", "Unknown error") if resp else "No response"
+        await q.edit_message_text(f"❌ فشل التنفيذ، لم يتم حفظ أي تغيير: {error_msg}")
+
 async def list_projects(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     
@@ -373,6 +473,53 @@ async def create_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
         error_msg = resp.get("error", "Unknown error") if resp else "No response"
         await update.message.reply_text(f"❌ فشل: {error_msg}")
 
+async def save_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    try:
+        flt = parse_filter(context.args)
+        sid = await search_matcher.add_search(chat_id, flt)
+    except ValueError as e:
+        await update.message.reply_text(
+            f"❌ {e}\n\nالاستخدام: /save_search project_id=3 bedrooms=3 max_price=4000000\n"
+            "الفلاتر: project_id, min_sqm, max_price, floor, status, bedrooms, bathrooms"
+        )
+        return
+
+    await update.message.reply_text(f"✅ تم حفظ البحث #{sid}: {describe(flt)}\nهنبعتلك تنبيه أول ما تنزل وحدة مطابقة أو يقل سعرها.")
+
+async def my_searches(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    searches = await search_matcher.searches_for(chat_id)
+    if not searches:
+        await update.message.reply_text("لا يوجد عمليات بحث محفوظة. استخدم /save_search")
+        return
+
+    message = "🔎 عمليات البحث المحفوظة:\n\n"
+    message += "\n".join(f"#{sid}: {describe(flt)}" for sid, flt in searches)
+    message += "\n\nللحذف: /delete_search <id>"
+    await update.message.reply_text(message)
+
+async def delete_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    try:
+        sid = int(context.args[0])
+    except:
+        await update.message.reply_text("الاستخدام: /delete_search <id>")
+        return
+
+    if await search_matcher.remove_search(chat_id, sid):
+        await update.message.reply_text(f"✅ تم حذف البحث #{sid}")
+    else:
+        await update.message.reply_text("❌ البحث غير موجود")
+
+async def saved_search_job(context: ContextTypes.DEFAULT_TYPE):
+    async def notify(chat_id, text):
+        await context.bot.send_message(chat_id=chat_id, text=text)
+
+    sent = await search_matcher.run_once(notify)
+    if sent:
+        logger.info(f"Saved search alerts sent: {sent}")
+
 async def refresh_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """أمر جديد لتحديث البيانات يدوياً"""
     chat_id = update.effective_chat.id
@@ -389,13 +536,56 @@ async def refresh_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text("✅ تم تحديث البيانات والإعدادات")
 
-def main():
-    if not BOT_TOKEN:
-        print("❌ BOT_TOKEN غير موجود")
+async def api_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+
+    if not is_admin(chat_id):
+        await update.message.reply_text("❌ مسموح للإدارة فقط")
         return
-    
-    application = Application.builder().token(BOT_TOKEN).build()
-    
+
+    stats = client.snapshot()
+    message = "📊 إحصائيات الاتصال بالـ API:\n\n"
+    message += "\n".join(f"{k}: {v}" for k, v in stats.items())
+    await update.message.reply_text(message)
+
+async def limiter_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+
+    if not is_admin(chat_id):
+        await update.message.reply_text("❌ مسموح للإدارة فقط")
+        return
+
+    message = "🚦 إحصائيات التحكم في المعدل:\n\n📥 الطلبات الواردة:\n"
+    message += "\n".join(f"{k}: {v}" for k, v in chat_limiter.snapshot().items())
+    message += "\n\n📤 الإرسال لتليجرام:\n"
+    message += "\n".join(f"{k}: {v}" for k, v in send_scheduler.snapshot().items())
+    await update.message.reply_text(message)
+
+async def start_metrics(application: Application):
+    if METRICS_PORT:
+        application.bot_data["metrics_server"] = await metrics.start_server(METRICS_HOST, METRICS_PORT)
+
+async def close_client(application: Application):
+    server = application.bot_data.pop("metrics_server", None)
+    if server is not None:
+        server.close()
+    await client.aclose()
+
+def build_application(request=None, rate_limiter=None):
+    """Application with all handlers registered; ``request`` lets benchmarks plug in a fake Telegram."""
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .rate_limiter(rate_limiter or send_scheduler)
+        .concurrent_updates(True)
+        .post_init(start_metrics)
+        .post_shutdown(close_client)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
+
+    application.add_handler(TypeHandler(Update, flood_guard), group=-1)
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("myid", myid))
     application.add_handler(CommandHandler("adminlogin", adminlogin))
@@ -404,7 +594,27 @@ def main():
     application.add_handler(CommandHandler("list_projects", list_projects))
     application.add_handler(CommandHandler("create_project", create_project))
     application.add_handler(CommandHandler("refresh", refresh_data))
+    application.add_handler(CommandHandler("api_stats", api_stats))
+    application.add_handler(CommandHandler("limiter_stats", limiter_stats))
+    application.add_handler(CommandHandler("save_search", save_search))
+    application.add_handler(CommandHandler("my_searches", my_searches))
+    application.add_handler(CommandHandler("delete_search", delete_search))
     application.add_handler(CallbackQueryHandler(handle_callback))
+    application.add_handler(MessageHandler(filters.Document.ALL, bulk_document))
+    metrics.instrument_handlers(application)
+    return application
+
+def main():
+    if not BOT_TOKEN:
+        print("❌ BOT_TOKEN غير موجود")
+        return
+
+    application = build_application()
+
+    if application.job_queue:
+        application.job_queue.run_repeating(metrics.timed(saved_search_job), interval=SAVED_SEARCH_INTERVAL, first=10)
+    else:
+        logger.warning("JobQueue غير متاح - ثبت python-telegram-bot[job-queue] لتفعيل تنبيهات البحث المحفوظ")
 
     print("✅ البوت يعمل الآن...")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
@@ -0,0 +1,332 @@
+# bot/throttle.py - التحكم في معدل الطلبات (flood control)
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# تعديل نفس الرسالة أكثر من مرة في الطابور: آخر تعديل فقط هو اللي يتبعت
+COALESCE_ENDPOINTS = {"editMessageText", "editMessageReplyMarkup", "editMessageCaption"}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, now=None):
+        """Seconds until one token is available (0 if available now)."""
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def try_acquire(self, now=None):
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ChatLimiter:
+    """Per-chat token buckets for incoming updates, bounded with LRU eviction."""
+
+    def __init__(self, rate=1.0, burst=5, max_chats=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_chats = max_chats
+        self._buckets = OrderedDict()
+        self.stats = {"allowed": 0, "throttled": 0}
+
+    def allow(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_chats:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(chat_id)
+
+        if bucket.try_acquire():
+            self.stats["allowed"] += 1
+            return True
+        self.stats["throttled"] += 1
+        return False
+
+    def snapshot(self):
+        return {**self.stats, "tracked_chats": len(self._buckets)}
+
+
+class _Job:
+    __slots__ = ("callback", "args", "kwargs", "future", "key", "enqueued", "attempts")
+
+    def __init__(self, callback, args, kwargs, future, key):
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.key = key
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+class FairSendScheduler(BaseRateLimiter):
+    """Rate limiter for all outgoing Bot API calls.
+
+    Sends are queued per chat and drained round-robin so one busy chat can't
+    starve the rest, while respecting a global rate plus Telegram's per-chat
+    limits (about 1 msg/s in private chats, 20 msg/min in groups). Queued
+    edits of the same message are coalesced and a ``RetryAfter`` from
+    Telegram pauses the whole scheduler for the requested time.
+    """
+
+    def __init__(self, global_rate=30, private_rate=1.0, group_per_minute=20,
+                 burst=3, max_retries=3, max_chats=10000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_per_minute / 60.0
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+
+        self._chat_buckets = OrderedDict()
+        self._queues = {}
+        self._ring = deque()
+        self._pending = {}
+        self._wakeup = None
+        self._worker = None
+        self._paused_until = 0.0
+        self._tasks = set()
+
+        self.stats = {
+            "sent": 0,
+            "direct": 0,
+            "coalesced": 0,
+            "retry_after": 0,
+            "max_wait_ms": 0,
+        }
+
+    @classmethod
+    def from_config(cls, cfg):
+        rl = cfg.get("RATE_LIMIT", {})
+        return cls(
+            global_rate=rl.get("GLOBAL_SEND_RATE", 30),
+            private_rate=rl.get("PRIVATE_SEND_RATE", 1.0),
+            group_per_minute=rl.get("GROUP_SEND_PER_MINUTE", 20),
+            burst=rl.get("SEND_BURST", 3),
+        )
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "queued_chats": len(self._queues),
+            "paused": max(0.0, round(self._paused_until - time.monotonic(), 2)),
+        }
+
+    async def initialize(self):
+        # ExtBot.initialize بيتنادى مرتين (Application + Updater)
+        if self._worker is not None and not self._worker.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.cancel()
+        self._queues.clear()
+        self._ring.clear()
+        self._pending.clear()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            is_group = (isinstance(chat_id, int) and chat_id < 0) or (
+                isinstance(chat_id, str) and chat_id.startswith(("-", "@")))
+            rate = self.group_rate if is_group else self.private_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, self.burst)
+            if len(self._chat_buckets) > self.max_chats:
+                # لا نحذف bucket لشات عنده رسائل في الطابور
+                for old in list(self._chat_buckets)[:len(self._chat_buckets) - self.max_chats]:
+                    if old not in self._queues:
+                        del self._chat_buckets[old]
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._process(callback, args, kwargs, endpoint, data)
+            outcome = "ok"
+            return result
+        except RetryAfter:
+            outcome = "retry_after"
+            raise
+        finally:
+            metrics.SEND_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+            metrics.SEND_CALLS.inc(endpoint=endpoint, outcome=outcome)
+
+    async def _process(self, callback, args, kwargs, endpoint, data):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            # answerCallbackQuery وما شابه: الحد العام فقط وبدون طابور
+            self.stats["direct"] += 1
+            return await self._call_direct(callback, args, kwargs)
+
+        key = None
+        if endpoint in COALESCE_ENDPOINTS and data.get("message_id") is not None:
+            key = (endpoint, chat_id, data["message_id"])
+            job = self._pending.get(key)
+            if job is not None:
+                # الطلب الأحدث يحل محل القديم، والطرفان يستلموا نفس النتيجة
+                job.callback, job.args, job.kwargs = callback, args, kwargs
+                self.stats["coalesced"] += 1
+                return await asyncio.shield(job.future)
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(callback, args, kwargs, future, key)
+        if key is not None:
+            self._pending[key] = job
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            self._ring.append(chat_id)
+        queue.append(job)
+        self._wakeup.set()
+        return await asyncio.shield(future)
+
+    async def _call_direct(self, callback, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self._wait_global()
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self._pause(e)
+                if attempt >= self.max_retries:
+                    raise
+
+    async def _wait_global(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self.global_bucket.try_acquire(now):
+                return
+            await asyncio.sleep(self.global_bucket.wait_time(now))
+
+    def _pause(self, error):
+        retry_after = error.retry_after
+        if hasattr(retry_after, "total_seconds"):
+            retry_after = retry_after.total_seconds()
+        self.stats["retry_after"] += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + float(retry_after))
+        logger.warning("Telegram flood control: pausing sends for %ss", retry_after)
+
+    def _next_job(self, now):
+        """Round-robin over chats; returns (chat_id, job) or the min wait in seconds."""
+        min_wait = None
+        for _ in range(len(self._ring)):
+            chat_id = self._ring[0]
+            self._ring.rotate(-1)
+            bucket = self._chat_bucket(chat_id)
+            wait = bucket.wait_time(now)
+            if wait == 0:
+                bucket.try_acquire(now)
+                queue = self._queues[chat_id]
+                job = queue.popleft()
+                if not queue:
+                    del self._queues[chat_id]
+                    self._ring.remove(chat_id)
+                if job.key is not None and self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+                return chat_id, job
+            min_wait = wait if min_wait is None else min(min_wait, wait)
+        return min_wait
+
+    async def _run(self):
+        while True:
+            if not self._ring:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            await self._wait_global()
+            picked = self._next_job(time.monotonic())
+            if not isinstance(picked, tuple):
+                # رجع التوكن العام لأننا لم نرسل شيئاً
+                self.global_bucket.tokens = min(self.global_bucket.capacity, self.global_bucket.tokens + 1)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=picked)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            chat_id, job = picked
+            waited = int((time.monotonic() - job.enqueued) * 1000)
+            if waited > self.stats["max_wait_ms"]:
+                self.stats["max_wait_ms"] = waited
+            task = asyncio.create_task(self._execute(chat_id, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, chat_id, job):
+        if job.future.done():
+            return
+        job.attempts += 1
+        try:
+            result = await job.callback(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            self._pause(e)
+            if job.attempts <= self.max_retries:
+                # يرجع أول الطابور لنفس الشات
+                queue = self._queues.get(chat_id)
+                if queue is None:
+                    queue = self._queues[chat_id] = deque()
+                    self._ring.appendleft(chat_id)
+                queue.appendleft(job)
+                if job.key is not None:
+                    self._pending.setdefault(job.key, job)
+                self._wakeup.set()
+                return
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        self.stats["sent"] += 1
+        if not job.future.done():
+            job.future.set_result(result)